@@ -0,0 +1,83 @@
+"""
+K线存储基准测试 - 对比 CCXT 列表 / pandas DataFrame / float32 环形缓冲（CandleRing）的内存、追加和取窗口耗时
+
+用法:
+    python3 benchmarks/bench_candle_ring.py
+    python3 benchmarks/bench_candle_ring.py --coins 100 200 --bars 5000 --window 300
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from market_scanner import ccxt_klines_to_df
+from candle_ring import CandleRing
+from indicator_batch import calculate_indicators_batch, stack_klines
+from bench_indicators_batch import generate_klines
+
+
+def measure_allocation(fn):
+    """返回 (结果, 新分配的字节数)"""
+    tracemalloc.start()
+    result = fn()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def per_call_us(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='K线存储基准测试')
+    parser.add_argument('--coins', type=int, nargs='+', default=[100, 200])
+    parser.add_argument('--bars', type=int, default=5000)
+    parser.add_argument('--window', type=int, default=300)
+    args = parser.parse_args()
+
+    print(f"{'币种数':>6}{'列表(MB)':>12}{'DataFrame(MB)':>16}{'环形缓冲(MB)':>16}"
+          f"{'列表追加(us)':>14}{'缓冲追加(us)':>14}{'DataFrame窗口(ms)':>20}{'缓冲窗口(us)':>14}{'指标误差':>12}")
+    for coins in args.coins:
+        tensor = generate_klines(coins, args.bars)
+        lists, list_bytes = measure_allocation(lambda: [coin.tolist() for coin in tensor])
+        frames = [ccxt_klines_to_df(k) for k in lists]
+        frame_bytes = sum(int(df.memory_usage(deep=True).sum()) for df in frames)
+        rings = [CandleRing.from_candles(coin, args.bars, np.float32) for coin in tensor]
+        ring_bytes = sum(ring.nbytes for ring in rings)
+
+        # 追加一根新K线：列表按旧缓存方式截断拼接，环形缓冲均摊 O(1) 追加
+        candle = tensor[0, -1].tolist()
+        klines = lists[0]
+        list_append = per_call_us(lambda: (klines[1:] + [candle])[-args.bars:], 200)
+        ring = CandleRing.from_candles(tensor[0], args.bars, np.float32)
+        ring_append = per_call_us(lambda: ring.append(candle), 2000)
+
+        # 取最近 window 根用于指标计算：DataFrame 每轮重建，环形缓冲为零拷贝视图
+        frame_window = per_call_us(lambda: ccxt_klines_to_df(klines[-args.window:]), 20) / 1000
+        ring_window = per_call_us(lambda: rings[0].window(args.window), 2000)
+
+        # float32 存储对指标的影响（与 float64 输入相比的最大相对误差）
+        windows = [r.window(args.window) for r in rings[:20]]
+        actual = calculate_indicators_batch(stack_klines(windows), '1h')
+        expected = calculate_indicators_batch(tensor[:20, -args.window:], '1h')
+        error = max(float(np.nanmax(np.abs(actual[c] - expected[c]) / np.maximum(np.abs(expected[c]), 1e-12)))
+                    for c in ('ema_20', 'ema_50', 'atr_14', 'bb_upper_20'))
+
+        print(f"{coins:>6}{list_bytes / 2**20:>12.1f}{frame_bytes / 2**20:>16.1f}{ring_bytes / 2**20:>16.1f}"
+              f"{list_append:>14.1f}{ring_append:>14.1f}{frame_window:>20.2f}{ring_window:>14.2f}{error:>12.1e}")
+    print(f"\n环形缓冲每根K线 {CandleRing(1, np.float32).nbytes // len(CandleRing(1)._buffer)} 字节，"
+          f"每个 (交易对, 周期) 内存 = (容量 + max(16, 容量/4)) × 28 字节")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""
+完整决策周期基准测试 - 用模拟交易所（src/sim/fake_exchange.py）和模拟 OpenAI 接口（src/sim/fake_llm.py）
+连续执行 N 轮 portfolio_bot()，统计各阶段耗时的 p50 / p95 / p99
+
+阶段：持仓、扫描、BTC背景、账户、提示词、AI、解析、执行（portfolio_manager.CYCLE_TIMER）；
+--stream 时另外统计从发出请求到解析出首个决策的耗时（流式回复中 CLOSE/HOLD 在此时即开始执行）；
+--shard-size 时每轮在同一行情时钟下先用单提示词（shard_size=0）执行一次作为基线（不计入各阶段统计），
+再按分片执行，对比两者的AI阶段耗时，并统计各分片AI耗时之和。
+配置、数据文件和日志都写在临时目录，不影响 config/ 和 data/；模拟行情时钟每轮前进 --interval 分钟。
+结果写入 JSON（--out），--compare 指定另一次运行的 JSON 时输出各阶段 p50 变化，便于在提交之间对比。
+
+用法:
+    python3 benchmarks/bench_cycle.py
+    python3 benchmarks/bench_cycle.py --cycles 50 --exchange-latency-ms 80 --llm-latency-ms 3000 --out cycle.json
+    python3 benchmarks/bench_cycle.py --trade --error-rate 0.02 --compare cycle_before.json
+    python3 benchmarks/bench_cycle.py --encoding compact --compare cycle_text.json
+    python3 benchmarks/bench_cycle.py --coins 20 --token-budget 12000
+    python3 benchmarks/bench_cycle.py --trade --stream --decode-ms-per-token 10
+    python3 benchmarks/bench_cycle.py --decode-ms-per-token 10 --shard-size 2
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from sim import FakeLLMServer, hold_all_responder, prompt_coins
+from utils.stage_timer import STAGE_LABELS
+
+STAGES = ['positions', 'scan', 'btc', 'account', 'prompt', 'llm', 'parse', 'execute']
+
+
+def latency_config(mean_ms: float, distribution: str) -> dict:
+    return {'distribution': distribution, 'mean': mean_ms, 'sigma': 0.5}
+
+
+def write_config(base_config: str, path: str, args) -> dict:
+    """复制配置并切换到模拟交易所（关闭K线磁盘存储，避免写入 data/candles）"""
+    with open(base_config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if args.coins:
+        config['coins'] = config['coins'][:args.coins]
+    config['exchange'] = 'fake'
+    config['fake_exchange'] = {
+        'seed': args.seed,
+        'latency_ms': latency_config(args.exchange_latency_ms, args.distribution),
+        'error_rates': {'rate_limit': args.error_rate / 2, 'network': args.error_rate / 2},
+    }
+    config.setdefault('scanner', {})['candle_store'] = False
+    if args.encoding:
+        config.setdefault('prompt', {})['encoding'] = args.encoding
+    if args.token_budget is not None:
+        config.setdefault('prompt', {})['token_budget'] = args.token_budget
+    if args.stream:
+        config.setdefault('llm', {})['stream'] = True
+    if args.shard_size:
+        config.setdefault('llm', {}).update(shard_size=args.shard_size, max_parallel=args.max_parallel)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return config
+
+
+def trade_responder(exchange, symbols):
+    """交替开仓/平仓第一个币种，其余 HOLD，用于测量下单路径"""
+    state = {'calls': 0}
+
+    def respond(messages):
+        reply = hold_all_responder(messages)
+        coins = prompt_coins(messages)
+        if not coins:
+            return reply
+        coin = coins[0]
+        price = exchange.last_price(symbols.get(coin).symbol)
+        decision = reply['decisions'][0]
+        if state['calls'] % 2 == 0:
+            decision.update(action='OPEN_LONG', position_value=20, reason='模拟回复：开多',
+                            stop_loss=price * 0.95, take_profit=price * 1.1)
+        else:
+            decision.update(action='CLOSE', reason='模拟回复：平仓')
+        state['calls'] += 1
+        return reply
+
+    return respond
+
+
+def percentiles(values) -> dict:
+    data = np.asarray(values, dtype=np.float64)
+    return {
+        'p50': float(np.percentile(data, 50)),
+        'p95': float(np.percentile(data, 95)),
+        'p99': float(np.percentile(data, 99)),
+        'mean': float(data.mean()),
+        'max': float(data.max()),
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def print_report(stages: dict, compare: dict = None):
+    header = f"{'阶段':<10}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}{'平均(ms)':>10}{'占比':>8}"
+    if compare:
+        header += f"{'p50对比':>12}"
+    print(header)
+    total_mean = stages['total']['mean'] or 1
+    for name in STAGES + ['total']:
+        if name not in stages:
+            continue
+        s = stages[name]
+        label = STAGE_LABELS.get(name, '合计')
+        line = (f"{label:<10}{s['p50'] * 1000:>10.1f}{s['p95'] * 1000:>10.1f}{s['p99'] * 1000:>10.1f}"
+                f"{s['mean'] * 1000:>10.1f}{s['mean'] / total_mean * 100:>7.1f}%")
+        if compare and name in compare:
+            before = compare[name]['p50']
+            change = (s['p50'] - before) / before * 100 if before > 0 else 0.0
+            line += f"{change:>+11.1f}%"
+        print(line)
+
+
+def run_single_prompt(pm, shard_size: int) -> float:
+    """临时关闭分片执行一轮（llm 配置每轮读取），返回AI阶段耗时"""
+    llm_settings = pm.market_scanner.coins_config.setdefault('llm', {})
+    llm_settings['shard_size'] = 0
+    try:
+        pm.portfolio_bot()
+    finally:
+        llm_settings['shard_size'] = shard_size
+    return pm.CYCLE_TIMER.snapshot().get('llm', 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='完整决策周期基准测试')
+    parser.add_argument('--cycles', type=int, default=20, help='统计的轮数')
+    parser.add_argument('--warmup', type=int, default=1, help='不计入统计的预热轮数（首轮需要下载全部K线）')
+    parser.add_argument('--interval', type=float, default=5, help='每轮之间模拟行情时钟前进的分钟数')
+    parser.add_argument('--coins', type=int, default=0, help='只使用配置中的前N个币种（0表示全部）')
+    parser.add_argument('--config', default=os.path.join(PROJECT_ROOT, 'config', 'coins_config.json'))
+    parser.add_argument('--exchange-latency-ms', type=float, default=50)
+    parser.add_argument('--llm-latency-ms', type=float, default=2000)
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=40,
+                        help='AI接口每1000个未命中缓存的输入token增加的延迟（模拟预填充）')
+    parser.add_argument('--decode-ms-per-token', type=float, default=0,
+                        help='AI接口每个输出token的生成耗时（流式时按此速度分片返回）')
+    parser.add_argument('--stream', action='store_true', help='流式接收AI回复，逐个解析并提前执行 CLOSE/HOLD')
+    parser.add_argument('--shard-size', type=int, default=0, help='分片模式：每个AI请求分析的币种数（0为单提示词）')
+    parser.add_argument('--max-parallel', type=int, default=4, help='分片模式的最大并行请求数')
+    parser.add_argument('--distribution', default='lognormal', choices=['constant', 'uniform', 'normal', 'lognormal'])
+    parser.add_argument('--error-rate', type=float, default=0.0, help='交易所接口注入限频/网络错误的概率')
+    parser.add_argument('--encoding', default='', choices=['', 'text', 'compact'], help='行情提示词编码（默认使用配置）')
+    parser.add_argument('--token-budget', type=int, default=None, help='提示词 token 预算（默认使用配置，0 不限制）')
+    parser.add_argument('--trade', action='store_true', help='模拟AI交替开仓/平仓，测量下单路径')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='', help='结果JSON路径')
+    parser.add_argument('--compare', default='', help='对比的历史结果JSON')
+    parser.add_argument('--verbose', action='store_true', help='显示交易程序日志')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_cycle_')
+    config_file = os.path.join(workdir, 'coins_config.json')
+    write_config(args.config, config_file, args)
+
+    log_file = os.path.join(workdir, 'portfolio_manager.log')
+    llm = FakeLLMServer(latency_ms=latency_config(args.llm_latency_ms, args.distribution), seed=args.seed,
+                        prefill_ms_per_1k=args.prefill_ms_per_1k, decode_ms_per_token=args.decode_ms_per_token)
+    os.environ.update({
+        'OPENAI_API_KEY': 'fake',
+        'OPENAI_BASE_URL': llm.run_in_thread(),
+        'OPENAI_MODEL_NAME': 'fake',
+        'PORTFOLIO_CONFIG_FILE': config_file,
+        'PORTFOLIO_DATA_DIR': workdir,
+        'PORTFOLIO_LOG_FILE': log_file,
+    })
+
+    if not args.verbose:
+        # 先配置根日志，portfolio_manager 的 basicConfig 不再生效，日志只写入临时目录
+        logging.basicConfig(level=logging.INFO, format='%(message)s',
+                            handlers=[logging.FileHandler(log_file, encoding='utf-8')])
+    output = io.StringIO()
+    quiet = (lambda: contextlib.nullcontext()) if args.verbose else (lambda: contextlib.redirect_stdout(output))
+    with quiet():
+        import portfolio_manager as pm
+
+    exchange = pm.exchange
+    start_clock = time.time()
+    offset = {'seconds': 0.0}
+    exchange.clock = lambda: start_clock + offset['seconds'] + (time.time() - start_clock)
+    if args.trade:
+        llm.responder = trade_responder(exchange, pm.market_scanner.symbols)
+
+    with quiet():
+        pm.setup_exchange()
+
+    cycles = []
+    single_llm = []
+    total_cycles = args.warmup + args.cycles
+    for i in range(total_cycles):
+        if args.shard_size:
+            # 单提示词基线：与本轮分片请求使用同一行情时钟
+            with quiet():
+                llm_seconds = run_single_prompt(pm, args.shard_size)
+            if i >= args.warmup:
+                single_llm.append(llm_seconds)
+        started = time.perf_counter()
+        with quiet():
+            pm.portfolio_bot()
+        elapsed = time.perf_counter() - started
+        if i >= args.warmup:
+            cycles.append(dict(pm.CYCLE_TIMER.snapshot(), total=elapsed, **pm.CYCLE_TIMER.metrics))
+        offset['seconds'] += args.interval * 60
+        print(f"\r轮次 {i + 1}/{total_cycles}: {elapsed:.2f}秒", end='', flush=True)
+    print()
+    llm.shutdown()
+
+    stages = {name: percentiles([c.get(name, 0.0) for c in cycles]) for name in STAGES + ['total']}
+    exchange_stats = exchange.stats()
+    result = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'args': vars(args),
+        'coins': len(pm.market_scanner.coins),
+        'stages': stages,
+        'cycles': cycles,
+        # 分片模式每轮另有一次单提示词基线，交易所请求按实际执行的轮数平均
+        'exchange': {'calls_per_cycle': exchange_stats['total_calls'] / (total_cycles * (2 if args.shard_size else 1)),
+                     'injected_errors': exchange_stats['injected_errors']},
+        'llm_requests': llm.requests,
+        'prompt_tokens': pm.PROMPT_CACHE_STATS.prompt_tokens / max(1, pm.PROMPT_CACHE_STATS.calls),
+        'prompt_cache_hit_rate': pm.PROMPT_CACHE_STATS.hit_rate,
+    }
+    first_decisions = [c['first_decision'] for c in cycles if 'first_decision' in c]
+    if first_decisions:
+        result['first_decision'] = percentiles(first_decisions)
+    llm_serial = [c['llm_serial'] for c in cycles if 'llm_serial' in c]
+    if llm_serial:
+        result['llm_serial'] = percentiles(llm_serial)
+    if single_llm:
+        result['llm_single'] = percentiles(single_llm)
+
+    compare = None
+    compare_llm = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare = json.load(f)['stages']
+        compare_llm = compare.get('llm', {}).get('p50')
+    print(f"\n{result['coins']} 个币种 | {args.cycles} 轮（预热 {args.warmup} 轮）| 交易所延迟 {args.exchange_latency_ms:g}ms"
+          f" | AI延迟 {args.llm_latency_ms:g}ms | 每轮交易所请求 {result['exchange']['calls_per_cycle']:.1f} 次"
+          f" | 平均输入 {result['prompt_tokens']:.0f} tokens（缓存命中 {result['prompt_cache_hit_rate']:.1f}%）\n")
+    print_report(stages, compare)
+    if 'first_decision' in result:
+        s = result['first_decision']
+        print(f"\n首个决策（流式）: p50 {s['p50'] * 1000:.1f}ms | p95 {s['p95'] * 1000:.1f}ms | p99 {s['p99'] * 1000:.1f}ms"
+              f" | AI阶段 p50 {stages['llm']['p50'] * 1000:.1f}ms")
+    if 'llm_single' in result:
+        single = result['llm_single']['p50']
+        wall = stages['llm']['p50']
+        print(f"\n分片AI（{args.shard_size}个币种/片）: 并行墙钟 p50 {wall * 1000:.1f}ms | 单提示词 p50 {single * 1000:.1f}ms"
+              f" | 加速 {single / wall if wall > 0 else 0:.2f}x")
+    if 'llm_serial' in result:
+        print(f"各分片耗时之和 p50 {result['llm_serial']['p50'] * 1000:.1f}ms（分片串行执行时的耗时）")
+    if compare_llm is not None and stages['llm']['p50'] > 0:
+        print(f"AI阶段 p50: 对比结果 {compare_llm * 1000:.1f}ms → 本次 {stages['llm']['p50'] * 1000:.1f}ms"
+              f"（{compare_llm / stages['llm']['p50']:.2f}x）")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存: {args.out}")
+    print(f"交易程序日志: {log_file}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+"""
+批量指标计算基准测试 - 对比逐币种 pandas 计算与 (币种, K线, OHLCV) 张量批量计算
+
+用法:
+    python3 benchmarks/bench_indicators_batch.py
+    python3 benchmarks/bench_indicators_batch.py --coins 7 100 200 --bars 300 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from market_scanner import calculate_technical_indicators, ccxt_klines_to_df
+from indicator_batch import calculate_indicators_batch
+from indicator_engine import TIMEFRAME_COLUMNS
+
+
+def generate_klines(coins: int, bars: int, seed: int = 42) -> np.ndarray:
+    """生成确定性的随机游走K线 (币种, K线, 6)"""
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.01, size=(coins, bars))
+    close = 100 * np.exp(np.cumsum(returns, axis=1)) * rng.uniform(0.01, 1000, size=(coins, 1))
+    open_ = np.concatenate((close[:, :1], close[:, :-1]), axis=1)
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.005, size=(coins, bars)))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.005, size=(coins, bars)))
+    volume = rng.uniform(1, 1000, size=(coins, bars))
+    timestamps = np.broadcast_to(np.arange(bars) * 300000.0, (coins, bars))
+    return np.stack((timestamps, open_, high, low, close, volume), axis=-1)
+
+
+def run_pandas(tensor: np.ndarray, timeframe: str):
+    return [calculate_technical_indicators(ccxt_klines_to_df(coin.tolist()), timeframe) for coin in tensor]
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def check_equivalence(tensor: np.ndarray, timeframe: str) -> float:
+    """返回批量结果与 pandas 结果的最大相对误差"""
+    frames = run_pandas(tensor, timeframe)
+    batch = calculate_indicators_batch(tensor, timeframe)
+    worst = 0.0
+    for i, df in enumerate(frames):
+        for column in TIMEFRAME_COLUMNS[timeframe]:
+            expected = df[column].to_numpy()
+            actual = batch[column][i]
+            scale = np.maximum(np.abs(expected), 1e-12)
+            worst = max(worst, float(np.nanmax(np.abs(actual - expected) / scale)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量指标计算基准测试')
+    parser.add_argument('--coins', type=int, nargs='+', default=[7, 100, 200])
+    parser.add_argument('--bars', type=int, default=300)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'周期':<6}{'币种数':>8}{'pandas(ms)':>14}{'批量(ms)':>12}{'加速比':>10}{'最大相对误差':>16}")
+    for timeframe in ['5m', '15m', '1h', '4h']:
+        for coins in args.coins:
+            tensor = generate_klines(coins, args.bars)
+            pandas_time = best_of(lambda: run_pandas(tensor, timeframe), args.repeat)
+            batch_time = best_of(lambda: calculate_indicators_batch(tensor, timeframe), args.repeat)
+            error = check_equivalence(tensor[:min(coins, 7)], timeframe)
+            print(f"{timeframe:<6}{coins:>8}{pandas_time * 1000:>14.2f}{batch_time * 1000:>12.2f}"
+                  f"{pandas_time / batch_time:>9.1f}x{error:>16.2e}")
+
+
+if __name__ == '__main__':
+    main()
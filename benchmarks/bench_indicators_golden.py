@@ -0,0 +1,215 @@
+"""
+指标金标准与耗时测试 - 固定 calculate_technical_indicators 在各周期、固定K线样本上的输出，并测量各周期在不同K线根数下的耗时
+
+金标准（benchmarks/golden/indicators.json）覆盖 RSI、MACD、ATR、布林带、EMA 各列，
+每列保存预热区（前60根，含 bfill().ffill() 填充的部分）、间隔采样和最后10根的数值以及整列合计。
+新的指标实现注册到 ENGINES 后，用 --engine 同时检查与金标准是否一致和相对 pandas 基准的加速比。
+
+用法:
+    python3 benchmarks/bench_indicators_golden.py                  # 检查 pandas 实现 + 计时
+    python3 benchmarks/bench_indicators_golden.py --engine batch   # 检查批量实现并对比耗时
+    python3 benchmarks/bench_indicators_golden.py --engine streaming --bars 100 1000  # 检查流式引擎（逐根计入全部K线）
+    python3 benchmarks/bench_indicators_golden.py --bars 100 1000 --repeat 3 --skip-timing
+    python3 benchmarks/bench_indicators_golden.py --update         # 指标口径有意修改后重新生成金标准
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from market_scanner import calculate_technical_indicators, ccxt_klines_to_df
+from indicator_batch import calculate_indicators_batch, _bfill_ffill
+from indicator_engine import IndicatorState
+from indicator_spec import TIMEFRAME_COLUMNS
+from bench_indicators_batch import generate_klines
+
+GOLDEN_FILE = os.path.join(PROJECT_ROOT, 'benchmarks', 'golden', 'indicators.json')
+TIMEFRAMES = ['5m', '15m', '1h', '4h']
+
+
+def fixtures() -> dict:
+    """固定K线样本 (N, 6)：随机游走、横盘后单边上涨（RSI 0/0 和无下跌）、不足预热长度的短序列"""
+    random_walk = generate_klines(1, 300, seed=42)[0]
+
+    flat = np.full(40, 100.0)
+    trend = 100.0 * np.cumprod(np.full(80, 1.002))
+    close = np.concatenate((flat, trend))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + 0.05
+    low = np.minimum(open_, close) - 0.05
+    timestamps = np.arange(len(close)) * 300000.0
+    flat_then_trend = np.column_stack((timestamps, open_, high, low, close, np.full(len(close), 10.0)))
+
+    return {
+        'random_walk_300': random_walk,
+        'flat_then_trend_120': flat_then_trend,
+        'short_10': generate_klines(1, 10, seed=7)[0],
+    }
+
+
+def pandas_engine(ohlcv: np.ndarray, timeframe: str) -> dict:
+    df = calculate_technical_indicators(ccxt_klines_to_df(ohlcv.tolist()), timeframe)
+    return {column: df[column].to_numpy(dtype=np.float64) for column in TIMEFRAME_COLUMNS[timeframe]}
+
+
+def batch_engine(ohlcv: np.ndarray, timeframe: str) -> dict:
+    result = calculate_indicators_batch(ohlcv[None], timeframe)
+    return {column: np.asarray(result[column][0], dtype=np.float64) for column in TIMEFRAME_COLUMNS[timeframe]}
+
+
+def streaming_engine(ohlcv: np.ndarray, timeframe: str) -> dict:
+    """
+    流式引擎逐根计入全部K线，每根的返回值组成整列
+    预热区的NaN按 pandas 的 bfill().ffill() 规则填充后再比较（实盘只取最后一根，预热后不受影响）；
+    全量计算时逐根为纯Python循环，耗时高于 pandas，优势在于每轮只计入新收盘的K线
+    """
+    columns = TIMEFRAME_COLUMNS[timeframe]
+    state = IndicatorState(timeframe, history=1)
+    rows = [state.commit(candle) for candle in ohlcv.tolist()]
+    values = np.array([[row[column] for row in rows] for column in columns], dtype=np.float64)
+    return dict(zip(columns, _bfill_ffill(values)))
+
+
+# 指标实现：(N, 6) K线 + 周期 -> {列名: 数组}，pandas 为基准实现
+ENGINES = {
+    'pandas': pandas_engine,
+    'batch': batch_engine,
+    'streaming': streaming_engine,
+}
+
+
+def sample_rows(count: int) -> list:
+    rows = set(range(min(60, count))) | set(range(0, count, 25)) | set(range(max(0, count - 10), count))
+    return sorted(rows)
+
+
+def golden_values(engine) -> dict:
+    golden = {}
+    for name, ohlcv in fixtures().items():
+        rows = sample_rows(len(ohlcv))
+        golden[name] = {'rows': rows}
+        for timeframe in TIMEFRAMES:
+            columns = engine(ohlcv, timeframe)
+            golden[name][timeframe] = {
+                column: {'values': values[rows].tolist(), 'sum': float(np.nansum(values))}
+                for column, values in columns.items()
+            }
+    return golden
+
+
+def max_error(actual: np.ndarray, expected: np.ndarray, floor: float = 1e-12) -> float:
+    """
+    最大相对误差；NaN 位置必须一致（不一致时返回 inf）
+    :param floor: 相对误差分母的下限（MACD 等在0附近的指标按价格量级比较，避免 0 附近的浮点舍入误差被放大）
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    expected = np.asarray(expected, dtype=np.float64)
+    if not np.array_equal(np.isnan(actual), np.isnan(expected)):
+        return float('inf')
+    mask = ~np.isnan(expected)
+    if not mask.any():
+        return 0.0
+    scale = np.maximum(np.abs(expected[mask]), floor)
+    return float(np.max(np.abs(actual[mask] - expected[mask]) / scale))
+
+
+def price_floor(ohlcv: np.ndarray) -> float:
+    """相对误差分母下限：样本价格量级的 1e-3（价格单位的指标在0附近时按价格量级计算误差）"""
+    return max(float(np.max(np.abs(ohlcv[:, 4]))) * 1e-3, 1e-12)
+
+
+def check_golden(engine, golden: dict, rtol: float) -> bool:
+    print(f"{'样本':<22}{'周期':<6}{'最大相对误差':>14}  结果  {'最差指标'}")
+    ok = True
+    for name, ohlcv in fixtures().items():
+        rows = golden[name]['rows']
+        floor = price_floor(ohlcv)
+        for timeframe in TIMEFRAMES:
+            columns = engine(ohlcv, timeframe)
+            worst, worst_column = 0.0, ''
+            for column, expected in golden[name][timeframe].items():
+                if column not in columns:
+                    worst, worst_column = float('inf'), f"{column}(缺失)"
+                    break
+                values = columns[column]
+                error = max(max_error(values[rows], expected['values'], floor),
+                            max_error([np.nansum(values)], [expected['sum']], floor * len(values)))
+                if error > worst:
+                    worst, worst_column = error, column
+            passed = worst <= rtol
+            ok = ok and passed
+            print(f"{name:<22}{timeframe:<6}{worst:>14.2e}  {'✅' if passed else '❌'}  {worst_column}")
+    return ok
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_timing(engine_name: str, bars_list, repeat: int):
+    engine = ENGINES[engine_name]
+    compare = engine_name != 'pandas'
+    header = f"{'周期':<6}{'K线数':>10}{'pandas(ms)':>14}"
+    if compare:
+        header += f"{engine_name + '(ms)':>14}{'加速比':>10}{'最大相对误差':>16}"
+    print(header)
+    for timeframe in TIMEFRAMES:
+        for bars in bars_list:
+            ohlcv = generate_klines(1, bars, seed=bars)[0]
+            frame = ccxt_klines_to_df(ohlcv.tolist())
+            # 只计指标计算（不含列表转DataFrame）；函数会在传入的DataFrame上加列，每次用副本
+            pandas_time = best_of(lambda: calculate_technical_indicators(frame.copy(), timeframe), repeat)
+            line = f"{timeframe:<6}{bars:>10}{pandas_time * 1000:>14.2f}"
+            if compare:
+                engine_time = best_of(lambda: engine(ohlcv, timeframe), repeat)
+                expected = pandas_engine(ohlcv, timeframe)
+                actual = engine(ohlcv, timeframe)
+                error = max(max_error(actual[c], expected[c], price_floor(ohlcv)) for c in expected)
+                line += f"{engine_time * 1000:>14.2f}{pandas_time / engine_time:>9.1f}x{error:>16.2e}"
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='指标金标准与耗时测试')
+    parser.add_argument('--engine', default='pandas', choices=sorted(ENGINES))
+    parser.add_argument('--bars', type=int, nargs='+', default=[100, 1000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--rtol', type=float, default=1e-9, help='与金标准比较的最大相对误差')
+    parser.add_argument('--update', action='store_true', help='用 pandas 实现重新生成金标准文件')
+    parser.add_argument('--skip-timing', action='store_true')
+    args = parser.parse_args()
+
+    if args.update:
+        os.makedirs(os.path.dirname(GOLDEN_FILE), exist_ok=True)
+        with open(GOLDEN_FILE, 'w', encoding='utf-8') as f:
+            json.dump(golden_values(pandas_engine), f, indent=1)
+        print(f"✅ 金标准已更新: {GOLDEN_FILE}")
+        return
+
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        golden = json.load(f)
+    print(f"🔍 金标准检查（{args.engine}，允许相对误差 {args.rtol:g}）\n")
+    ok = check_golden(ENGINES[args.engine], golden, args.rtol)
+
+    if not args.skip_timing:
+        print(f"\n⏱️ 各周期耗时（最好的 {args.repeat} 次）\n")
+        run_timing(args.engine, args.bars, args.repeat)
+
+    if not ok:
+        print("\n❌ 与金标准不一致")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
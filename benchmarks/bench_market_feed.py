@@ -0,0 +1,95 @@
+"""
+行情推送基准测试 - 对比每轮用REST逐个请求K线与从 WebSocket 推送缓冲读取内存
+
+在本地启动回放服务器（合成数据），同一份数据分别通过 /ohlcv REST接口和 /ws 推送提供。
+报告：推送缓冲预热耗时、每轮扫描REST请求耗时、每轮内存读取耗时。
+
+用法:
+    python3 benchmarks/bench_market_feed.py
+    python3 benchmarks/bench_market_feed.py --coins 7 50 --limit 100 --rounds 5 --speed 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from market_feed import MarketFeed, ReplayExchange
+from replay_server import ReplayServer, generate_recording
+
+TIMEFRAMES = ['5m', '15m', '1h', '4h']
+
+
+def rest_scan(base_url: str, symbols, limit: int) -> int:
+    """逐个请求所有 (交易对, 周期) 的K线，返回请求次数"""
+    requests = 0
+    for symbol in symbols:
+        for timeframe in TIMEFRAMES:
+            query = urllib.parse.urlencode({'symbol': symbol, 'timeframe': timeframe, 'limit': limit})
+            with urllib.request.urlopen(f"{base_url}/ohlcv?{query}") as response:
+                json.loads(response.read())
+            requests += 1
+    return requests
+
+
+def feed_scan(feed: MarketFeed, symbols, limit: int) -> int:
+    """从推送缓冲读取所有 (交易对, 周期) 的K线，返回命中次数"""
+    return sum(feed.ohlcv(symbol, timeframe, limit) is not None for symbol in symbols for timeframe in TIMEFRAMES)
+
+
+def median(values):
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行情推送基准测试')
+    parser.add_argument('--coins', type=int, nargs='+', default=[7, 50])
+    parser.add_argument('--limit', type=int, default=100, help='每个周期读取的K线根数')
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--speed', type=float, default=10, help='回放速度（每秒推进的5分钟K线根数）')
+    args = parser.parse_args()
+
+    # 4小时K线需要 limit 根，合成数据按此生成足够的5分钟K线
+    bars = (args.limit + 12) * 48
+    print(f"{'币种数':>6}{'预热(s)':>10}{'REST请求数':>12}{'REST(ms)':>12}{'内存命中':>10}{'内存(ms)':>12}{'加速比':>10}")
+    for coins in args.coins:
+        symbols = [f"C{i:03d}/USDT" for i in range(coins)]
+        server = ReplayServer(generate_recording(symbols, bars=bars), speed=args.speed, warmup=args.limit + 1)
+        ws_url = server.run_in_thread(port=0)
+        base_url = ws_url.replace('ws://', 'http://').rsplit('/ws', 1)[0]
+
+        feed = MarketFeed(lambda: ReplayExchange(ws_url), symbols, TIMEFRAMES, max_bars=args.limit * 2)
+        start = time.perf_counter()
+        feed.start()
+        while feed_scan(feed, symbols, args.limit) < coins * len(TIMEFRAMES):
+            if time.perf_counter() - start > 60:
+                print("❌ 推送缓冲60秒内未预热完成")
+                break
+            time.sleep(0.05)
+        warmup = time.perf_counter() - start
+
+        rest_times, feed_times = [], []
+        requests = hits = 0
+        for _ in range(args.rounds):
+            t0 = time.perf_counter()
+            requests = rest_scan(base_url, symbols, args.limit)
+            rest_times.append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            hits = feed_scan(feed, symbols, args.limit)
+            feed_times.append(time.perf_counter() - t0)
+
+        rest_ms, feed_ms = median(rest_times) * 1000, median(feed_times) * 1000
+        print(f"{coins:>6}{warmup:>10.2f}{requests:>12}{rest_ms:>12.2f}{hits:>10}{feed_ms:>12.3f}"
+              f"{rest_ms / max(feed_ms, 1e-9):>9.0f}x")
+        feed.stop()
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
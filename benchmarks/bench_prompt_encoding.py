@@ -0,0 +1,158 @@
+"""
+行情提示词编码对比 - 同一轮扫描结果分别用 text / compact 编码，比较字符数、token 数和编码耗时，
+并把 compact 编码解析回数值，检查K线价格和成交量与扫描结果完全一致（无损）
+
+行情来自模拟交易所（src/sim/fake_exchange.py），价格落在其市场信息的最小变动价位（5位有效数字）上，成交量保留3位小数。
+token 数使用 prompt_encoding.count_tokens（安装 tiktoken 时为 cl100k_base 精确计数，否则为估算）。
+
+用法:
+    python3 benchmarks/bench_prompt_encoding.py
+    python3 benchmarks/bench_prompt_encoding.py --coins 20 --seed 3 --show
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from sim import FakeExchange
+from sim.fake_llm import COIN_PATTERN
+from market_scanner import MarketScanner
+from prompt_encoding import (COMPACT_LEGEND, KLINE_COUNTS, build_market_text, count_tokens, price_decimals,
+                             token_counter)
+
+FAKE_COINS = ['ETH', 'SOL', 'BNB', 'XRP', 'DOGE', 'ADA', 'AVAX', 'LINK', 'DOT', 'LTC',
+              'TRX', 'BCH', 'NEAR', 'APT', 'ARB', 'OP', 'SUI', 'HYPE', 'ASTER', 'PEPE']
+
+
+def scan_market_data(args) -> tuple:
+    """在模拟交易所上扫描一轮，返回 (market_data, {币种: 最小变动价位})"""
+    with open(args.config, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    coins = [c['symbol'].split('/')[0] for c in config['coins']]
+    coins += [coin for coin in FAKE_COINS if coin not in coins]
+    config['coins'] = [{'symbol': f"{coin}/USDT", 'min_order_value': 13} for coin in coins[:args.coins]]
+    config['exchange'] = 'fake'
+    scanner_config = config.setdefault('scanner', {})
+    scanner_config.update(candle_store=False, prescreen={'top_n': 0})
+
+    workdir = tempfile.mkdtemp(prefix='bench_prompt_')
+    config_file = os.path.join(workdir, 'coins_config.json')
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+
+    exchange = FakeExchange({'fake': {'seed': args.seed,
+                                      'symbols': [c['symbol'] for c in config['coins']] + ['BTC/USDT']}})
+    exchange.load_markets()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scanner = MarketScanner(exchange, config_file)
+        market_data = scanner.scan_all_markets()
+    ticks = {coin: scanner.symbols.get(coin).market['precision']['price'] for coin in market_data}
+    return market_data, ticks
+
+
+def timed(fn, repeat: int):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def parse_compact(text: str) -> dict:
+    """把 compact 编码解析回 {币种: {周期: [(o, h, l, c, v), ...]}}"""
+    parsed, coin, timeframe = {}, None, None
+    for line in text.splitlines():
+        match = COIN_PATTERN.match(line)
+        if match:
+            coin = match.group(1)
+            parsed[coin] = {}
+            timeframe = None
+        elif line.endswith(' o,h,l,c,v'):
+            timeframe = line.split()[0]
+            parsed[coin][timeframe] = []
+        elif timeframe and line.count(',') == 4:
+            rows = parsed[coin][timeframe]
+            fields = line.split(',')
+            # 开盘价为空：等于上一根收盘价
+            open_p = float(fields[0]) if fields[0] else rows[-1][3]
+            rows.append((open_p,) + tuple(float(x) for x in fields[1:]))
+        else:
+            timeframe = None
+    return parsed
+
+
+def check_lossless(market_data: dict, compact: dict, ticks: dict) -> tuple:
+    """返回 (价格最大误差（以最小变动价位计）, 成交量最大相对误差, 缺失的K线段数)"""
+    worst_price, worst_volume, missing = 0.0, 0.0, 0
+    for coin, data in market_data.items():
+        for timeframe, count in KLINE_COUNTS.items():
+            klines = data.get(f"kline_{timeframe}")
+            if not klines:
+                continue
+            expected = [(k.open, k.high, k.low, k.close, k.volume) for k in klines[-count:]]
+            actual = compact.get(coin, {}).get(timeframe, [])
+            if len(actual) != len(expected):
+                missing += 1
+                continue
+            for row_expected, row_actual in zip(expected, actual):
+                for e, a in zip(row_expected[:4], row_actual[:4]):
+                    worst_price = max(worst_price, abs(e - a) / ticks[coin])
+                e, a = row_expected[4], row_actual[4]
+                if e:
+                    worst_volume = max(worst_volume, abs(e - a) / abs(e))
+    return worst_price, worst_volume, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行情提示词编码对比')
+    parser.add_argument('--coins', type=int, default=5, help='币种数（配置中的币种不足时用常见币种补足）')
+    parser.add_argument('--config', default=os.path.join(PROJECT_ROOT, 'config', 'coins_config.json'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-reduction', type=float, default=50, help='compact 相对 text 至少减少的 token 百分比')
+    parser.add_argument('--show', action='store_true', help='打印第一个币种的 compact 编码')
+    args = parser.parse_args()
+
+    market_data, ticks = scan_market_data(args)
+    decimals = {coin: price_decimals(data['price'], ticks[coin]) for coin, data in market_data.items()}
+
+    results = {}
+    for encoding in ('text', 'compact'):
+        text, seconds = timed(lambda: build_market_text(market_data, encoding, decimals), args.repeat)
+        tokens, count_seconds = timed(lambda: count_tokens(text), args.repeat)
+        results[encoding] = {'text': text, 'chars': len(text), 'tokens': tokens,
+                             'encode_ms': seconds * 1000, 'count_ms': count_seconds * 1000}
+
+    coins = len(market_data)
+    print(f"\n{coins} 个币种 | token 计数: {token_counter()} | 系统提示词格式说明 {count_tokens(COMPACT_LEGEND)} tokens（各轮不变，可命中前缀缓存）\n")
+    print(f"{'编码':<10}{'字符数':>10}{'tokens':>10}{'每币种tokens':>14}{'编码(ms)':>10}{'计数(ms)':>10}")
+    for encoding, r in results.items():
+        print(f"{encoding:<10}{r['chars']:>10}{r['tokens']:>10}{r['tokens'] / max(1, coins):>14.0f}"
+              f"{r['encode_ms']:>10.2f}{r['count_ms']:>10.2f}")
+
+    reduction = (1 - results['compact']['tokens'] / results['text']['tokens']) * 100
+    worst_price, worst_volume, missing = check_lossless(market_data, parse_compact(results['compact']['text']), ticks)
+    print(f"\ncompact 减少 {reduction:.1f}% tokens（目标 ≥ {args.min_reduction:g}%）")
+    print(f"价格最大误差 {worst_price:.3f} 个最小变动价位 | 成交量最大相对误差 {worst_volume:.1e} | K线段缺失 {missing}")
+
+    if args.show:
+        first = results['compact']['text'].split('\n\n')[1]
+        print(f"\n{first}")
+
+    ok = reduction >= args.min_reduction and worst_price == 0 and worst_volume == 0 and missing == 0
+    if not ok:
+        print("\n❌ 未达到目标或存在信息损失")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
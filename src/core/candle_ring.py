@@ -0,0 +1,166 @@
+"""
+K线环形缓冲 - 每个 (交易对, 周期) 一个固定容量的结构化 NumPy 数组
+每根K线 48 字节（int64 时间戳 + float64 OHLCV；可选 float32，28 字节），追加为均摊 O(1)，最近N根的窗口是零拷贝视图
+"""
+from typing import List
+
+import numpy as np
+
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def candle_dtype(price_dtype=np.float64) -> np.dtype:
+    """K线记录类型：timestamp(int64 毫秒) + open/high/low/close/volume"""
+    return np.dtype([('timestamp', np.int64)] + [(name, price_dtype) for name in OHLCV_FIELDS])
+
+
+CANDLE_DTYPE = candle_dtype(np.float64)
+
+
+def _round_significant(values: np.ndarray, digits: int) -> np.ndarray:
+    """按有效数字四舍五入（0、inf、nan 原样返回）"""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        exponent = np.floor(np.log10(np.abs(values)))
+        decimals = np.where(np.isfinite(exponent), digits - 1 - exponent, 0)
+        scale = 10.0 ** np.abs(decimals)
+        # 小数位为负时先除后乘，保证 scale 是精确的整数
+        rounded = np.where(decimals >= 0, np.round(values * scale) / scale, np.round(values / scale) * scale)
+    return np.where(np.isfinite(rounded), rounded, values)
+
+
+def widen_float32(values: np.ndarray) -> np.ndarray:
+    """
+    float32 -> float64，取能还原出同一 float32 的最短十进制数（6~9位有效数字）
+    直接转换会带出二进制展开的噪声（3456.78 -> 3456.780029296875），交易所给出的价格/成交量
+    有效数字不超过 float32 的精度时，还原结果与原值一致
+    """
+    stored = np.asarray(values, dtype=np.float32)
+    out = stored.astype(np.float64)
+    pending = np.isfinite(out) & (out != 0)
+    for digits in (6, 7, 8, 9):
+        if not pending.any():
+            break
+        candidate = _round_significant(out[pending], digits)
+        exact = candidate.astype(np.float32) == stored[pending]
+        index = np.flatnonzero(pending)[exact]
+        out[index] = candidate[exact]
+        pending[index] = False
+    return out
+
+
+def as_ohlcv_array(candles) -> np.ndarray:
+    """CCXT格式K线列表、(N, 6) 数组或结构化K线数组 -> (N, 6) float64 数组（float32 字段按 widen_float32 还原）"""
+    if isinstance(candles, np.ndarray) and candles.dtype.names:
+        out = np.empty((len(candles), 6), dtype=np.float64)
+        out[:, 0] = candles['timestamp']
+        for i, name in enumerate(OHLCV_FIELDS, start=1):
+            column = candles[name]
+            out[:, i] = widen_float32(column) if column.dtype == np.float32 else column
+        return out
+    return np.asarray(candles, dtype=np.float64).reshape(-1, 6)
+
+
+class CandleRing:
+    """
+    固定容量的K线缓冲
+
+    底层数组长度为 capacity + slack，新K线依次写在末尾；写满时把最近 capacity - 1 根复制到新数组的开头
+    （每 slack 根才复制一次，均摊 O(1)），因此最近任意 n（≤ capacity）根K线在内存中总是连续的，
+    window() 直接返回切片视图，不复制数据。内存固定为 (capacity + slack) × 48 字节（float32 为 28 字节），与已写入的根数无关。
+    视图在下一次写入前有效（replace_last 会修改视图中的最后一根）。
+
+    :param capacity: 最多保留的K线根数
+    :param price_dtype: OHLCV 的存储类型，float64（默认，与交易所数据完全一致）或 float32（约7位有效数字，内存约为 float64 的 60%）
+    """
+
+    __slots__ = ('capacity', '_buffer', '_start', '_end')
+
+    def __init__(self, capacity: int, price_dtype=np.float64):
+        self.capacity = max(1, int(capacity))
+        slack = max(16, self.capacity // 4)
+        self._buffer = np.zeros(self.capacity + slack, dtype=candle_dtype(price_dtype))
+        self._start = 0   # 有效数据 [_start, _end)
+        self._end = 0
+
+    @classmethod
+    def from_candles(cls, candles, capacity: int = None, price_dtype=np.float64) -> 'CandleRing':
+        """用已有K线（列表/数组）创建缓冲，超过容量时保留最新的部分"""
+        data = as_ohlcv_array(candles)
+        ring = cls(capacity or len(data), price_dtype)
+        data = data[-ring.capacity:]
+        count = len(data)
+        target = ring._buffer[:count]
+        target['timestamp'] = data[:, 0]
+        for i, name in enumerate(OHLCV_FIELDS, start=1):
+            target[name] = data[:, i]
+        ring._end = count
+        return ring
+
+    def __len__(self):
+        return self._end - self._start
+
+    @property
+    def nbytes(self) -> int:
+        return self._buffer.nbytes
+
+    @property
+    def last_timestamp(self):
+        """最后一根K线的开盘时间（毫秒），为空时返回None"""
+        if self._end == self._start:
+            return None
+        return int(self._buffer['timestamp'][self._end - 1])
+
+    @staticmethod
+    def _row(candle) -> tuple:
+        return (int(candle[0]),) + tuple(float(x) for x in candle[1:6])
+
+    def append(self, candle):
+        """追加一根K线 [timestamp, open, high, low, close, volume]，满时丢弃最旧的一根"""
+        if self._end == len(self._buffer):
+            # 写满：最近 capacity - 1 根移到新数组开头（旧视图仍指向旧数组，不受影响）
+            keep = self._buffer[self._end - self.capacity + 1:self._end]
+            buffer = np.empty_like(self._buffer)
+            buffer[:len(keep)] = keep
+            self._buffer = buffer
+            self._start, self._end = 0, len(keep)
+        self._buffer[self._end] = self._row(candle)
+        self._end += 1
+        if self._end - self._start > self.capacity:
+            self._start += 1
+
+    def replace_last(self, candle):
+        """替换最后一根K线（未收盘K线更新）"""
+        self._buffer[self._end - 1] = self._row(candle)
+
+    def merge(self, candles) -> int:
+        """
+        按时间戳合并：与最后一根相同的替换，更新的追加，更旧的忽略
+        :return: 替换或追加的根数
+        """
+        changed = 0
+        for candle in candles:
+            last = self.last_timestamp
+            if last is not None and candle[0] == last:
+                self.replace_last(candle)
+            elif last is None or candle[0] > last:
+                self.append(candle)
+            else:
+                continue
+            changed += 1
+        return changed
+
+    def window(self, count: int = None) -> np.ndarray:
+        """最近 count 根K线的只读结构化视图（零拷贝），字段: timestamp/open/high/low/close/volume"""
+        size = self._end - self._start
+        count = size if count is None else max(0, min(count, size))
+        view = self._buffer[self._end - count:self._end]
+        view.flags.writeable = False
+        return view
+
+    def to_list(self, count: int = None) -> List[List]:
+        """最近 count 根K线，CCXT格式列表（新列表，调用方可随意修改；float32 价格还原为交易所给出的数值）"""
+        return [[int(row[0])] + row[1:] for row in self.to_array(count).tolist()]
+
+    def to_array(self, count: int = None) -> np.ndarray:
+        """最近 count 根K线，(N, 6) float64 数组"""
+        return as_ohlcv_array(self.window(count))
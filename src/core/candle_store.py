@@ -0,0 +1,66 @@
+"""
+K线磁盘存储 - 按 (交易所, 交易对, 周期) 保存为 .npy 文件，重启后用内存映射直接读取
+目录结构: data/candles/<exchange>/<BTC_USDT>/<5m>.npy，内容为 (N, 6) float64 数组
+（列: timestamp, open, high, low, close, volume）
+"""
+import os
+import re
+import threading
+from typing import List, Optional
+
+import numpy as np
+
+
+class CandleStore:
+    """
+    K线磁盘存储
+
+    - load(): np.load(mmap_mode='r') 内存映射读取，不解析、不复制
+    - save(): 写入临时文件后原子替换，进程中途退出不会留下损坏的文件
+    """
+
+    def __init__(self, root: str, exchange_id: str, max_bars: int = 5000):
+        self.root = os.path.join(root, exchange_id)
+        self.max_bars = max_bars
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.saves = 0
+
+    def _path(self, symbol: str, timeframe: str) -> str:
+        # ETH/USDT:USDT -> ETH_USDT_USDT
+        safe_symbol = re.sub(r'[^A-Za-z0-9]+', '_', symbol).strip('_')
+        return os.path.join(self.root, safe_symbol, f"{timeframe}.npy")
+
+    def load(self, symbol: str, timeframe: str) -> Optional[np.ndarray]:
+        """读取已保存的K线（只读内存映射），不存在或文件损坏时返回None"""
+        path = self._path(symbol, timeframe)
+        if not os.path.exists(path):
+            return None
+        try:
+            candles = np.load(path, mmap_mode='r')
+        except (OSError, ValueError) as e:
+            print(f"⚠️ [{symbol} {timeframe}] K线存储文件损坏，忽略: {e}")
+            return None
+        if candles.ndim != 2 or candles.shape[1] != 6:
+            return None
+        with self._lock:
+            self.loads += 1
+        return candles
+
+    def save(self, symbol: str, timeframe: str, klines: List):
+        """保存最近 max_bars 根K线"""
+        path = self._path(symbol, timeframe)
+        candles = np.asarray(klines[-self.max_bars:], dtype=np.float64).reshape(-1, 6)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                np.save(f, candles)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️ [{symbol} {timeframe}] 保存K线失败: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        with self._lock:
+            self.saves += 1
@@ -0,0 +1,97 @@
+"""
+分片决策合并 - 分片模式下各组币种分别请求AI，合并各分片的决策，并按全局资金保留规则统一检查开仓金额
+
+各分片只看到本组币种的行情，无法知道其他分片的开仓计划，因此开仓/加仓的保证金总额在合并后统一限制:
+    最大可用保证金 = min(账户总资产 × (100 - 保留比例)% - 已用保证金, 可用余额)
+按决策顺序（即币种顺序）依次占用，超出部分缩减到剩余额度，剩余额度低于最小开仓金额时跳过该决策；
+平仓释放的保证金不计入（平仓和开仓在同一轮执行，按保守口径计算）。
+"""
+import math
+from typing import Dict, List, Optional
+
+OPEN_ACTIONS = ('OPEN_LONG', 'OPEN_SHORT', 'ADD')
+RISK_ORDER = ['LOW', 'MEDIUM', 'HIGH']
+
+
+def shard_coins(coins: List[str], shard_size: int) -> List[List[str]]:
+    """按顺序每 shard_size 个币种一组；shard_size 为0或不小于币种数时只有一组"""
+    if not shard_size or shard_size >= len(coins):
+        return [list(coins)]
+    return [coins[i:i + shard_size] for i in range(0, len(coins), shard_size)]
+
+
+def _coin_name(coin) -> str:
+    return str(coin or '').split('/')[0].upper()
+
+
+def merge_shard_decisions(shards: List[List[str]], results: List[Optional[Dict]]) -> Dict:
+    """
+    合并各分片的解析结果
+    - decisions: 按分片顺序拼接，只保留分片内币种的决策（分片回复了其他币种时忽略）
+    - strategy: 各分片策略用 " | " 连接；risk_level 取最高，confidence 取最低
+    :param results: 各分片解析出的 {'decisions': [...], 'strategy': ...}，失败的分片为None
+    """
+    decisions, strategies, risks, confidences = [], [], [], []
+    for coins, data in zip(shards, results):
+        if not data:
+            continue
+        allowed = {_coin_name(coin) for coin in coins}
+        for decision in data.get('decisions') or []:
+            if _coin_name(decision.get('coin')) in allowed:
+                decisions.append(decision)
+            else:
+                print(f"⚠️ 分片 {'/'.join(coins)} 返回了其他币种 {decision.get('coin')} 的决策，已忽略")
+        if data.get('strategy'):
+            strategies.append(f"{'/'.join(coins)}: {data['strategy']}")
+        if data.get('risk_level') in RISK_ORDER:
+            risks.append(data['risk_level'])
+        if data.get('confidence') in RISK_ORDER:
+            confidences.append(data['confidence'])
+    return {
+        'decisions': decisions,
+        'strategy': ' | '.join(strategies) if strategies else '无操作',
+        'risk_level': max(risks, key=RISK_ORDER.index) if risks else 'LOW',
+        'confidence': min(confidences, key=RISK_ORDER.index) if confidences else 'LOW',
+    }
+
+
+def enforce_cash_reserve(decisions: List[Dict], account_info: Dict, min_cash_reserve_percent: float,
+                         min_order_values: Dict[str, float] = None, global_min_order_value: float = 10) -> List[Dict]:
+    """
+    按资金保留规则限制开仓/加仓的保证金总额，返回调整后的决策列表（被跳过的开仓决策不在其中）
+    :param min_order_values: 各币种的最小开仓保证金 {币种: USDT}
+    :param global_min_order_value: 全局最小开仓保证金（与执行时的检查一致）
+    """
+    min_order_values = min_order_values or {}
+    total_balance = account_info.get('total_balance', 0)
+    available = min(total_balance * (100 - min_cash_reserve_percent) / 100 - account_info.get('used_margin', 0),
+                    account_info.get('free_balance', 0))
+    remaining = max(0.0, available)
+
+    requested = sum(float(d.get('position_value') or 0) for d in decisions if d.get('action') in OPEN_ACTIONS)
+    if requested <= remaining:
+        return decisions
+
+    print(f"⚖️ 资金保留: 各分片开仓合计 {requested:.2f} USDT > 最大可用保证金 {remaining:.2f} USDT，按币种顺序调整")
+    kept = []
+    for decision in decisions:
+        if decision.get('action') not in OPEN_ACTIONS:
+            kept.append(decision)
+            continue
+        coin = _coin_name(decision.get('coin'))
+        value = float(decision.get('position_value') or 0)
+        if value <= remaining:
+            remaining -= value
+            kept.append(decision)
+            continue
+        reduced = math.floor(remaining * 100) / 100
+        minimum = max(global_min_order_value, float(min_order_values.get(coin, 0) or 0))
+        if reduced >= minimum:
+            print(f"   {coin} {decision['action']}: 保证金 {value:.2f} → {reduced:.2f} USDT")
+            decision['position_value'] = reduced
+            decision['reason'] = f"{decision.get('reason', '')}（资金保留规则：保证金 {value:.2f} → {reduced:.2f} USDT）"
+            remaining = 0.0
+            kept.append(decision)
+        else:
+            print(f"   {coin} {decision['action']}: 跳过 {value:.2f} USDT（剩余可用 {remaining:.2f} USDT < 最小开仓 {minimum:.2f} USDT）")
+    return kept
@@ -0,0 +1,92 @@
+"""
+流式决策解析 - AI 回复按片段到达时，逐字符扫描 "decisions" 数组，每个元素（决策对象）一完整就立即解析返回，
+不必等整个回复结束；数组之后的 strategy / risk_level 等字段仍由完整回复解析
+
+    parser = DecisionStreamParser(safe_json_parse)
+    for piece in stream:
+        for decision in parser.feed(piece):
+            ...  # {'coin': 'ETH', 'action': 'CLOSE', ...}
+"""
+import json
+import re
+from typing import Callable, Dict, List, Optional
+
+DECISIONS_START = re.compile(r'"decisions"\s*:\s*\[')
+
+
+class DecisionStreamParser:
+    """
+    增量解析 {"decisions": [{...}, {...}], ...} 中的决策对象
+
+    - feed(piece): 追加回复片段，返回本次新完成的决策（包含 coin 和 action 的对象）
+    - text: 目前收到的完整回复
+    - done: decisions 数组是否已结束
+
+    :param parse: 单个决策对象的解析函数（JSON 字符串 -> dict 或 None），默认 json.loads，
+                  传入 portfolio_manager.safe_json_parse 可复用其容错处理
+    """
+
+    def __init__(self, parse: Callable[[str], Optional[Dict]] = json.loads):
+        self.parse = parse
+        self.text = ''
+        self.done = False
+        self._pos = 0
+        self._in_array = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._start = None
+
+    def feed(self, piece: str) -> List[Dict]:
+        self.text += piece
+        decisions = []
+        if self.done:
+            return decisions
+        if not self._in_array:
+            match = DECISIONS_START.search(self.text, self._pos)
+            if not match:
+                # 键名可能被拆在两个片段之间，保留末尾一段下次重新匹配
+                self._pos = max(self._pos, len(self.text) - 32)
+                return decisions
+            self._in_array = True
+            self._pos = match.end()
+
+        text = self.text
+        for i in range(self._pos, len(text)):
+            char = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in '{[':
+                if self._depth == 0 and char == '{':
+                    self._start = i
+                self._depth += 1
+            elif char in '}]':
+                if self._depth == 0:
+                    # decisions 数组结束
+                    self.done = True
+                    self._pos = i + 1
+                    return decisions
+                self._depth -= 1
+                if self._depth == 0 and self._start is not None:
+                    decision = self._parse(text[self._start:i + 1])
+                    if decision is not None:
+                        decisions.append(decision)
+                    self._start = None
+        self._pos = len(text)
+        return decisions
+
+    def _parse(self, json_str: str) -> Optional[Dict]:
+        try:
+            decision = self.parse(json_str)
+        except ValueError:
+            return None
+        if isinstance(decision, dict) and 'coin' in decision and 'action' in decision:
+            return decision
+        return None
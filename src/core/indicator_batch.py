@@ -0,0 +1,151 @@
+"""
+批量技术指标计算 - 在 (币种, K线, OHLCV) 的 NumPy 张量上一次性计算所有币种的指标
+计算口径与 market_scanner.calculate_technical_indicators 一致（含 bfill().ffill() 的预热填充）
+"""
+from typing import Dict, List
+
+import numpy as np
+
+from indicator_spec import TIMEFRAME_COLUMNS
+from candle_ring import as_ohlcv_array
+
+# EMA 分块长度：块内用累加和闭式求解，块间传递状态，避免 decay^-n 溢出
+_EMA_BLOCK = 256
+
+
+def stack_klines(klines_by_coin: List[List], bars: int = None) -> np.ndarray:
+    """
+    将多个币种的CCXT格式K线（或 CandleRing.window() 结构化数组）堆叠为 (币种, K线, 6) 的float数组
+    （列: timestamp, open, high, low, close, volume），各币种取相同的最近 bars 根（默认取最短币种的长度）
+    """
+    length = min(len(k) for k in klines_by_coin)
+    if bars is not None:
+        length = min(length, bars)
+    return np.stack([as_ohlcv_array(k[len(k) - length:]) for k in klines_by_coin])
+
+
+def _ema(x: np.ndarray, span: int) -> np.ndarray:
+    """沿 axis=1 计算 EMA，等价于 pandas ewm(span, adjust=True, min_periods=1)"""
+    decay = 1 - 2 / (span + 1)
+    coins, bars = x.shape
+    numerator = np.empty_like(x)
+    carry = np.zeros(coins)
+    for start in range(0, bars, _EMA_BLOCK):
+        block = x[:, start:start + _EMA_BLOCK]
+        steps = np.arange(block.shape[1])
+        # num_t = decay^(t+1) * carry + decay^t * Σ x_i * decay^-i
+        scaled = np.cumsum(block * decay ** -steps, axis=1)
+        numerator[:, start:start + block.shape[1]] = (
+            decay ** (steps + 1) * carry[:, None] + decay ** steps * scaled
+        )
+        carry = numerator[:, start + block.shape[1] - 1]
+    denominator = (1 - decay ** (np.arange(bars) + 1)) / (1 - decay)
+    return numerator / denominator
+
+
+def _rolling_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """沿 axis=1 的滚动均值，前 window-1 根为NaN"""
+    offset = x[:, :1]
+    cumsum = np.cumsum(x - offset, axis=1)
+    result = np.full_like(x, np.nan)
+    result[:, window - 1:] = cumsum[:, window - 1:]
+    result[:, window:] -= cumsum[:, :-window]
+    result[:, window - 1:] = result[:, window - 1:] / window + offset
+    return result
+
+
+def _rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """沿 axis=1 的滚动样本标准差（ddof=1），前 window-1 根为NaN"""
+    centered = x - x[:, :1]
+    mean = _rolling_mean(centered, window)
+    mean_sq = _rolling_mean(centered ** 2, window)
+    variance = (mean_sq - mean ** 2) * window / (window - 1)
+    return np.sqrt(np.maximum(variance, 0))
+
+
+def _bfill_ffill(x: np.ndarray) -> np.ndarray:
+    """沿 axis=1 先向后填充再向前填充NaN（等价于 df.bfill().ffill()）"""
+    bars = x.shape[1]
+    valid = ~np.isnan(x)
+    positions = np.arange(bars)
+    # bfill：每个位置取其后（含自身）第一个有效值
+    next_valid = np.where(valid, positions, bars)
+    next_valid = np.minimum.accumulate(next_valid[:, ::-1], axis=1)[:, ::-1]
+    # ffill：之后仍为空（末尾NaN）的位置取其前最后一个有效值
+    prev_valid = np.where(valid, positions, -1)
+    prev_valid = np.maximum.accumulate(prev_valid, axis=1)
+    source = np.where(next_valid < bars, next_valid, prev_valid)
+    rows = np.arange(x.shape[0])[:, None]
+    filled = x[rows, np.clip(source, 0, bars - 1)]
+    filled[source < 0] = np.nan
+    return filled
+
+
+def calculate_indicators_batch(ohlcv: np.ndarray, timeframe: str = '5m', indicators: List[str] = None) -> Dict[str, np.ndarray]:
+    """
+    一次向量化计算所有币种的技术指标
+
+    :param ohlcv: (币种, K线, 5) 的 OHLCV 数组，或 (币种, K线, 6) 的 CCXT 格式（首列为时间戳）
+    :param timeframe: 周期，indicators 为空时按周期输出完整指标列（与 calculate_technical_indicators 相同）
+    :param indicators: 需要的指标列表（见 indicator_spec.INDICATOR_GROUPS）
+    :return: {指标列名: (币种, K线) 数组}，另含 open/high/low/close/volume
+    """
+    data = np.asarray(ohlcv, dtype=float)[..., -5:]
+    open_, high, low, close, volume = (data[..., i] for i in range(5))
+    columns = list(indicators) if indicators is not None else TIMEFRAME_COLUMNS.get(timeframe, TIMEFRAME_COLUMNS['15m'])
+    result = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+
+    # 真实波幅：第一根K线为 high - low
+    prev_close = np.concatenate((np.full((close.shape[0], 1), np.nan), close[:, :-1]), axis=1)
+    true_range = np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+    result['true_range'] = true_range
+    if 'atr_14' in columns:
+        result['atr_14'] = _rolling_mean(true_range, 14)
+
+    # MACD 需要 EMA12/26，即使未单独声明也要计算
+    has_macd = any(name in columns for name in ('macd', 'macd_signal', 'macd_histogram'))
+    emas = {}
+    for span in (12, 20, 26, 50):
+        if f'ema_{span}' in columns or (has_macd and span in (12, 26)):
+            emas[span] = _ema(close, span)
+            if f'ema_{span}' in columns:
+                result[f'ema_{span}'] = emas[span]
+
+    if has_macd:
+        macd = emas[12] - emas[26]
+        macd_signal = _ema(macd, 9)
+        result['macd'] = macd
+        result['macd_signal'] = macd_signal
+        result['macd_histogram'] = macd - macd_signal
+
+    rsi_columns = [name for name in ('rsi_14', 'rsi') if name in columns]
+    if rsi_columns:
+        delta = np.diff(close, axis=1, prepend=close[:, :1])
+        gain = _rolling_mean(np.where(delta > 0, delta, 0.0), 14)
+        loss = _rolling_mean(np.where(delta < 0, -delta, 0.0), 14)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + gain / loss)
+        for name in rsi_columns:
+            result[name] = rsi
+
+    sma = {}
+    for window in (20, 50):
+        if f'sma_{window}' in columns:
+            sma[window] = result[f'sma_{window}'] = _rolling_mean(close, window)
+
+    if any(name in columns for name in ('bb_middle_20', 'bb_upper_20', 'bb_lower_20', 'bb_position')):
+        bb_middle = sma[20] if 20 in sma else _rolling_mean(close, 20)
+        bb_std = _rolling_std(close, 20)
+        bb_upper = bb_middle + bb_std * 2
+        bb_lower = bb_middle - bb_std * 2
+        result['bb_middle_20'] = bb_middle
+        result['bb_upper_20'] = bb_upper
+        result['bb_lower_20'] = bb_lower
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result['bb_position'] = (close - bb_lower) / (bb_upper - bb_lower)
+
+    # 预热期的NaN按 pandas 的 bfill().ffill() 规则填充
+    for name in columns:
+        if name in result:
+            result[name] = _bfill_ffill(result[name])
+    return result
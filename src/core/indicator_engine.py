@@ -0,0 +1,267 @@
+"""
+流式技术指标引擎 - 每根K线收盘时O(1)增量更新指标
+与 market_scanner.calculate_technical_indicators 的 pandas 计算口径保持一致
+"""
+import math
+from collections import deque
+from typing import Dict, List
+
+import ccxt
+
+from indicator_spec import INDICATOR_GROUPS, TIMEFRAME_COLUMNS
+
+
+class _EMA:
+    """指数移动平均，等价于 pandas ewm(span, adjust=True, min_periods=1)"""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.num = 0.0
+        self.den = 0.0
+
+    def peek(self, x: float) -> float:
+        return (x + self.decay * self.num) / (1 + self.decay * self.den)
+
+    def update(self, x: float) -> float:
+        self.num = x + self.decay * self.num
+        self.den = 1 + self.decay * self.den
+        return self.num / self.den
+
+
+class _Rolling:
+    """
+    固定窗口的滚动均值/标准差（窗口未满时返回NaN，等价于 pandas rolling(window)）
+
+    维护窗口内 (x - shift) 的累加和与平方和，入窗/出窗各一次加减，每根K线O(1)；
+    临时值只在累加和上叠加新值、扣除将被挤出的最旧值，不复制窗口。
+    shift 取窗口最旧值以减小平方和的抵消误差，每 window 次写入按窗口重新求和一次（均摊O(1)），避免误差累积。
+    窗口内全部相等时（如RSI的涨幅全为0）直接返回该值、标准差为0，与 pandas 的精确结果一致。
+    """
+
+    __slots__ = ('window', 'values', 'shift', 'total', 'total_sq', 'same', 'pushes')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.shift = 0.0
+        self.total = 0.0      # sum(x - shift)
+        self.total_sq = 0.0   # sum((x - shift) ** 2)
+        self.same = 0         # 末尾连续相等的值的个数
+        self.pushes = 0       # 距上次重新求和的写入次数
+
+    def _resync(self):
+        self.shift = self.values[0] if self.values else 0.0
+        self.total = self.total_sq = 0.0
+        for v in self.values:
+            d = v - self.shift
+            self.total += d
+            self.total_sq += d * d
+        self.pushes = 0
+
+    def _with(self, x: float):
+        """加入 x 后的 (根数, 末尾相等个数, 累加和, 平方和)，不改变状态"""
+        d = x - self.shift
+        total = self.total + d
+        total_sq = self.total_sq + d * d
+        count = len(self.values) + 1
+        if count > self.window:
+            old = self.values[0] - self.shift
+            total -= old
+            total_sq -= old * old
+            count = self.window
+        same = self.same + 1 if self.values and self.values[-1] == x else 1
+        return count, same, total, total_sq
+
+    def _push(self, x: float, same: int, total: float, total_sq: float):
+        self.values.append(x)
+        self.same, self.total, self.total_sq = same, total, total_sq
+        self.pushes += 1
+        if self.pushes >= self.window:
+            self._resync()
+
+    def mean(self, x: float, commit: bool) -> float:
+        shift = self.shift  # 写入可能触发重新求和并改变 shift
+        count, same, total, total_sq = self._with(x)
+        if commit:
+            self._push(x, same, total, total_sq)
+        if count < self.window:
+            return math.nan
+        if same >= self.window:
+            return x
+        return shift + total / self.window
+
+    def mean_std(self, x: float, commit: bool):
+        shift = self.shift
+        count, same, total, total_sq = self._with(x)
+        if commit:
+            self._push(x, same, total, total_sq)
+        if count < self.window:
+            return math.nan, math.nan
+        if same >= self.window:
+            return x, 0.0
+        mean = total / self.window
+        variance = max(0.0, (total_sq - total * mean) / (self.window - 1))
+        return shift + mean, math.sqrt(variance)
+
+
+class IndicatorState:
+    """
+    单个 (交易对, 周期) 的指标状态
+
+    - commit(): 一根K线收盘后调用，把它计入状态
+    - provisional(): 用正在形成的K线计算临时指标，不改变状态
+    - series(): 最近 history 根已收盘K线的指标值（可附带临时值），用于RSI/MACD序列
+
+    columns 为需要输出的指标（默认按周期输出完整指标列），只为用到的指标组保存状态。
+    """
+
+    def __init__(self, timeframe: str, history: int = 10, columns=None):
+        self.timeframe = timeframe
+        self.columns = list(columns) if columns is not None else TIMEFRAME_COLUMNS.get(timeframe, TIMEFRAME_COLUMNS['15m'])
+        self.last_timestamp = None
+        self.prev_close = None
+        self.count = 0
+        self.history = deque(maxlen=history)
+
+        groups = {INDICATOR_GROUPS[col] for col in self.columns}
+        spans = {int(col.split('_')[1]) for col in self.columns if col.startswith('ema_')}
+        if 'macd' in groups:
+            spans.update((12, 26))
+        self._ema = {span: _EMA(span) for span in sorted(spans)}
+        self._macd_signal = _EMA(9) if 'macd' in groups else None
+        self._gain = _Rolling(14) if 'rsi' in groups else None
+        self._loss = _Rolling(14) if 'rsi' in groups else None
+        self._true_range = _Rolling(14) if 'atr' in groups else None
+        # 收盘价滚动窗口：SMA20 与布林带中轨共用同一个20根窗口
+        windows = {int(col.split('_')[1]) for col in self.columns if col.startswith('sma_')}
+        if 'bb' in groups:
+            windows.add(20)
+        self._bb = 'bb' in groups
+        self._close_windows = {window: _Rolling(window) for window in sorted(windows)}
+
+    def _step(self, candle, commit: bool) -> Dict:
+        _, _, high, low, close, _ = candle[:6]
+        prev_close = self.prev_close
+        values = {}
+
+        for span, ema in self._ema.items():
+            values[f'ema_{span}'] = ema.update(close) if commit else ema.peek(close)
+        if self._macd_signal is not None:
+            macd = values['ema_12'] - values['ema_26']
+            macd_signal = self._macd_signal.update(macd) if commit else self._macd_signal.peek(macd)
+            values.update(macd=macd, macd_signal=macd_signal, macd_histogram=macd - macd_signal)
+
+        if self._gain is not None:
+            # RSI：第一根K线的涨跌按0计入（与 delta.where(...) 的结果一致）
+            delta = close - prev_close if prev_close is not None else 0.0
+            gain = self._gain.mean(delta if delta > 0 else 0.0, commit)
+            loss = self._loss.mean(-delta if delta < 0 else 0.0, commit)
+            if math.isnan(gain) or math.isnan(loss) or (gain == 0 and loss == 0):
+                rsi = math.nan
+            elif loss == 0:
+                rsi = 100.0
+            else:
+                rsi = 100 - 100 / (1 + gain / loss)
+            values['rsi_14'] = values['rsi'] = rsi
+
+        if self._true_range is not None:
+            # ATR：第一根K线的真实波幅为 high - low
+            if prev_close is None:
+                true_range = high - low
+            else:
+                true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            values['atr_14'] = self._true_range.mean(true_range, commit)
+
+        for window, rolling in self._close_windows.items():
+            if window == 20 and self._bb:
+                bb_middle, bb_std = rolling.mean_std(close, commit)
+                bb_upper = bb_middle + bb_std * 2
+                bb_lower = bb_middle - bb_std * 2
+                bb_width = bb_upper - bb_lower
+                values.update(bb_middle_20=bb_middle, bb_upper_20=bb_upper, bb_lower_20=bb_lower,
+                              bb_position=(close - bb_lower) / bb_width if bb_width else math.nan)
+                values['sma_20'] = bb_middle
+            else:
+                values[f'sma_{window}'] = rolling.mean(close, commit)
+
+        if commit:
+            self.prev_close = close
+            self.last_timestamp = candle[0]
+            self.count += 1
+
+        values = {col: values[col] for col in self.columns}
+        if commit:
+            self.history.append(values)
+        return values
+
+    def commit(self, candle) -> Dict:
+        """计入一根已收盘K线，返回该K线的指标值"""
+        return self._step(candle, commit=True)
+
+    def provisional(self, candle) -> Dict:
+        """用未收盘K线计算临时指标（不改变状态）"""
+        return self._step(candle, commit=False)
+
+    def series(self, column: str, count: int, provisional: Dict = None) -> List[float]:
+        """最近 count 个指标值（从旧到新），provisional 不为空时把临时值作为最后一个"""
+        values = [v[column] for v in self.history]
+        if provisional is not None:
+            values.append(provisional[column])
+        return values[-count:]
+
+
+class IndicatorEngine:
+    """
+    流式指标引擎 - 每个 (交易对, 周期) 一个 IndicatorState
+
+    update() 接收与 fetch_ohlcv 相同格式的K线列表（最后一根为未收盘K线）：
+    只把上次之后新收盘的K线逐根计入状态（每根O(1)），再用最后一根计算临时值。
+    首次调用或K线出现缺口时用传入的全部K线重新预热，此时结果与 pandas 全量计算一致；
+    之后状态持续累积，EMA 比 pandas 在固定窗口上的计算拥有更长的历史（差异随窗口长度指数衰减）。
+    """
+
+    def __init__(self, history: int = 10, columns: Dict[str, List[str]] = None):
+        """
+        :param columns: 各周期需要输出的指标 {timeframe: [指标, ...]}，未给出的周期输出完整指标列
+        """
+        self.history = history
+        self.columns = columns or {}
+        self._states = {}
+
+    def state(self, symbol: str, timeframe: str) -> IndicatorState:
+        return self._states.get((symbol, timeframe))
+
+    def update(self, symbol: str, timeframe: str, klines: List) -> Dict:
+        """
+        用最新K线更新指标
+        :return: 最后一根（未收盘）K线的临时指标值
+        """
+        if not klines:
+            return {}
+        key = (symbol, timeframe)
+        state = self._states.get(key)
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        closed = klines[:-1]
+
+        if state is not None and state.last_timestamp is not None:
+            new_closed = [k for k in closed if k[0] > state.last_timestamp]
+            # 出现缺口（中间有K线未计入）时重新预热
+            if new_closed and new_closed[0][0] != state.last_timestamp + timeframe_ms:
+                state = None
+            elif not new_closed and closed and closed[-1][0] < state.last_timestamp:
+                state = None
+        if state is None or state.last_timestamp is None:
+            state = IndicatorState(timeframe, self.history, self.columns.get(timeframe))
+            new_closed = closed
+            self._states[key] = state
+
+        for candle in new_closed:
+            state.commit(candle)
+        return state.provisional(klines[-1])
+
+    def series(self, symbol: str, timeframe: str, column: str, count: int, provisional: Dict = None) -> List[float]:
+        """最近 count 个指标值（从旧到新），与 df[column].tail(count) 对应"""
+        state = self._states.get((symbol, timeframe))
+        if state is None:
+            return []
+        return state.series(column, count, provisional)
@@ -0,0 +1,73 @@
+"""
+指标声明 - 每个使用方在各周期需要哪些指标（coins_config.json 的 indicators 字段）
+指标计算（pandas / 流式 / 批量）只计算声明过的指标及其依赖
+"""
+from typing import Dict, List, Tuple
+
+
+# 支持的指标 -> 所属计算组（同组共享中间结果，如 MACD 复用 EMA12/26，ATR 复用真实波幅）
+INDICATOR_GROUPS = {
+    'ema_12': 'ema', 'ema_20': 'ema', 'ema_26': 'ema', 'ema_50': 'ema',
+    'sma_20': 'sma', 'sma_50': 'sma',
+    'rsi': 'rsi', 'rsi_14': 'rsi',
+    'macd': 'macd', 'macd_signal': 'macd', 'macd_histogram': 'macd',
+    'atr_14': 'atr',
+    'bb_middle_20': 'bb', 'bb_upper_20': 'bb', 'bb_lower_20': 'bb', 'bb_position': 'bb',
+}
+
+# 未指定指标时各周期输出的完整指标列（旧版 calculate_technical_indicators 的列）
+TIMEFRAME_COLUMNS = {
+    '5m': ['atr_14'],
+    '15m': ['ema_20', 'ema_50', 'rsi_14', 'ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'atr_14'],
+    '1h': ['ema_20', 'ema_50', 'rsi', 'ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'atr_14',
+           'bb_middle_20', 'bb_upper_20', 'bb_lower_20', 'bb_position'],
+    '4h': ['ema_20', 'ema_50', 'rsi', 'ema_12', 'ema_26', 'macd', 'macd_signal', 'macd_histogram', 'atr_14'],
+}
+
+# 默认声明：scan = 币种扫描（scan_coin / get_coin_*_data），btc_context = BTC市场背景
+DEFAULT_INDICATOR_SPEC = {
+    'scan': {
+        '5m': ['atr_14'],
+        '15m': ['ema_20', 'ema_50', 'rsi_14', 'macd', 'macd_signal', 'atr_14'],
+        '1h': ['ema_20', 'ema_50', 'atr_14', 'bb_upper_20', 'bb_middle_20', 'bb_lower_20', 'bb_position'],
+        '4h': ['ema_20', 'ema_50', 'atr_14'],
+    },
+    'btc_context': {
+        '15m': ['rsi_14', 'macd', 'atr_14'],
+        '1h': ['rsi', 'macd', 'atr_14', 'sma_20', 'sma_50'],
+        '4h': ['rsi', 'macd', 'sma_20', 'sma_50'],
+    },
+}
+
+
+class IndicatorSpec:
+    """
+    指标声明 - 配置中的 indicators 覆盖默认声明（按 使用方 -> 周期 逐项覆盖）
+
+    - columns(consumer, timeframe): 该使用方在该周期需要的指标
+    - union(timeframe): 所有使用方在该周期需要的指标（流式引擎按交易对共享状态时使用）
+    """
+
+    def __init__(self, config_spec: Dict = None):
+        self.spec = {consumer: dict(timeframes) for consumer, timeframes in DEFAULT_INDICATOR_SPEC.items()}
+        for consumer, timeframes in (config_spec or {}).items():
+            for timeframe, names in timeframes.items():
+                self.spec.setdefault(consumer, {})[timeframe] = self._validate(consumer, timeframe, names)
+
+    @staticmethod
+    def _validate(consumer: str, timeframe: str, names: List[str]) -> List[str]:
+        unknown = [name for name in names if name not in INDICATOR_GROUPS]
+        if unknown:
+            print(f"⚠️ 指标声明 {consumer}.{timeframe} 包含不支持的指标，已忽略: {', '.join(unknown)}")
+        return [name for name in names if name in INDICATOR_GROUPS]
+
+    def columns(self, consumer: str, timeframe: str) -> Tuple[str, ...]:
+        return tuple(self.spec.get(consumer, {}).get(timeframe, ()))
+
+    def union(self, timeframe: str) -> Tuple[str, ...]:
+        names = []
+        for timeframes in self.spec.values():
+            for name in timeframes.get(timeframe, ()):
+                if name not in names:
+                    names.append(name)
+        return tuple(names)
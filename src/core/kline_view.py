@@ -0,0 +1,79 @@
+"""
+紧凑K线视图 - 扫描结果中保存最近N根K线的 OHLCV，供AI提示词使用
+数据保存在一个 (N, 6) 的 NumPy 数组中，时间字符串只在读取时才格式化
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from candle_ring import as_ohlcv_array
+
+
+class KlineRow:
+    """单根K线（只包含提示词需要的字段）"""
+
+    __slots__ = ('timestamp_ms', 'open', 'high', 'low', 'close', 'volume')
+
+    def __init__(self, timestamp_ms, open_, high, low, close, volume):
+        self.timestamp_ms = timestamp_ms
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @property
+    def timestamp(self) -> str:
+        """UTC时间字符串（按需格式化）"""
+        return datetime.fromtimestamp(self.timestamp_ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d %H:%M')
+
+    def __getitem__(self, key):
+        # 兼容按字典方式读取：row['close']
+        return getattr(self, key)
+
+    def to_dict(self) -> dict:
+        return {'timestamp': self.timestamp, 'open': self.open, 'high': self.high,
+                'low': self.low, 'close': self.close, 'volume': self.volume}
+
+
+class KlineView:
+    """
+    最近 count 根K线的只读视图
+
+    :param klines: CCXT格式K线列表 [[timestamp, open, high, low, close, volume], ...]、同形状的数组或结构化K线数组
+    :param count: 保留的根数（取最后 count 根），None 表示全部
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, klines, count: int = None):
+        data = as_ohlcv_array(klines)
+        if count is not None:
+            data = data[-count:] if count > 0 else data[:0]
+        self._data = data
+
+    def __len__(self):
+        return len(self._data)
+
+    def __bool__(self):
+        return len(self._data) > 0
+
+    def __iter__(self):
+        for ts, o, h, l, c, v in self._data.tolist():
+            yield KlineRow(int(ts), o, h, l, c, v)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            view = KlineView.__new__(KlineView)
+            view._data = self._data[index]
+            return view
+        return KlineRow(int(self._data[index, 0]), *self._data[index, 1:].tolist())
+
+    @property
+    def array(self) -> np.ndarray:
+        """(N, 6) 原始数组：timestamp, open, high, low, close, volume"""
+        return self._data
+
+    def to_dicts(self) -> list:
+        """转换为旧版字典列表（timestamp 为UTC字符串）"""
+        return [row.to_dict() for row in self]
@@ -0,0 +1,316 @@
+"""
+WebSocket 行情推送 - 后台持续订阅K线和Ticker，扫描时直接读取内存中的K线缓冲
+数据源可以是交易所（ccxt.pro 的 watch_ohlcv / watch_ticker），也可以是本地回放服务器（replay_server.py）
+"""
+import time
+import json
+import asyncio
+import threading
+from typing import Dict, List, Optional
+
+import ccxt
+
+
+class ReplayExchange:
+    """
+    回放服务器客户端 - 提供与 ccxt.pro 相同的 watch_ohlcv / watch_ticker / close 接口
+
+    协议（JSON文本消息）：
+    - 客户端订阅: {"op": "subscribe", "type": "ohlcv", "symbol": "BTC/USDT", "timeframe": "5m"}
+                  {"op": "subscribe", "type": "ticker", "symbol": "BTC/USDT"}
+    - 服务器推送: {"type": "ohlcv", "symbol": ..., "timeframe": ..., "data": [[ts, o, h, l, c, v], ...]}
+                  {"type": "ticker", "symbol": ..., "data": {"symbol": ..., "last": ..., "timestamp": ...}}
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._session = None
+        self._ws = None
+        self._reader = None
+        self._queues = {}
+        self._connect_lock = None
+
+    async def _ensure_connected(self):
+        import aiohttp
+
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._ws is not None and not self._ws.closed:
+                return
+            if self._session is None:
+                self._session = aiohttp.ClientSession()
+            self._ws = await self._session.ws_connect(self.url, heartbeat=30)
+            self._reader = asyncio.ensure_future(self._read_loop(self._ws))
+            # 重连后重新订阅
+            for key in self._queues:
+                await self._send_subscribe(key)
+
+    async def _read_loop(self, ws):
+        import aiohttp
+
+        try:
+            async for message in ws:
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                key = (payload['type'], payload['symbol'], payload.get('timeframe'))
+                queue = self._queues.get(key)
+                if queue is not None:
+                    queue.put_nowait(payload['data'])
+        finally:
+            # 连接断开：唤醒所有等待中的订阅，由调用方重连
+            for queue in self._queues.values():
+                queue.put_nowait(ConnectionError(f"回放服务器连接断开: {self.url}"))
+
+    async def _send_subscribe(self, key):
+        kind, symbol, timeframe = key
+        message = {'op': 'subscribe', 'type': kind, 'symbol': symbol}
+        if timeframe is not None:
+            message['timeframe'] = timeframe
+        await self._ws.send_str(json.dumps(message))
+
+    async def _watch(self, key):
+        if key not in self._queues:
+            self._queues[key] = asyncio.Queue()
+            await self._ensure_connected()
+            await self._send_subscribe(key)
+        else:
+            await self._ensure_connected()
+        data = await self._queues[key].get()
+        if isinstance(data, Exception):
+            raise data
+        return data
+
+    async def watch_ohlcv(self, symbol: str, timeframe: str = '5m', since=None, limit=None, params={}):
+        return await self._watch(('ohlcv', symbol, timeframe))
+
+    async def watch_ticker(self, symbol: str, params={}):
+        return await self._watch(('ticker', symbol, None))
+
+    async def close(self):
+        if self._ws is not None:
+            await self._ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+
+
+class MarketFeed:
+    """
+    后台行情推送 - 每个 (交易对, 周期) 一个订阅协程，在独立线程的事件循环中运行
+
+    - ohlcv(symbol, timeframe, limit): 缓冲已预热且数据新鲜时返回最近 limit 根K线，否则返回None（调用方改用REST）
+    - seed(symbol, timeframe, klines): 用REST下载的历史K线预热缓冲（推送只提供最近几根K线）
+    - ticker(symbol): 最新Ticker（数据新鲜时）
+    K线出现缺口或订阅断线时清空对应缓冲，下次读取时由REST重新预热。
+
+    :param exchange_factory: 在事件循环线程中调用，返回带 watch_ohlcv / watch_ticker 的异步交易所对象
+    :param max_bars: 每个缓冲最多保留的K线根数
+    :param stale_seconds: 超过该秒数没有收到推送即视为过期
+    """
+
+    def __init__(self, exchange_factory, symbols: List[str], timeframes: List[str],
+                 max_bars: int = 1000, stale_seconds: float = 120):
+        self.exchange_factory = exchange_factory
+        self.symbols = list(symbols)
+        self.timeframes = list(timeframes)
+        self.max_bars = max_bars
+        self.stale_seconds = stale_seconds
+        self._candles = {}
+        self._updated = {}
+        self._tickers = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._stopping = False
+        self.hits = 0
+        self.misses = 0
+        self.messages = 0
+
+    def start(self):
+        """启动后台订阅线程"""
+        if self._thread is not None:
+            return
+        self._stopping = False
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name='market-feed', daemon=True)
+        self._thread.start()
+        print(f"📡 行情推送已启动: {len(self.symbols)}个交易对 × {', '.join(self.timeframes)}")
+
+    def stop(self, timeout: float = 5):
+        """停止订阅并关闭连接"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        if self._loop.is_running():
+            self._loop.call_soon_threadsafe(self._cancel_tasks)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _cancel_tasks(self):
+        for task in asyncio.all_tasks(self._loop):
+            task.cancel()
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        except Exception as e:
+            if not self._stopping:
+                print(f"❌ 行情推送线程退出: {e}")
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        exchange = self.exchange_factory()
+        tasks = [self._watch_ohlcv(exchange, s, tf) for s in self.symbols for tf in self.timeframes]
+        tasks += [self._watch_ticker(exchange, s) for s in self.symbols]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            pass
+        finally:
+            try:
+                await exchange.close()
+            except Exception:
+                pass
+
+    async def _watch_ohlcv(self, exchange, symbol: str, timeframe: str):
+        delay = 1
+        while not self._stopping:
+            try:
+                candles = await exchange.watch_ohlcv(symbol, timeframe)
+                self._merge(symbol, timeframe, candles)
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 断线期间的K线无法补齐，清空缓冲等待REST重新预热
+                self._invalidate(symbol, timeframe)
+                print(f"⚠️ [{symbol} {timeframe}] 行情订阅中断，{delay}秒后重连: {str(e)[:100]}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    async def _watch_ticker(self, exchange, symbol: str):
+        delay = 1
+        while not self._stopping:
+            try:
+                ticker = await exchange.watch_ticker(symbol)
+                with self._lock:
+                    self._tickers[symbol] = (time.time(), ticker)
+                    self.messages += 1
+                delay = 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ [{symbol}] Ticker订阅中断，{delay}秒后重连: {str(e)[:100]}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 60)
+
+    def _merge(self, symbol: str, timeframe: str, candles: List, seeding: bool = False):
+        """按时间戳合并K线：相同时间戳替换（未收盘K线更新），更新的追加，缺口时清空"""
+        if not candles:
+            return
+        key = (symbol, timeframe)
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        with self._lock:
+            buffer = self._candles.get(key, [])
+            if seeding:
+                newer = [c for c in buffer if c[0] > candles[-1][0]]
+                buffer = [list(c) for c in candles]
+                incoming = newer
+            else:
+                incoming = candles
+                self.messages += 1
+                # 推送的数据比缓冲旧（缓冲来自另一数据源，如回放时用REST预热），以推送为准
+                if buffer and incoming[-1][0] < buffer[-1][0] - timeframe_ms:
+                    buffer = []
+            for candle in incoming:
+                if buffer and candle[0] == buffer[-1][0]:
+                    buffer[-1] = list(candle)
+                elif not buffer or candle[0] == buffer[-1][0] + timeframe_ms:
+                    buffer.append(list(candle))
+                elif candle[0] > buffer[-1][0]:
+                    # 出现缺口：丢弃旧数据，从这根开始重新积累
+                    buffer = [list(candle)]
+            self._candles[key] = buffer[-self.max_bars:]
+            self._updated[key] = time.time()
+
+    def _invalidate(self, symbol: str, timeframe: str):
+        with self._lock:
+            self._candles.pop((symbol, timeframe), None)
+            self._updated.pop((symbol, timeframe), None)
+
+    def seed(self, symbol: str, timeframe: str, klines: List):
+        """用REST历史K线预热缓冲（保留推送中更新的K线）"""
+        if (symbol, timeframe) not in {(s, tf) for s in self.symbols for tf in self.timeframes}:
+            return
+        self._merge(symbol, timeframe, klines, seeding=True)
+
+    def ohlcv(self, symbol: str, timeframe: str, limit: int) -> Optional[List]:
+        """从内存读取最近 limit 根K线；缓冲不足或过期时返回None"""
+        key = (symbol, timeframe)
+        with self._lock:
+            buffer = self._candles.get(key)
+            fresh = buffer is not None and time.time() - self._updated.get(key, 0) <= self.stale_seconds
+            if not fresh or len(buffer) < limit:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [list(c) for c in buffer[-limit:]]
+
+    def ticker(self, symbol: str) -> Optional[Dict]:
+        """最新Ticker（过期返回None）"""
+        with self._lock:
+            item = self._tickers.get(symbol)
+        if item is None or time.time() - item[0] > self.stale_seconds:
+            return None
+        return item[1]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0.0,
+                'messages': self.messages,
+                'buffers': len(self._candles),
+            }
+
+
+def create_market_feed(exchange, symbols: List[str], timeframes: List[str], feed_config: Dict) -> Optional[MarketFeed]:
+    """
+    根据 scanner.market_feed 配置创建行情推送
+    - mode=exchange: 使用 ccxt.pro 订阅交易所（与REST使用相同的交易所和市场类型）
+    - mode=replay: 连接本地回放服务器 replay_url
+    """
+    mode = feed_config.get('mode', 'off')
+    if mode == 'exchange':
+        try:
+            import ccxt.pro as ccxtpro
+        except ImportError:
+            print("⚠️ 当前 ccxt 版本不包含 ccxt.pro，行情推送未启用")
+            return None
+        exchange_class = getattr(ccxtpro, exchange.id, None)
+        if exchange_class is None:
+            print(f"⚠️ ccxt.pro 不支持 {exchange.id}，行情推送未启用")
+            return None
+
+        def factory():
+            return exchange_class({'enableRateLimit': True, 'options': dict(exchange.options)})
+    elif mode == 'replay':
+        url = feed_config.get('replay_url', 'ws://127.0.0.1:8765/ws')
+
+        def factory():
+            return ReplayExchange(url)
+    else:
+        return None
+
+    return MarketFeed(
+        factory, symbols, timeframes,
+        max_bars=int(feed_config.get('max_bars', 1000)),
+        stale_seconds=float(feed_config.get('stale_seconds', 120)),
+    )
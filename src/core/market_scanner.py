@@ -4,8 +4,12 @@
 """
 import os
 import sys
+import time
+import threading
+import numpy as np
 import pandas as pd
 import ccxt
+from concurrent.futures import ThreadPoolExecutor, wait
 from typing import Dict, List
 import json
 
@@ -16,112 +20,89 @@ PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(_
 # 添加src目录到Python路径
 sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
 
-# 导入重试装饰器
+# 导入重试装饰器和节流器
 from utils.retry_decorator import retry_on_api_error
+from utils.rate_limiter import RateLimiter
+from utils.request_cache import RequestCache
+from indicator_engine import IndicatorEngine
+from indicator_spec import IndicatorSpec, TIMEFRAME_COLUMNS
+from kline_view import KlineView
+from market_feed import create_market_feed
+from candle_store import CandleStore
+from candle_ring import CandleRing
+from symbol_registry import SymbolRegistry, format_symbol_for_exchange
+from universe_screener import UniverseScreener
 
 
-def format_symbol_for_exchange(base_symbol, exchange_obj):
+def calculate_technical_indicators(df, timeframe='5m', indicators=None):
     """
-    根据交易所类型格式化symbol
-    :param base_symbol: 基础symbol格式，如 "ETH/USDT"
-    :param exchange_obj: CCXT交易所对象
-    :return: 格式化后的symbol
+    计算技术指标（只计算需要的指标，同组指标共享中间结果）
+    :param timeframe: 周期，indicators 为空时按周期输出完整指标列（TIMEFRAME_COLUMNS）
+    :param indicators: 需要的指标列表（见 indicator_spec.INDICATOR_GROUPS）
     """
-    # Gate.io 的 swap 市场需要添加 settle 货币后缀
-    if exchange_obj.id == 'gateio' and 'defaultType' in exchange_obj.options:
-        if exchange_obj.options['defaultType'] == 'swap':
-            return f"{base_symbol}:USDT"
-    return base_symbol
+    try:
+        if indicators is None:
+            indicators = TIMEFRAME_COLUMNS.get(timeframe, TIMEFRAME_COLUMNS['15m'])
+        close = df['close']
+        cache = {}
 
+        def ema(span):
+            if span not in cache:
+                cache[span] = close.ewm(span=span, min_periods=1).mean()
+            return cache[span]
 
-def calculate_technical_indicators(df, timeframe='5m'):
-    """根据不同的时间周期计算相应的技术指标"""
-    try:
-        # 5分钟周期: 无指标
-        if timeframe == '5m':
-            # 即使是5分钟，也需要计算ATR，因为止损逻辑需要它
-            df['high_low'] = df['high'] - df['low']
-            df['high_close'] = abs(df['high'] - df['close'].shift())
-            df['low_close'] = abs(df['low'] - df['close'].shift())
-            df['true_range'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-            df['atr_14'] = df['true_range'].rolling(14).mean()
-            df = df.bfill().ffill()
-            return df
-
-        # 通用计算: EMA(20, 50)
-        if timeframe in ['15m', '1h', '4h']:
-            df['ema_20'] = df['close'].ewm(span=20, min_periods=1).mean()
-            df['ema_50'] = df['close'].ewm(span=50, min_periods=1).mean()
-
-        # 15分钟周期: EMA, RSI, MACD
-        if timeframe == '15m':
-            # RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            df['rsi_14'] = 100 - (100 / (1 + rs))
-            # MACD
-            df['ema_12'] = df['close'].ewm(span=12, min_periods=1).mean()
-            df['ema_26'] = df['close'].ewm(span=26, min_periods=1).mean()
-            df['macd'] = df['ema_12'] - df['ema_26']
-            df['macd_signal'] = df['macd'].ewm(span=9, min_periods=1).mean()
-            df['macd_histogram'] = df['macd'] - df['macd_signal']
-            # ATR for stop loss
-            df['high_low'] = df['high'] - df['low']
-            df['high_close'] = abs(df['high'] - df['close'].shift())
-            df['low_close'] = abs(df['low'] - df['close'].shift())
-            df['true_range'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-            df['atr_14'] = df['true_range'].rolling(14).mean()
-
-
-        # 1小时周期: EMA, RSI, MACD, ATR, Bollinger Bands
-        if timeframe == '1h':
-            # RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            df['rsi'] = 100 - (100 / (1 + rs))
-            # MACD
-            df['ema_12'] = df['close'].ewm(span=12, min_periods=1).mean()
-            df['ema_26'] = df['close'].ewm(span=26, min_periods=1).mean()
-            df['macd'] = df['ema_12'] - df['ema_26']
-            df['macd_signal'] = df['macd'].ewm(span=9, min_periods=1).mean()
-            df['macd_histogram'] = df['macd'] - df['macd_signal']
-            # ATR
-            df['high_low'] = df['high'] - df['low']
-            df['high_close'] = abs(df['high'] - df['close'].shift())
-            df['low_close'] = abs(df['low'] - df['close'].shift())
-            df['true_range'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-            df['atr_14'] = df['true_range'].rolling(14).mean()
-            # Bollinger Bands
-            df['bb_middle_20'] = df['close'].rolling(20).mean()
-            bb_std = df['close'].rolling(20).std()
-            df['bb_upper_20'] = df['bb_middle_20'] + (bb_std * 2)
-            df['bb_lower_20'] = df['bb_middle_20'] - (bb_std * 2)
-            df['bb_position'] = (df['close'] - df['bb_lower_20']) / (df['bb_upper_20'] - df['bb_lower_20'])
-
-        # 4小时周期: EMA, RSI, MACD, ATR
-        if timeframe == '4h':
-            # RSI
-            delta = df['close'].diff()
-            gain = (delta.where(delta > 0, 0)).rolling(14).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-            rs = gain / loss
-            df['rsi'] = 100 - (100 / (1 + rs))
-            # MACD
-            df['ema_12'] = df['close'].ewm(span=12, min_periods=1).mean()
-            df['ema_26'] = df['close'].ewm(span=26, min_periods=1).mean()
-            df['macd'] = df['ema_12'] - df['ema_26']
-            df['macd_signal'] = df['macd'].ewm(span=9, min_periods=1).mean()
-            df['macd_histogram'] = df['macd'] - df['macd_signal']
-            # ATR
-            df['high_low'] = df['high'] - df['low']
-            df['high_close'] = abs(df['high'] - df['close'].shift())
-            df['low_close'] = abs(df['low'] - df['close'].shift())
-            df['true_range'] = df[['high_low', 'high_close', 'low_close']].max(axis=1)
-            df['atr_14'] = df['true_range'].rolling(14).mean()
+        def rolling_close(window):
+            key = ('rolling', window)
+            if key not in cache:
+                cache[key] = close.rolling(window)
+            return cache[key]
+
+        def macd():
+            if 'macd' not in cache:
+                line = ema(12) - ema(26)
+                cache['macd'] = (line, line.ewm(span=9, min_periods=1).mean())
+            return cache['macd']
+
+        def rsi():
+            if 'rsi' not in cache:
+                delta = close.diff()
+                gain = (delta.where(delta > 0, 0)).rolling(14).mean()
+                loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+                cache['rsi'] = 100 - (100 / (1 + gain / loss))
+            return cache['rsi']
+
+        def bollinger():
+            if 'bb' not in cache:
+                middle = rolling_close(20).mean()
+                std = rolling_close(20).std()
+                cache['bb'] = (middle, middle + (std * 2), middle - (std * 2))
+            return cache['bb']
+
+        for name in indicators:
+            if name in ('ema_12', 'ema_20', 'ema_26', 'ema_50'):
+                df[name] = ema(int(name.split('_')[1]))
+            elif name in ('sma_20', 'sma_50'):
+                df[name] = rolling_close(int(name.split('_')[1])).mean()
+            elif name in ('rsi', 'rsi_14'):
+                df[name] = rsi()
+            elif name == 'macd':
+                df[name] = macd()[0]
+            elif name == 'macd_signal':
+                df[name] = macd()[1]
+            elif name == 'macd_histogram':
+                df[name] = macd()[0] - macd()[1]
+            elif name == 'atr_14':
+                # 真实波幅：第一根K线为 high - low
+                high_low = df['high'] - df['low']
+                high_close = abs(df['high'] - close.shift())
+                low_close = abs(df['low'] - close.shift())
+                df['true_range'] = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
+                df[name] = df['true_range'].rolling(14).mean()
+            elif name in ('bb_middle_20', 'bb_upper_20', 'bb_lower_20', 'bb_position'):
+                middle, upper, lower = bollinger()
+                df['bb_middle_20'], df['bb_upper_20'], df['bb_lower_20'] = middle, upper, lower
+                if name == 'bb_position':
+                    df[name] = (close - lower) / (upper - lower)
 
         # 填充NaN值
         df = df.bfill().ffill()
@@ -131,73 +112,489 @@ def calculate_technical_indicators(df, timeframe='5m'):
         return df
 
 
+# 可在同一轮内复用结果的行情接口（账户、持仓、下单类接口不缓存；
+# K线在 _fetch_ohlcv 中按 (symbol, timeframe, limit) 复用，不按增量请求的 since 区分）
+CACHEABLE_METHODS = {
+    'fetch_ticker', 'fetch_tickers',
+    'fetch_funding_rate', 'fetch_funding_rates', 'fetch_open_interest',
+}
+
+def _lookup_symbol(result: Dict, symbol: str):
+    """从批量接口结果中取某个交易对（返回的key可能带结算币后缀，如 ETH/USDT:USDT）"""
+    if not result:
+        return None
+    if symbol in result:
+        return result[symbol]
+    return next((v for k, v in result.items() if k.startswith(f"{symbol}:")), None)
+
+
+# scan_coin 结果中AI分析必需的字段
+REQUIRED_SCAN_FIELDS = ('price', 'change_24h', 'rsi', 'trend_direction', 'trend_strength')
+
+# 本地重采样的基础周期，以及重采样需要的5分钟历史长度（100根4小时K线 + 1根补齐首个桶）
+BASE_TIMEFRAME = '5m'
+RESAMPLE_HISTORY_BARS = 101 * 48
+
+
+def resample_ohlcv(klines, target_timeframe, limit=None):
+    """
+    将基础周期K线（如5分钟）聚合为更大周期K线（15m/1h/4h）
+
+    按 UTC 时间对齐分桶（与交易所一致）：开盘取首根、最高/最低取极值、收盘取末根、成交量求和。
+    历史开头不完整的桶会被丢弃；最后一个桶对应交易所正在形成的K线，予以保留。
+    :param klines: CCXT格式K线 [[timestamp, open, high, low, close, volume], ...]，按时间升序
+    :param target_timeframe: 目标周期，如 '1h'
+    :param limit: 只返回最近 limit 根
+    :return: CCXT格式K线列表
+    """
+    if not klines:
+        return []
+
+    data = np.asarray(klines, dtype=float)
+    timestamps = data[:, 0].astype(np.int64)
+    target_ms = ccxt.Exchange.parse_timeframe(target_timeframe) * 1000
+    buckets = timestamps // target_ms
+
+    # 丢弃开头不完整的桶（首根基础K线不在桶的起点）
+    if timestamps[0] != buckets[0] * target_ms:
+        keep = buckets != buckets[0]
+        data, timestamps, buckets = data[keep], timestamps[keep], buckets[keep]
+        if len(data) == 0:
+            return []
+
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.concatenate((starts[1:], [len(data)])) - 1
+
+    resampled = np.column_stack((
+        buckets[starts] * target_ms,
+        data[starts, 1],
+        np.maximum.reduceat(data[:, 2], starts),
+        np.minimum.reduceat(data[:, 3], starts),
+        data[ends, 4],
+        np.add.reduceat(data[:, 5], starts),
+    ))
+    if limit:
+        resampled = resampled[-limit:]
+    return [[int(row[0])] + [float(v) for v in row[1:]] for row in resampled]
+
+
+def diff_ohlcv(local_klines, exchange_klines) -> Dict:
+    """
+    对比本地重采样K线与交易所原生K线（按开盘时间对齐）
+    :return: {'compared': 对比根数, 'mismatched': 不一致根数, 'max_rel_diff': 最大相对误差}
+    """
+    native = {int(k[0]): k for k in exchange_klines}
+    compared = mismatched = 0
+    max_rel_diff = 0.0
+    for kline in local_klines:
+        other = native.get(int(kline[0]))
+        if other is None:
+            continue
+        compared += 1
+        rel_diff = max(abs(a - b) / max(abs(b), 1e-12) for a, b in zip(kline[1:6], other[1:6]))
+        max_rel_diff = max(max_rel_diff, rel_diff)
+        if rel_diff > 1e-6:
+            mismatched += 1
+    return {'compared': compared, 'mismatched': mismatched, 'max_rel_diff': max_rel_diff}
+
+
 def ccxt_klines_to_df(klines):
     """将CCXT格式的K线数据转换为DataFrame
-    CCXT格式: [timestamp, open, high, low, close, volume]
+    CCXT格式: [timestamp, open, high, low, close, volume]，也可以是 CandleRing.window() 的结构化数组
     """
-    df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    if isinstance(klines, np.ndarray) and klines.dtype.names:
+        df = pd.DataFrame({name: klines[name] for name in klines.dtype.names})
+    else:
+        df = pd.DataFrame(klines, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
     df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
     for col in ['open', 'high', 'low', 'close', 'volume']:
         df[col] = df[col].astype(float)
     return df
 
 
+class OHLCVCache:
+    """
+    K线滚动缓存 - 按 (symbol, timeframe) 保存最近的K线
+
+    首次请求完整下载 limit 根K线；之后只用 fetch_ohlcv(since=最后一根K线的开盘时间)
+    增量获取：最后一根（上次获取时尚未收盘）会被新数据替换，其后的新K线追加到末尾。
+    每轮只传输几根K线，而不是每个币种约600根。
+
+    每个 (symbol, timeframe) 保存在一个容量为 limit 的 CandleRing 中（int64 时间戳 + float64 OHLCV，可选 float32），
+    内存固定、追加为 O(1)。
+
+    传入 store（CandleStore）时，内存中没有的K线先从磁盘读取，重启后只下载停机期间的缺口；
+    flush() 把本轮更新过的K线写回磁盘。
+    """
+
+    def __init__(self, store: CandleStore = None, price_dtype=np.float64):
+        self._rings = {}    # (symbol, timeframe) -> CandleRing
+        self._depth = {}    # (symbol, timeframe) -> 缓存已满足的最大 limit（新上市币种的历史可能不足 limit 根）
+        self._dirty = set()
+        self.store = store
+        self.price_dtype = price_dtype
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.rows_fetched = 0
+
+    def get(self, fetch_fn, symbol: str, timeframe: str, limit: int) -> List:
+        """
+        获取最近 limit 根K线（优先增量更新缓存）
+        :param fetch_fn: 下载函数 fetch_fn(symbol, timeframe, since, limit)
+        :return: CCXT格式K线列表（新列表，调用方可随意修改）
+        """
+        key = (symbol, timeframe)
+        with self._lock:
+            ring = self._rings.get(key)
+        if ring is None and self.store is not None:
+            ring = self._load_from_store(key)
+
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        now_ms = int(time.time() * 1000)
+
+        # 缓存不足或距离上次更新太久（增量部分超过 limit 根），直接完整下载
+        if not ring or self._depth.get(key, 0) < limit or now_ms - ring.last_timestamp >= (limit - 1) * timeframe_ms:
+            candles = fetch_fn(symbol, timeframe, None, limit)
+            return self._replace(key, candles, limit, len(candles))
+
+        since = ring.last_timestamp
+        new_candles = fetch_fn(symbol, timeframe, since, limit)
+
+        if new_candles and new_candles[0][0] > since:
+            # 增量数据与缓存之间出现缺口，放弃缓存重新下载
+            candles = fetch_fn(symbol, timeframe, None, limit)
+            return self._replace(key, candles, limit, len(new_candles) + len(candles))
+
+        # 替换未收盘的最后一根，追加新K线（超过容量的旧K线被覆盖）
+        with self._lock:
+            self.hits += 1
+            self.rows_fetched += len(new_candles)
+            if ring.merge(new_candles):
+                self._dirty.add(key)
+            return ring.to_list(limit)
+
+    def _replace(self, key, candles: List, limit: int, rows_fetched: int) -> List:
+        """完整下载后重建缓冲（容量取 limit 和下载根数中较大者）"""
+        ring = CandleRing.from_candles(candles, max(limit, len(candles), 1), self.price_dtype)
+        with self._lock:
+            self.misses += 1
+            self.rows_fetched += rows_fetched
+            self._rings[key] = ring
+            self._depth[key] = limit
+            self._dirty.add(key)
+            return ring.to_list(limit)
+
+    def _load_from_store(self, key):
+        """从磁盘读取K线作为缓存（已保存的根数视为已满足的深度）"""
+        candles = self.store.load(*key)
+        if candles is None or len(candles) == 0:
+            return None
+        ring = CandleRing.from_candles(candles, len(candles), self.price_dtype)
+        with self._lock:
+            if key in self._rings:
+                return self._rings[key]
+            self._rings[key] = ring
+            self._depth[key] = len(ring)
+        return ring
+
+    def flush(self) -> int:
+        """把更新过的K线写回磁盘，返回写入的文件数"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            dirty = [(key, self._rings[key].to_array()) for key in self._dirty if key in self._rings]
+            self._dirty.clear()
+        for (symbol, timeframe), candles in dirty:
+            self.store.save(symbol, timeframe, candles)
+        return len(dirty)
+
+    def stats(self) -> Dict:
+        """缓存命中统计（memory_bytes: 所有K线缓冲占用的内存）"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': (self.hits / total * 100) if total > 0 else 0.0,
+                'rows_fetched': self.rows_fetched,
+                'series': len(self._rings),
+                'memory_bytes': sum(ring.nbytes for ring in self._rings.values()),
+            }
+
+
 class MarketScanner:
     """市场扫描器 - 获取所有币种的市场数据"""
     
     def __init__(self, exchange, config_file='config/coins_config.json'):
         self.exchange = exchange
         self.config_file = config_file
-        self.coins_config = self.load_config()
+        # 交易对注册表：币种 -> 配置/交易所交易对/合约面值，所有模块共享
+        self.symbols = SymbolRegistry(exchange, config_file)
+        self.coins_config = self.symbols.config
         # 提取币种名称（ETH/USDT -> ETH）
-        self.coins = [c['symbol'].split('/')[0] for c in self.coins_config['coins']]
+        self.coins = self.symbols.coins
+
+        # 扫描器配置：并发扫描（所有币种、所有周期同时请求）
+        self.scanner_config = self.coins_config.get('scanner', {})
+        self.concurrent = self.scanner_config.get('concurrent', True)
+        self.max_workers = max(1, int(self.scanner_config.get('max_workers', 8)))
+        # 多线程共享同一个交易所对象，由节流器统一遵守 enableRateLimit 的限频预算
+        self.rate_limiter = RateLimiter.for_exchange(exchange)
+        self._io_pool = None
+        # 单轮请求缓存：同一轮内BTC背景等模块复用扫描时已获取的数据
+        self.request_cache = RequestCache()
+        # 批量行情统计（资金费率/持仓量/最新价），每轮扫描开始时一次性获取
+        self.bulk_market_stats = self.scanner_config.get('bulk_market_stats', True)
+        self._market_stats = {}
+        self.market_stats_paths = {}
+        # 单轮扫描时间预算（秒）：超时的币种使用上一次成功的快照并标记为过期，0 表示不限制
+        self.scan_budget = float(self.scanner_config.get('scan_budget_seconds', 60))
+        self._snapshots = {}     # coin -> (完成时间, scan_coin 结果)
+        self.coin_latency = {}   # coin -> 最近一次 scan_coin 耗时（秒）
+        self._snapshot_lock = threading.Lock()
+        # 币种扫描线程池（各轮共用，最多 max_workers 个线程）；每轮开始和结束时扫描编号递增，超时后才完成的扫描不写快照
+        self._coin_pool = None
+        self._scan_round = 0
+        self._running = {}       # coin -> 仍在执行的扫描 Future（超时后未完成的扫描，下一轮不重复提交）
+        # 币种预筛选：币种数超过 top_n 时先用批量Ticker排序，只深度扫描排名靠前的币种和持仓币种
+        self.screener = UniverseScreener(self.scanner_config.get('prescreen'))
+        # K线增量缓存（每轮只下载上次之后的新K线）
+        self.ohlcv_cache = None
+        if self.scanner_config.get('ohlcv_cache', True):
+            # K线磁盘存储：重启后从 data/candles 读取，只下载停机期间的缺口
+            store = None
+            if self.scanner_config.get('candle_store', True):
+                store = CandleStore(os.path.join(PROJECT_ROOT, 'data', 'candles'), exchange.id,
+                                    max_bars=max(RESAMPLE_HISTORY_BARS, 1000))
+            # K线价格存储精度：float64（默认，每根48字节）或 float32（每根28字节）
+            price_dtype = np.float32 if self.scanner_config.get('candle_price_dtype') == 'float32' else np.float64
+            self.ohlcv_cache = OHLCVCache(store, price_dtype)
+        self.max_klines_per_request = int(self.scanner_config.get('max_klines_per_request', 1000))
+        # K线来源：exchange=交易所原生各周期 | resample=由5分钟K线本地合成 | verify=两者都取并对比（使用原生结果）
+        self.kline_source = self.scanner_config.get('kline_source', 'exchange')
+        # WebSocket 行情推送：后台保持K线缓冲，扫描时优先读取内存
+        self.market_feed = self._create_market_feed(self.scanner_config.get('market_feed', {}))
+        # 指标声明：各使用方在各周期需要的指标，只计算声明过的指标
+        self.indicator_spec = IndicatorSpec(self.coins_config.get('indicators'))
+        # 分层刷新：这些周期在当前K线收盘前复用上次的K线和指标，只更新未收盘K线的最新价
+        self.refresh_tiers = set(self.scanner_config.get('refresh_tiers', ['1h', '4h']))
+        self._tier_cache = {}  # (symbol, timeframe) -> (未收盘K线开盘时间, klines, 指标)
+        self._tier_lock = threading.Lock()
+        self.tier_stats = {tf: {'reused': 0, 'refreshed': 0} for tf in self.refresh_tiers}
+        # 指标计算：pandas=每轮全量计算 | streaming=流式引擎，每根新收盘K线O(1)增量更新
+        self.indicator_engine = None
+        if self.scanner_config.get('indicator_engine', 'pandas') == 'streaming':
+            # 同一交易对的流式状态由扫描和BTC背景共享，按所有使用方的并集计算
+            self.indicator_engine = IndicatorEngine(
+                columns={tf: self.indicator_spec.union(tf) for tf in TIMEFRAME_COLUMNS}
+            )
     
+    def _create_market_feed(self, feed_config: Dict):
+        """按 scanner.market_feed 配置启动行情推送（mode=off 时返回None）"""
+        if feed_config.get('mode', 'off') == 'off':
+            return None
+        if self.kline_source == 'resample':
+            timeframes = [BASE_TIMEFRAME]
+        else:
+            timeframes = [BASE_TIMEFRAME, '15m', '1h', '4h']
+        max_bars = int(feed_config.get('max_bars', 1000))
+        if self.kline_source != 'exchange':
+            max_bars = max(max_bars, RESAMPLE_HISTORY_BARS)
+        symbols = self.symbols.symbols
+        btc_symbol = self.symbols.exchange_symbol('BTC/USDT')
+        if btc_symbol not in symbols:
+            symbols.append(btc_symbol)
+        feed = create_market_feed(self.exchange, symbols, timeframes, dict(feed_config, max_bars=max_bars))
+        if feed is not None:
+            feed.start()
+        return feed
+
     def load_config(self) -> Dict:
-        """加载币种配置"""
+        """重新加载币种配置（同时重建交易对注册表）"""
+        self.symbols.reload()
+        self.coins_config = self.symbols.config
+        self.coins = self.symbols.coins
+        return self.coins_config
+    
+    def begin_cycle(self):
+        """开始一轮决策的数据获取，之后相同的行情请求只发一次"""
+        if self.symbols.refresh():
+            self.coins_config = self.symbols.config
+            self.coins = self.symbols.coins
+            print(f"🔄 币种配置已变更，交易对注册表已重建: {', '.join(self.coins)}")
+        self.request_cache.begin()
+
+    def flush_candles(self):
+        """把本轮更新的K线写入磁盘存储"""
+        if self.ohlcv_cache is None or self.ohlcv_cache.store is None:
+            return
         try:
-            with open(self.config_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            self.ohlcv_cache.flush()
         except Exception as e:
-            print(f"❌ 加载配置文件失败: {e}")
-            return {'coins': [], 'portfolio_rules': {}}
-    
-    @retry_on_api_error(max_retries=3, delay=2)
-    def get_coin_1h_data(self, coin: str) -> Dict:
-        """获取单个币种的1小时K线数据"""
+            print(f"⚠️ 保存K线存储失败: {e}")
+
+    def end_cycle(self):
+        """结束本轮数据获取，打印请求复用统计并清空缓存"""
+        stats = self.request_cache.stats()
+        self.request_cache.end()
+        print(f"🧩 本轮请求复用: 命中 {stats['hits']} | 等待进行中 {stats['waits']} | 首次请求 {stats['misses']}")
+        self.flush_candles()
+
+    def _request(self, method: str, *args, **kwargs):
+        """调用交易所接口（经过节流器，可在多线程中安全调用；行情接口在一轮内复用结果）"""
+        if method in CACHEABLE_METHODS:
+            key = (method, repr(args), repr(sorted(kwargs.items())))
+            return self.request_cache.call(key, self._call_exchange, method, *args, **kwargs)
+        return self._call_exchange(method, *args, **kwargs)
+
+    def _call_exchange(self, method: str, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return getattr(self.exchange, method)(*args, **kwargs)
+
+    def _run_tasks(self, tasks: Dict) -> Dict:
+        """
+        执行一组互不依赖的请求任务
+        :param tasks: {名称: (函数, 参数...)}
+        :return: {名称: 结果}，任务抛出的异常会在取结果时原样抛出
+        """
+        if not self.concurrent:
+            return {name: fn(*args) for name, (fn, *args) in tasks.items()}
+
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scanner-io')
+        futures = {name: self._io_pool.submit(fn, *args) for name, (fn, *args) in tasks.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+    def _market_stat(self, symbol: str, field: str):
+        """读取本轮批量获取的行情统计，没有时返回None"""
+        return self._market_stats.get(symbol, {}).get(field)
+
+    def fetch_market_stats(self, symbols: List[str], tickers: Dict = None) -> Dict[str, Dict]:
+        """
+        批量获取所有交易对的资金费率、持仓量和最新价
+
+        交易所支持时使用 fetch_funding_rates / fetch_open_interests / fetch_tickers 一次获取全部，
+        否则回退为逐个交易对请求（并发执行）。使用的方式记录在 self.market_stats_paths 中。
+        :param tickers: 已获取的批量Ticker（预筛选时），直接复用不再请求
+        :return: {symbol: {'funding_rate': float|None, 'open_interest': float|None, 'last': float|None}}
+        """
+        self._market_stats = {}
+        stats = {symbol: {'funding_rate': None, 'open_interest': None, 'last': None} for symbol in symbols}
+        has = getattr(self.exchange, 'has', None) or {}
+        paths = {}
+
+        lookup = _lookup_symbol
+
+        # 资金费率
+        if has.get('fetchFundingRates'):
+            try:
+                rates = self._request('fetch_funding_rates', list(symbols))
+                for symbol in symbols:
+                    item = lookup(rates, symbol)
+                    if item and item.get('fundingRate') is not None:
+                        stats[symbol]['funding_rate'] = float(item['fundingRate'])
+                paths['funding_rate'] = ('批量', 1)
+            except Exception as e:
+                print(f"⚠️ 批量获取资金费率失败，改为逐个获取: {e}")
+        if 'funding_rate' not in paths:
+            results = self._run_tasks({symbol: (self._fetch_funding_rate, symbol) for symbol in symbols})
+            for symbol, value in results.items():
+                stats[symbol]['funding_rate'] = value
+            paths['funding_rate'] = ('逐个', len(symbols))
+
+        # 持仓量
+        if has.get('fetchOpenInterests'):
+            try:
+                interests = self._request('fetch_open_interests', list(symbols))
+                for symbol in symbols:
+                    item = lookup(interests, symbol)
+                    if item and item.get('openInterestAmount') is not None:
+                        stats[symbol]['open_interest'] = float(item['openInterestAmount'])
+                paths['open_interest'] = ('批量', 1)
+            except Exception as e:
+                print(f"⚠️ 批量获取持仓量失败，改为逐个获取: {e}")
+        if 'open_interest' not in paths:
+            if has.get('fetchOpenInterest') is False:
+                paths['open_interest'] = ('不支持', 0)
+            else:
+                results = self._run_tasks({symbol: (self._fetch_open_interest, symbol) for symbol in symbols})
+                for symbol, value in results.items():
+                    stats[symbol]['open_interest'] = value
+                paths['open_interest'] = ('逐个', len(symbols))
+
+        # 最新价：只在支持批量时预取，否则由使用方按需单独请求
+        if tickers is not None:
+            for symbol in symbols:
+                item = lookup(tickers, symbol)
+                if item and item.get('last') is not None:
+                    stats[symbol]['last'] = float(item['last'])
+            paths['last'] = ('复用预筛选', 0)
+        elif has.get('fetchTickers'):
+            try:
+                tickers = self._request('fetch_tickers', list(symbols))
+                for symbol in symbols:
+                    item = lookup(tickers, symbol)
+                    if item and item.get('last') is not None:
+                        stats[symbol]['last'] = float(item['last'])
+                paths['last'] = ('批量', 1)
+            except Exception as e:
+                print(f"⚠️ 批量获取最新价失败: {e}")
+        paths.setdefault('last', ('按需', 0))
+
+        self._market_stats = stats
+        self.market_stats_paths = paths
+        summary = " | ".join(
+            f"{name}={path}({count}次请求)" for name, (path, count) in
+            zip(['资金费率', '持仓量', '最新价'], [paths['funding_rate'], paths['open_interest'], paths['last']])
+        )
+        print(f"📦 批量行情: {summary}")
+        return stats
+
+    def _fetch_funding_rate(self, symbol: str):
+        """获取资金费率（优先使用本轮批量结果），失败返回None"""
+        cached = self._market_stat(symbol, 'funding_rate')
+        if cached is not None:
+            return cached
+        try:
+            funding_rate_data = self._request('fetch_funding_rate', symbol)
+            return float(funding_rate_data['fundingRate']) if funding_rate_data and 'fundingRate' in funding_rate_data else 0
+        except Exception as e:
+            print(f"⚠️ [{symbol}] 获取资金费率失败: {e}")
+            return None
+
+    def _fetch_open_interest(self, symbol: str):
+        """获取持仓量（Open Interest，优先使用本轮批量结果），失败或不支持返回None"""
+        cached = self._market_stat(symbol, 'open_interest')
+        if cached is not None:
+            return cached
+        if self.market_stats_paths.get('open_interest', ('',))[0] == '不支持':
+            return None
         try:
-            coin_info = next((c for c in self.coins_config['coins'] if c['symbol'].startswith(f"{coin}/")), None)
+            oi_data = self._request('fetch_open_interest', symbol)
+            return float(oi_data['openInterestAmount']) if oi_data and 'openInterestAmount' in oi_data else 0
+        except ccxt.NotSupported:
+            # 该交易所不支持获取持仓量，静默跳过
+            return None
+        except Exception as e:
+            print(f"⚠️ [{symbol}] 获取持仓量失败: {e}")
+            return None
+
+    def get_coin_1h_data(self, coin: str, base_klines=None) -> Dict:
+        """获取单个币种的1小时K线数据（base_klines: 已获取的5分钟历史，重采样模式下复用）"""
+        try:
+            coin_info = self.symbols.get(coin)
             if not coin_info:
                 return None
             
-            base_symbol = coin_info['symbol']  # CCXT基础格式
-            symbol = format_symbol_for_exchange(base_symbol, self.exchange)
-            
-            # 获取1小时K线
-            klines_1h = self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe='1h',
-                limit=100  # 足够计算EMA(50)和BB(20)
-            )
-            
-            df_1h = ccxt_klines_to_df(klines_1h)
-            
-            # 计算1小时技术指标
-            df_1h = calculate_technical_indicators(df_1h, timeframe='1h')
-            
-            current_1h = df_1h.iloc[-1]
-            
-            # 获取最近10根K线（用于AI分析中期趋势和形态）
-            recent_klines_1h = []
-            for _, row in df_1h.tail(10).iterrows():
-                recent_klines_1h.append({
-                    'timestamp': row['timestamp'].strftime('%Y-%m-%d %H:%M'),
-                    'open': float(row['open']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'close': float(row['close']),
-                    'volume': float(row['volume'])
-                })
+            symbol = coin_info.symbol  # 交易所格式
             
+            # 获取1小时K线和技术指标
+            klines_1h, current_1h = self._timeframe_snapshot(symbol, '1h', 100, base_klines)  # 足够计算EMA(50)和BB(20)
+
+            # 最近10根K线（用于AI分析中期趋势和形态）
+            recent_klines_1h = KlineView(klines_1h, 10)
+
             return {
                 'coin': coin,
                 'timeframe': '1h',
@@ -206,6 +603,7 @@ class MarketScanner:
                 'ema_50': current_1h.get('ema_50', 0),
                 'atr_14': current_1h.get('atr_14', 0),
                 'bb_upper': current_1h.get('bb_upper_20', 0),
+                'bb_middle': current_1h.get('bb_middle_20', 0),
                 'bb_lower': current_1h.get('bb_lower_20', 0),
                 'bb_position': current_1h.get('bb_position', 0),
                 'klines': recent_klines_1h  # 新增：最近10根K线
@@ -215,43 +613,21 @@ class MarketScanner:
             print(f"❌ 获取{coin}的1小时K线失败: {e}")
             return None
     
-    @retry_on_api_error(max_retries=3, delay=2)
-    def get_coin_4h_data(self, coin: str) -> Dict:
-        """获取单个币种的4小时K线数据"""
+    def get_coin_4h_data(self, coin: str, base_klines=None) -> Dict:
+        """获取单个币种的4小时K线数据（base_klines: 已获取的5分钟历史，重采样模式下复用）"""
         try:
-            coin_info = next((c for c in self.coins_config['coins'] if c['symbol'].startswith(f"{coin}/")), None)
+            coin_info = self.symbols.get(coin)
             if not coin_info:
                 return None
             
-            base_symbol = coin_info['symbol']  # CCXT基础格式
-            symbol = format_symbol_for_exchange(base_symbol, self.exchange)
-            
-            # 获取4小时K线
-            klines_4h = self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe='4h',
-                limit=100  # 足够计算EMA(50)
-            )
-            
-            df_4h = ccxt_klines_to_df(klines_4h)
-            
-            # 计算4小时技术指标
-            df_4h = calculate_technical_indicators(df_4h, timeframe='4h')
-            
-            current_4h = df_4h.iloc[-1]
-            
-            # 获取最近6根K线（用于AI分析长期趋势和方向）
-            recent_klines_4h = []
-            for _, row in df_4h.tail(6).iterrows():
-                recent_klines_4h.append({
-                    'timestamp': row['timestamp'].strftime('%Y-%m-%d %H:%M'),
-                    'open': float(row['open']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'close': float(row['close']),
-                    'volume': float(row['volume'])
-                })
+            symbol = coin_info.symbol  # 交易所格式
             
+            # 获取4小时K线和技术指标
+            klines_4h, current_4h = self._timeframe_snapshot(symbol, '4h', 100, base_klines)  # 足够计算EMA(50)
+
+            # 最近6根K线（用于AI分析长期趋势和方向）
+            recent_klines_4h = KlineView(klines_4h, 6)
+
             return {
                 'coin': coin,
                 'timeframe': '4h',
@@ -266,43 +642,21 @@ class MarketScanner:
             print(f"❌ 获取{coin}的4小时K线失败: {e}")
             return None
     
-    @retry_on_api_error(max_retries=3, delay=2)
-    def get_coin_15m_data(self, coin: str) -> Dict:
-        """获取单个币种的15分钟K线数据"""
+    def get_coin_15m_data(self, coin: str, base_klines=None) -> Dict:
+        """获取单个币种的15分钟K线数据（base_klines: 已获取的5分钟历史，重采样模式下复用）"""
         try:
-            coin_info = next((c for c in self.coins_config['coins'] if c['symbol'].startswith(f"{coin}/")), None)
+            coin_info = self.symbols.get(coin)
             if not coin_info:
                 return None
             
-            base_symbol = coin_info['symbol']  # CCXT基础格式
-            symbol = format_symbol_for_exchange(base_symbol, self.exchange)
-            
-            # 获取15分钟K线
-            klines_15m = self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe='15m',
-                limit=100  # 足够计算EMA(50)和MACD
-            )
-            
-            df_15m = ccxt_klines_to_df(klines_15m)
-            
-            # 计算15分钟技术指标
-            df_15m = calculate_technical_indicators(df_15m, timeframe='15m')
-            
-            current_15m = df_15m.iloc[-1]
-            
-            # 获取最近16根K线（用于AI分析战术层趋势，覆盖4小时）
-            recent_klines_15m = []
-            for _, row in df_15m.tail(16).iterrows():
-                recent_klines_15m.append({
-                    'timestamp': row['timestamp'].strftime('%Y-%m-%d %H:%M'),
-                    'open': float(row['open']),
-                    'high': float(row['high']),
-                    'low': float(row['low']),
-                    'close': float(row['close']),
-                    'volume': float(row['volume'])
-                })
+            symbol = coin_info.symbol  # 交易所格式
             
+            # 获取15分钟K线和技术指标
+            klines_15m, current_15m = self._timeframe_snapshot(symbol, '15m', 100, base_klines)  # 足够计算EMA(50)和MACD
+
+            # 最近16根K线（用于AI分析战术层趋势，覆盖4小时）
+            recent_klines_15m = KlineView(klines_15m, 16)
+
             return {
                 'coin': coin,
                 'timeframe': '15m',
@@ -320,70 +674,208 @@ class MarketScanner:
             print(f"❌ 获取{coin}的15分钟K线失败: {e}")
             return None
 
+    @retry_on_api_error(max_retries=3, delay=2)
+    def _timeframe_snapshot(self, symbol: str, timeframe: str, limit: int, base_klines=None):
+        """
+        获取某周期的K线和最新一根K线的技术指标（15m/1h/4h 共用）
+        网络/交易所错误在这里重试（get_coin_*_data 捕获全部异常并返回None，重试需要在其内部进行）
+
+        分层刷新：refresh_tiers 中的周期只在K线收盘时才会变化，当前K线收盘前复用上次的K线和指标，
+        只把最新价写入未收盘的最后一根（收盘价/最高/最低），不再下载K线、不再计算指标。
+        :return: (klines, current)，current 为最新一根K线的指标字典（含 close）
+        """
+        key = (symbol, timeframe)
+        tiered = timeframe in self.refresh_tiers
+        if tiered:
+            timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            bar_open = int(time.time() * 1000) // timeframe_ms * timeframe_ms
+            with self._tier_lock:
+                cached = self._tier_cache.get(key)
+            if cached is not None and cached[0] == bar_open:
+                price = self._latest_price(symbol, base_klines)
+                if price is not None:
+                    return self._patch_forming_bar(key, price)
+
+        klines = self._get_klines(symbol, timeframe, limit, base_klines)
+        if self.indicator_engine is not None:
+            # 流式引擎：只计入新收盘的K线，未收盘K线给出临时值
+            current = self.indicator_engine.update(symbol, timeframe, klines)
+            current['close'] = klines[-1][4]
+        else:
+            df = calculate_technical_indicators(ccxt_klines_to_df(klines), timeframe,
+                                                self.indicator_spec.columns('scan', timeframe))
+            current = df.iloc[-1].to_dict()
+
+        if tiered:
+            with self._tier_lock:
+                self.tier_stats[timeframe]['refreshed'] += 1
+                # 最后一根就是当前未收盘K线时才缓存（刚过收盘时交易所可能还没生成新K线，下轮重新获取）
+                if klines and klines[-1][0] == bar_open:
+                    self._tier_cache[key] = (bar_open, [list(k) for k in klines], dict(current))
+                else:
+                    self._tier_cache.pop(key, None)
+        return klines, current
+
+    def _patch_forming_bar(self, key, price: float):
+        """把最新价写入缓存中未收盘的K线，返回 (klines, current) 副本"""
+        with self._tier_lock:
+            _, klines, current = self._tier_cache[key]
+            forming = klines[-1]
+            forming[2] = max(forming[2], price)
+            forming[3] = min(forming[3], price)
+            forming[4] = price
+            current = dict(current, close=price)
+            upper, lower = current.get('bb_upper_20'), current.get('bb_lower_20')
+            if 'bb_position' in current and upper is not None and lower is not None and upper != lower:
+                current['bb_position'] = (price - lower) / (upper - lower)
+            self.tier_stats[key[1]]['reused'] += 1
+            return [list(k) for k in klines], current
+
+    def _latest_price(self, symbol: str, base_klines=None):
+        """最新价：5分钟K线收盘价 > 本轮批量Ticker > 行情推送Ticker > 单独请求Ticker，都没有时返回None"""
+        if base_klines:
+            return base_klines[-1][4]
+        last = self._market_stat(symbol, 'last')
+        if last is None and self.market_feed is not None:
+            ticker = self.market_feed.ticker(symbol)
+            last = ticker.get('last') if ticker else None
+        if last is None:
+            try:
+                last = (self._request('fetch_ticker', symbol) or {}).get('last')
+            except Exception as e:
+                print(f"⚠️ [{symbol}] 获取最新价失败，重新获取K线: {e}")
+                return None
+        return float(last) if last is not None else None
+
+    def _fetch_ohlcv(self, symbol: str, timeframe: str, limit: int) -> List:
+        """获取K线数据（CCXT格式），启用缓存时只增量下载新K线；同一轮内相同请求复用结果"""
+        if self.market_feed is not None:
+            # 行情推送的缓冲已预热时直接读取内存
+            klines = self.market_feed.ohlcv(symbol, timeframe, limit)
+            if klines is not None:
+                return klines
+
+        key = ('fetch_ohlcv', symbol, timeframe, limit)
+        if self.ohlcv_cache is None:
+            klines = self.request_cache.call(key, self._download_ohlcv, symbol, timeframe, None, limit)
+        else:
+            klines = self.request_cache.call(key, self.ohlcv_cache.get, self._download_ohlcv, symbol, timeframe, limit)
+        if self.market_feed is not None:
+            self.market_feed.seed(symbol, timeframe, klines)
+        return [list(k) for k in klines]
+
+    def _download_ohlcv(self, symbol: str, timeframe: str, since, limit: int) -> List:
+        """
+        从交易所下载K线（since为None时获取最近limit根）
+        超过单次请求上限时按 since 分页下载（重采样模式的长历史预热）
+        """
+        per_request = self.max_klines_per_request
+        if limit <= per_request:
+            return self._request('fetch_ohlcv', symbol=symbol, timeframe=timeframe, since=since, limit=limit)
+
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        if since is None:
+            since = (int(time.time() * 1000) // timeframe_ms - (limit - 1)) * timeframe_ms
+
+        now_ms = int(time.time() * 1000)
+        candles = []
+        cursor = since
+        while len(candles) < limit and cursor <= now_ms:
+            chunk = self._request('fetch_ohlcv', symbol=symbol, timeframe=timeframe, since=cursor,
+                                  limit=min(per_request, limit - len(candles)))
+            chunk = [c for c in chunk if c[0] >= cursor]
+            if not chunk:
+                break
+            candles.extend(chunk)
+            cursor = chunk[-1][0] + timeframe_ms
+        return candles[-limit:]
+
+    def _get_base_history(self, symbol: str):
+        """重采样模式下获取5分钟长历史（交易所模式返回None）"""
+        if self.kline_source == 'exchange':
+            return None
+        return self._fetch_ohlcv(symbol, BASE_TIMEFRAME, RESAMPLE_HISTORY_BARS)
+
+    def _get_klines(self, symbol: str, timeframe: str, limit: int, base_klines=None) -> List:
+        """
+        获取指定周期K线
+        - exchange: 直接请求交易所该周期K线
+        - resample: 由5分钟历史本地合成，不再单独请求15m/1h/4h
+        - verify: 同时请求原生K线并与合成结果对比，返回原生结果
+        """
+        if timeframe == BASE_TIMEFRAME and base_klines is not None:
+            return [list(k) for k in base_klines[-limit:]]
+        if self.kline_source == 'exchange' or timeframe == BASE_TIMEFRAME:
+            return self._fetch_ohlcv(symbol, timeframe, limit)
+
+        if base_klines is None:
+            base_klines = self._get_base_history(symbol)
+        local_klines = resample_ohlcv(base_klines, timeframe, limit)
+        if self.kline_source != 'verify':
+            return local_klines
+
+        exchange_klines = self._fetch_ohlcv(symbol, timeframe, limit)
+        diff = diff_ohlcv(local_klines, exchange_klines)
+        status = "✅ 一致" if diff['mismatched'] == 0 else f"⚠️ {diff['mismatched']}根不一致"
+        print(f"🔬 [{symbol} {timeframe}] 重采样校验: 对比{diff['compared']}根 {status} (最大相对误差 {diff['max_rel_diff']:.2e})")
+        return exchange_klines
+
     def scan_coin(self, coin: str, timeframe='5m', limit=300) -> Dict:
         """扫描单个币种的市场数据（5分钟周期）"""
         try:
             # 找到币种配置
-            coin_info = next((c for c in self.coins_config['coins'] if c['symbol'].startswith(f"{coin}/")), None)
+            coin_info = self.symbols.get(coin)
             if not coin_info:
                 return None
             
-            base_symbol = coin_info['symbol']  # CCXT基础格式
-            symbol = format_symbol_for_exchange(base_symbol, self.exchange)
-            
-            # 获取K线数据
-            klines = self.exchange.fetch_ohlcv(
-                symbol=symbol,
-                timeframe=timeframe,
-                limit=limit
-            )
+            symbol = coin_info.symbol  # 交易所格式
             
+            # 重采样模式：先取一次5分钟长历史，15m/1h/4h 均由它本地合成
+            base_klines = self._get_base_history(symbol)
+
+            # 并发获取各周期K线、资金费率和持仓量
+            fetched = self._run_tasks({
+                'klines': (self._get_klines, symbol, timeframe, limit, base_klines),
+                '15m': (self.get_coin_15m_data, coin, base_klines),
+                '1h': (self.get_coin_1h_data, coin, base_klines),
+                '4h': (self.get_coin_4h_data, coin, base_klines),
+                'funding_rate': (self._fetch_funding_rate, symbol),
+                'open_interest': (self._fetch_open_interest, symbol),
+            })
+
             # 转换为DataFrame
-            df = ccxt_klines_to_df(klines)
-            
-            # 计算5分钟技术指标（仅ATR）
-            df = calculate_technical_indicators(df, timeframe='5m')
-            
-            # 获取当前K线和历史K线
-            current_kline = df.iloc[-1]
-            previous_klines = df.iloc[-26:-1] # 最近25根完整K线
-            
-            # 获取15分钟数据
-            data_15m = self.get_coin_15m_data(coin)
+            klines = fetched['klines']
+            if self.indicator_engine is not None:
+                # 流式引擎：5分钟ATR增量更新
+                current_kline = self.indicator_engine.update(symbol, timeframe, klines)
+                current_kline['close'] = klines[-1][4]
+            else:
+                df = ccxt_klines_to_df(klines)
+
+                # 计算5分钟技术指标（仅ATR）
+                df = calculate_technical_indicators(df, '5m', self.indicator_spec.columns('scan', '5m'))
 
-            # 获取1小时数据
-            data_1h = self.get_coin_1h_data(coin)
+                # 获取当前K线
+                current_kline = df.iloc[-1]
+            
+            previous_klines = KlineView(klines[:-1], 25)  # 最近25根完整K线
 
-            # 获取4小时数据
-            data_4h = self.get_coin_4h_data(coin)
+            # 15分钟 / 1小时 / 4小时数据
+            data_15m = fetched['15m']
+            data_1h = fetched['1h']
+            data_4h = fetched['4h']
 
             # 计算当前价格
             current_price = current_kline['close']
 
-            # 获取资金费率和持仓量
-            try:
-                # CCXT获取资金费率
-                funding_rate_data = self.exchange.fetch_funding_rate(symbol)
-                funding_rate = float(funding_rate_data['fundingRate']) if funding_rate_data and 'fundingRate' in funding_rate_data else 0
-            except Exception as e:
-                print(f"⚠️ [{symbol}] 获取资金费率失败: {e}")
-                funding_rate = None
-
-            try:
-                # CCXT获取持仓量（Open Interest）
-                oi_data = self.exchange.fetch_open_interest(symbol)
-                open_interest = float(oi_data['openInterestAmount']) if oi_data and 'openInterestAmount' in oi_data else 0
-            except ccxt.NotSupported:
-                # 该交易所不支持获取持仓量，静默跳过
-                open_interest = None
-            except Exception as e:
-                print(f"⚠️ [{symbol}] 获取持仓量失败: {e}")
-                open_interest = None
+            # 资金费率和持仓量
+            funding_rate = fetched['funding_rate']
+            open_interest = fetched['open_interest']
 
             # 计算24小时变化率（使用最近24小时数据）
             change_24h = 0.0
-            if len(df) >= 288:  # 5分钟 * 288 = 24小时
-                previous_price_24h = df.iloc[-289]['close']  # 24小时前的价格
+            if len(klines) >= 288:  # 5分钟 * 288 = 24小时
+                previous_price_24h = klines[-289][4]  # 24小时前的价格
                 change_24h = ((current_price - previous_price_24h) / previous_price_24h) * 100
             
             # 计算RSI（使用15分钟数据）
@@ -416,9 +908,9 @@ class MarketScanner:
                 'trend_strength': trend_strength,
                 'funding_rate': funding_rate,
                 'open_interest': open_interest,
-                'kline_5m': previous_klines.to_dict('records'),  # 5分钟K线历史
+                'kline_5m': previous_klines,  # 5分钟K线历史
                 'atr_14_5m': current_kline.get('atr_14', 0),  # 5分钟ATR
-                'min_order_value': coin_info.get('min_order_value', 13),  # 最小开仓金额
+                'min_order_value': coin_info.min_order_value,  # 最小开仓金额
             }
 
             # 添加15分钟数据
@@ -438,7 +930,7 @@ class MarketScanner:
                 result['atr_14_1h'] = data_1h.get('atr_14', 0)
                 result['bbands_1h'] = {
                     'upper': data_1h.get('bb_upper', 0),
-                    'middle': data_1h.get('bb_middle_20', 0),
+                    'middle': data_1h.get('bb_middle', 0),
                     'lower': data_1h.get('bb_lower', 0),
                     'position': data_1h.get('bb_position', 0)
                 }
@@ -457,17 +949,155 @@ class MarketScanner:
             print(f"❌ 扫描{coin}失败: {e}")
             return None
     
-    def scan_all_markets(self, timeframe='5m') -> Dict[str, Dict]:
-        """扫描所有币种的市场数据"""
+    def _prescreen(self, positions: Dict = None):
+        """
+        预筛选：一次 fetch_tickers 获取全部币种的Ticker并排序
+        :param positions: get_portfolio_positions() 的结果，有持仓的币种始终深度扫描（为None时自动获取）
+        :return: (深度扫描币种, 批量Ticker)；交易所不支持批量Ticker或请求失败时返回 (全部币种, None)
+        """
+        has = getattr(self.exchange, 'has', None) or {}
+        if not has.get('fetchTickers'):
+            print("⚠️ 交易所不支持批量获取Ticker，跳过预筛选，扫描全部币种")
+            return self.coins, None
+
+        start = time.time()
+        symbols = self.symbols.symbols
+        btc_symbol = self.symbols.exchange_symbol('BTC/USDT')
+        if btc_symbol not in symbols:
+            symbols.append(btc_symbol)
+        try:
+            tickers = self._request('fetch_tickers', symbols)
+        except Exception as e:
+            print(f"⚠️ 批量获取Ticker失败，跳过预筛选: {e}")
+            return self.coins, None
+
+        if positions is None:
+            positions = self.get_portfolio_positions()
+        held = [coin for coin, position in positions.items() if position and coin in self.coins]
+        by_coin = {info.coin: _lookup_symbol(tickers, info.symbol) for info in self.symbols}
+        selected, ranking = self.screener.select(by_coin, held)
+        # 保持配置文件中的顺序
+        selected = [coin for coin in self.coins if coin in selected]
+
+        top_text = ", ".join(f"{coin}({score:.2f})" for coin, score in ranking[:5])
+        print(f"🔎 预筛选({self.screener.rank_by}): {len(self.coins)}个币种 → 深度扫描 {len(selected)} 个"
+              f"（前{self.screener.top_n} + 持仓{len([c for c in held if c in selected])}）| "
+              f"排名前列: {top_text} | 耗时 {time.time() - start:.2f}秒")
+        return selected, tickers
+
+    def _timed_scan(self, coin: str, timeframe: str, scan_round: int = None):
+        """扫描单个币种并记录耗时；属于当前轮次的成功结果保存为快照（超时后才完成的扫描结果丢弃）"""
+        start = time.time()
+        data = self.scan_coin(coin, timeframe)
+        finished = time.time()
+        with self._snapshot_lock:
+            if scan_round is not None and scan_round != self._scan_round:
+                return data
+            self.coin_latency[coin] = finished - start
+            if data and all(k in data for k in REQUIRED_SCAN_FIELDS):
+                self._snapshots[coin] = (finished, data)
+        return data
+
+    def _stale_snapshot(self, coin: str):
+        """超时币种的上一次快照（副本，标记 stale 和数据年龄），没有快照时返回None"""
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(coin)
+        if snapshot is None:
+            return None
+        finished, data = snapshot
+        return dict(data, stale=True, stale_age_seconds=time.time() - finished)
+
+    def _scan_coins(self, coins: List[str], timeframe: str, deadline=None) -> Dict:
+        """
+        深度扫描一组币种，deadline 之前未完成的币种不再等待
+        :return: {coin: scan_coin 结果}，超时的币种值为 TimeoutError
+        """
+        results = {}
+        with self._snapshot_lock:
+            self._scan_round += 1
+            scan_round = self._scan_round
+        if self.concurrent and len(coins) > 1:
+            # 并发模式：各币种同时扫描（最多 max_workers 个），总耗时约等于最慢的单个币种
+            if self._coin_pool is None:
+                self._coin_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='scanner-coin')
+            futures = {}
+            for coin in coins:
+                running = self._running.pop(coin, None)
+                if running is not None and not running.done():
+                    self._running[coin] = running
+                    # 上一轮超时的扫描仍在执行，本轮不重复提交，按超时处理（使用快照）
+                    results[coin] = TimeoutError()
+                    continue
+                futures[coin] = self._coin_pool.submit(self._timed_scan, coin, timeframe, scan_round)
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            done, _ = wait(futures.values(), timeout=timeout)
+            with self._snapshot_lock:
+                # 本轮到此结束：之后才完成的扫描属于旧轮次，结果不写快照
+                self._scan_round += 1
+            for coin, future in futures.items():
+                if future in done:
+                    results[coin] = future.result()
+                    continue
+                # 尚未开始的扫描直接取消；已开始的无法中断，后台执行完后结果丢弃，完成前该币种不再提交
+                if not future.cancel():
+                    self._running[coin] = future
+                results[coin] = TimeoutError()
+        else:
+            for coin in coins:
+                if deadline is not None and time.time() >= deadline:
+                    results[coin] = TimeoutError()
+                else:
+                    results[coin] = self._timed_scan(coin, timeframe, scan_round)
+        return results
+
+    def scan_all_markets(self, timeframe='5m', positions: Dict = None) -> Dict[str, Dict]:
+        """
+        扫描所有币种的市场数据
+        :param positions: 当前持仓（预筛选时持仓币种始终深度扫描，不传时自动获取）
+        """
         print("\n" + "="*60)
         print("🔍 扫描市场数据...")
         print("="*60)
         
         market_data = {}
-        
-        for coin in self.coins:
-            data = self.scan_coin(coin, timeframe)
-            if data and all(k in data for k in ['price', 'change_24h', 'rsi', 'trend_direction', 'trend_strength']):
+        scan_start = time.time()
+        cache_before = self.ohlcv_cache.stats() if self.ohlcv_cache else None
+        feed_before = self.market_feed.stats() if self.market_feed else None
+        with self._tier_lock:
+            tiers_before = {tf: dict(counts) for tf, counts in self.tier_stats.items()}
+
+        # 第一阶段：币种数较多时用一次批量Ticker预筛选
+        coins, tickers = self.coins, None
+        if self.screener.active(len(self.coins)):
+            coins, tickers = self._prescreen(positions)
+
+        # 批量获取深度扫描币种（含BTC背景）的资金费率、持仓量和最新价
+        if self.bulk_market_stats:
+            symbols = [self.symbols.get(coin).symbol for coin in coins]
+            btc_symbol = self.symbols.exchange_symbol('BTC/USDT')
+            if btc_symbol not in symbols:
+                symbols.append(btc_symbol)
+            self.fetch_market_stats(symbols, tickers)
+
+        # 第二阶段：多周期深度扫描（扫描时间预算从本轮开始计算）
+        deep_start = time.time()
+        deadline = scan_start + self.scan_budget if self.scan_budget > 0 else None
+        results = self._scan_coins(coins, timeframe, deadline)
+        deep_elapsed = time.time() - deep_start
+
+        late = []
+        for coin in coins:
+            data = results[coin]
+            if isinstance(data, TimeoutError):
+                data = self._stale_snapshot(coin)
+                late.append((coin, data))
+                if data is None:
+                    print(f"⏳ {coin}: 扫描超时，且没有可用的历史快照")
+                    continue
+                market_data[coin] = data
+                print(f"⏳ {coin}: 扫描超时，使用 {data['stale_age_seconds']:.0f}秒前的快照 (${data['price']:.4f})")
+                continue
+            if data and all(k in data for k in REQUIRED_SCAN_FIELDS):
                 market_data[coin] = data
                 trend_emoji = {"up": "📈", "down": "📉", "neutral": "➡️"}.get(data.get('trend_direction'), "❓")
                 # 低价币种显示更多小数位
@@ -475,10 +1105,60 @@ class MarketScanner:
                 print(f"✅ {coin}: {price_fmt} | 24h: {data['change_24h']:+.2f}% | RSI: {data['rsi']:.1f} | SMA20/50: {trend_emoji}{data['trend_direction']} ({data['trend_strength']:.2f}%)")
             else:
                 print(f"❌ {coin}: 数据获取失败")
-        
+
+        mode_text = f"并发(最多{self.max_workers}线程)" if self.concurrent else "顺序"
+        print(f"⏱️ 扫描耗时: {time.time() - scan_start:.2f}秒 ({mode_text})")
+        self._print_latency(coins, late)
+        skipped = len(self.coins) - len(coins)
+        if skipped > 0 and coins:
+            # 深度扫描受限频预算约束，耗时与币种数近似成正比
+            saved = deep_elapsed / len(coins) * skipped
+            print(f"🔎 预筛选节省: 跳过 {skipped} 个币种的深度扫描，"
+                  f"按本轮深度扫描耗时估算每轮节省约 {saved:.2f}秒")
+        if self.ohlcv_cache:
+            cache_after = self.ohlcv_cache.stats()
+            print(f"🗂️ K线缓存: 命中 {cache_after['hits'] - cache_before['hits']} | "
+                  f"未命中 {cache_after['misses'] - cache_before['misses']} | "
+                  f"本轮下载 {cache_after['rows_fetched'] - cache_before['rows_fetched']} 根 | "
+                  f"累计命中率 {cache_after['hit_rate']:.1f}% | "
+                  f"{cache_after['series']}组K线占用 {cache_after['memory_bytes'] / 1024:.0f} KB")
+            self.flush_candles()
+        if self.refresh_tiers:
+            tier_parts = []
+            with self._tier_lock:
+                for tf in sorted(self.tier_stats, key=ccxt.Exchange.parse_timeframe):
+                    reused = self.tier_stats[tf]['reused'] - tiers_before[tf]['reused']
+                    refreshed = self.tier_stats[tf]['refreshed'] - tiers_before[tf]['refreshed']
+                    tier_parts.append(f"{tf} 复用 {reused}/{reused + refreshed}")
+            print(f"🪜 分层刷新: {' | '.join(tier_parts)}（复用时不下载K线、不计算指标）")
+        if self.market_feed:
+            feed_after = self.market_feed.stats()
+            print(f"📡 行情推送: 内存读取 {feed_after['hits'] - feed_before['hits']} | "
+                  f"回退REST {feed_after['misses'] - feed_before['misses']} | "
+                  f"累计推送消息 {feed_after['messages']}")
         print("="*60 + "\n")
         return market_data
     
+    def _print_latency(self, coins: List[str], late: List):
+        """打印本轮最慢的几个币种耗时（相对扫描时间预算）和超时币种"""
+        with self._snapshot_lock:
+            latency = {coin: self.coin_latency[coin] for coin in coins
+                       if coin in self.coin_latency and coin not in dict(late)}
+        slowest = sorted(latency.items(), key=lambda item: item[1], reverse=True)[:5]
+        if self.scan_budget > 0:
+            budget_text = f"预算 {self.scan_budget:g}秒"
+            slow_text = ", ".join(f"{coin} {t:.2f}秒({t / self.scan_budget * 100:.0f}%)" for coin, t in slowest)
+        else:
+            budget_text = "不限时"
+            slow_text = ", ".join(f"{coin} {t:.2f}秒" for coin, t in slowest)
+        line = f"⏱️ 币种耗时（{budget_text}）: 最慢 {slow_text or '-'}"
+        if late:
+            late_text = ", ".join(
+                f"{coin}(快照{data['stale_age_seconds']:.0f}秒前)" if data else f"{coin}(无快照)" for coin, data in late
+            )
+            line += f" | 超时 {len(late)} 个: {late_text}"
+        print(line)
+
     @retry_on_api_error(max_retries=3, delay=2)
     def get_btc_context(self) -> Dict:
         """获取BTC市场背景（增强版：包含15分钟和1小时技术指标）"""
@@ -486,108 +1166,91 @@ class MarketScanner:
             import pandas as pd
             
             # BTC symbol 格式转换
-            btc_symbol = format_symbol_for_exchange('BTC/USDT', self.exchange)
+            btc_symbol = self.symbols.exchange_symbol('BTC/USDT')
             
-            # 获取BTC当前价格
-            btc_ticker = self.exchange.fetch_ticker(btc_symbol)
-            btc_price = float(btc_ticker['last'])
+            # 获取BTC当前价格（优先使用本轮批量行情）
+            btc_price = self._market_stat(btc_symbol, 'last')
+            if btc_price is None and self.market_feed is not None:
+                btc_ticker = self.market_feed.ticker(btc_symbol)
+                btc_price = float(btc_ticker['last']) if btc_ticker and btc_ticker.get('last') is not None else None
+            if btc_price is None:
+                btc_ticker = self._request('fetch_ticker', btc_symbol)
+                btc_price = float(btc_ticker['last'])
+
+            # 重采样模式下的5分钟长历史
+            btc_base_klines = self._get_base_history(btc_symbol)
             
             # 获取15分钟K线（用于计算技术指标）
-            btc_klines_15m = self.exchange.fetch_ohlcv(
-                symbol=btc_symbol,
-                timeframe='15m',
-                limit=96  # 24小时数据，足够计算技术指标
-            )
+            # 与扫描使用相同的请求参数（100根），BTC在币种列表中时直接复用本轮扫描结果
+            btc_klines_15m = self._get_klines(btc_symbol, '15m', 100, btc_base_klines)[-96:]  # 24小时数据，足够计算技术指标
             
-            # 转换为DataFrame并计算15分钟技术指标
-            df_15m = ccxt_klines_to_df(btc_klines_15m)
-            df_15m = calculate_technical_indicators(df_15m, timeframe='15m')
-            current_15m = df_15m.iloc[-1]
-            previous_15m = df_15m.iloc[-2]
+            # 计算15分钟技术指标
+            current_15m, series_15m = self._indicator_snapshot(btc_symbol, '15m', btc_klines_15m)
+            previous_close_15m = btc_klines_15m[-2][4]
             
-            btc_change_15m = ((current_15m['close'] - previous_15m['close']) / previous_15m['close']) * 100
+            btc_change_15m = ((current_15m['close'] - previous_close_15m) / previous_close_15m) * 100
             
             # 获取1小时K线（用于中期趋势）
-            btc_klines_1h = self.exchange.fetch_ohlcv(
-                symbol=btc_symbol,
-                timeframe='1h',
-                limit=60  # 2.5天数据
-            )
+            btc_klines_1h = self._get_klines(btc_symbol, '1h', 100, btc_base_klines)[-60:]  # 2.5天数据
             
-            # 转换为DataFrame并计算1小时技术指标
-            df_1h = ccxt_klines_to_df(btc_klines_1h)
-            df_1h = calculate_technical_indicators(df_1h, timeframe='1h')
-            current_1h = df_1h.iloc[-1]
+            # 计算1小时技术指标
+            current_1h, series_1h = self._indicator_snapshot(btc_symbol, '1h', btc_klines_1h)
             
             # 获取4小时K线（用于长期趋势，轻量级）
-            btc_klines_4h = self.exchange.fetch_ohlcv(
-                symbol=btc_symbol,
-                timeframe='4h',
-                limit=60  # 10天数据
-            )
+            btc_klines_4h = self._get_klines(btc_symbol, '4h', 100, btc_base_klines)[-60:]  # 10天数据
             
-            # 转换为DataFrame并计算4小时技术指标
-            df_4h = ccxt_klines_to_df(btc_klines_4h)
-            df_4h = calculate_technical_indicators(df_4h, timeframe='4h')
-            current_4h = df_4h.iloc[-1]
+            # 计算4小时技术指标
+            current_4h, _ = self._indicator_snapshot(btc_symbol, '4h', btc_klines_4h)
             
-            # 获取BTC的资金费率和持仓量
-            try:
-                # CCXT获取BTC资金费率
-                btc_funding_data = self.exchange.fetch_funding_rate(btc_symbol)
-                btc_funding_rate = float(btc_funding_data['fundingRate']) if btc_funding_data and 'fundingRate' in btc_funding_data else 0.0
-            except Exception as e:
-                print(f"⚠️ [BTC/USDT] 获取资金费率失败: {e}")
-                btc_funding_rate = None
+            # 获取BTC的资金费率和持仓量（优先使用本轮批量行情）
+            btc_funding_rate = self._market_stat(btc_symbol, 'funding_rate')
+            if btc_funding_rate is None:
+                try:
+                    # CCXT获取BTC资金费率
+                    btc_funding_data = self._request('fetch_funding_rate', btc_symbol)
+                    btc_funding_rate = float(btc_funding_data['fundingRate']) if btc_funding_data and 'fundingRate' in btc_funding_data else 0.0
+                except Exception as e:
+                    print(f"⚠️ [BTC/USDT] 获取资金费率失败: {e}")
+                    btc_funding_rate = None
 
-            try:
-                # CCXT获取BTC持仓量
-                btc_oi_data = self.exchange.fetch_open_interest(btc_symbol)
-                btc_open_interest = float(btc_oi_data['openInterestAmount']) if btc_oi_data and 'openInterestAmount' in btc_oi_data else 0.0
-            except ccxt.NotSupported:
-                # 该交易所不支持获取持仓量，静默跳过
-                btc_open_interest = None
-            except Exception as e:
-                print(f"⚠️ [BTC/USDT] 获取持仓量失败: {e}")
-                btc_open_interest = None
+            btc_open_interest = self._market_stat(btc_symbol, 'open_interest')
+            if btc_open_interest is None and self.market_stats_paths.get('open_interest', ('',))[0] != '不支持':
+                try:
+                    # CCXT获取BTC持仓量
+                    btc_oi_data = self._request('fetch_open_interest', btc_symbol)
+                    btc_open_interest = float(btc_oi_data['openInterestAmount']) if btc_oi_data and 'openInterestAmount' in btc_oi_data else 0.0
+                except ccxt.NotSupported:
+                    # 该交易所不支持获取持仓量，静默跳过
+                    btc_open_interest = None
+                except Exception as e:
+                    print(f"⚠️ [BTC/USDT] 获取持仓量失败: {e}")
+                    btc_open_interest = None
             
             # 获取时间序列数据（最近10个值）
             # 检查技术指标是否存在且有足够数据
-            if 'rsi_14' in df_15m.columns and len(df_15m['rsi_14'].dropna()) >= 10:
-                rsi_series_15m = df_15m['rsi_14'].tail(10).tolist()
-            else:
+            rsi_series_15m = series_15m('rsi_14', 10)
+            if rsi_series_15m is None:
                 print(f"⚠️ [BTCUSDT] 15分钟RSI数据不可用")
-                rsi_series_15m = None
 
-            if 'macd' in df_15m.columns and len(df_15m['macd'].dropna()) >= 10:
-                macd_series_15m = df_15m['macd'].tail(10).tolist()
-            else:
+            macd_series_15m = series_15m('macd', 10)
+            if macd_series_15m is None:
                 print(f"⚠️ [BTCUSDT] 15分钟MACD数据不可用")
-                macd_series_15m = None
 
-            if 'atr_14' in df_15m.columns and len(df_15m['atr_14'].dropna()) >= 10:
-                atr_series_15m = df_15m['atr_14'].tail(10).tolist()
-            else:
+            atr_series_15m = series_15m('atr_14', 10)
+            if atr_series_15m is None:
                 print(f"⚠️ [BTCUSDT] 15分钟ATR数据不可用")
-                atr_series_15m = None
 
-            if 'rsi' in df_1h.columns and len(df_1h['rsi'].dropna()) >= 10:
-                rsi_series_1h = df_1h['rsi'].tail(10).tolist()
-            else:
+            rsi_series_1h = series_1h('rsi', 10)
+            if rsi_series_1h is None:
                 print(f"⚠️ [BTCUSDT] 1小时RSI数据不可用")
-                rsi_series_1h = None
 
-            if 'macd' in df_1h.columns and len(df_1h['macd'].dropna()) >= 10:
-                macd_series_1h = df_1h['macd'].tail(10).tolist()
-            else:
+            macd_series_1h = series_1h('macd', 10)
+            if macd_series_1h is None:
                 print(f"⚠️ [BTCUSDT] 1小时MACD数据不可用")
-                macd_series_1h = None
 
-            if 'atr_14' in df_1h.columns and len(df_1h['atr_14'].dropna()) >= 10:
-                atr_series_1h = df_1h['atr_14'].tail(10).tolist()
-            else:
+            atr_series_1h = series_1h('atr_14', 10)
+            if atr_series_1h is None:
                 print(f"⚠️ [BTCUSDT] 1小时ATR数据不可用")
-                atr_series_1h = None
 
             return {
                 'price': btc_price,
@@ -624,10 +1287,34 @@ class MarketScanner:
             traceback.print_exc()
             return None
     
+    def _indicator_snapshot(self, symbol: str, timeframe: str, klines: List, consumer: str = 'btc_context'):
+        """
+        计算指标，返回 (最新K线的指标值, 序列函数)
+        序列函数 series(column, count) 返回最近 count 个值（从旧到新），数据不足时返回None
+        """
+        if self.indicator_engine is not None:
+            current = self.indicator_engine.update(symbol, timeframe, klines)
+            current['close'] = klines[-1][4]
+
+            def series(column, count):
+                values = self.indicator_engine.series(symbol, timeframe, column, count, current) if column in current else []
+                valid = [v for v in values if not pd.isna(v)]
+                return values if len(valid) >= count else None
+            return current, series
+
+        df = ccxt_klines_to_df(klines)
+        df = calculate_technical_indicators(df, timeframe, self.indicator_spec.columns(consumer, timeframe))
+
+        def series(column, count):
+            if column in df.columns and len(df[column].dropna()) >= count:
+                return df[column].tail(count).tolist()
+            return None
+        return df.iloc[-1], series
+
     def get_portfolio_positions(self) -> Dict[str, Dict]:
         """获取当前所有币种的持仓情况"""
         try:
-            all_positions = self.exchange.fetch_positions()
+            all_positions = self._request('fetch_positions')
             
             portfolio = {coin: None for coin in self.coins}
             
@@ -693,7 +1380,7 @@ class MarketScanner:
         """获取账户信息"""
         try:
             # CCXT获取账户余额 - 不指定type，让CCXT使用defaultType
-            balance = self.exchange.fetch_balance()
+            balance = self._request('fetch_balance')
             
             # USDT余额
             usdt_balance = balance.get('USDT', {})
@@ -2,6 +2,7 @@
 投资组合管理器 - AI驱动的多币种交易系统
 """
 import os
+import sys
 import time
 import schedule
 from openai import OpenAI
@@ -13,9 +14,19 @@ import logging
 from logging.handlers import RotatingFileHandler
 import ccxt
 import math
+from concurrent.futures import ThreadPoolExecutor
 
 from portfolio_statistics import PortfolioStatistics
 from market_scanner import MarketScanner
+from utils.markets_cache import load_markets_cached, markets_cache_file
+from utils.candle_scheduler import CandleScheduler
+from utils.stage_timer import StageTimer
+from prompt_cache import SystemPromptCache, PromptCacheStats
+from prompt_encoding import (COMPACT_LEGEND, ENCODINGS, MARKET_HEADER, build_coin_text, build_market_text, count_tokens,
+                             format_price, price_decimals, token_counter)
+from prompt_budget import SECTION_LABELS, fit_prompt, format_applied
+from decision_stream import DecisionStreamParser
+from decision_merge import enforce_cash_reserve, merge_shard_decisions, shard_coins
 
 # 配置项目根目录
 import os
@@ -28,14 +39,19 @@ load_dotenv(os.path.join(PROJECT_ROOT, '.env'))
 PROGRAM_START_TIME = datetime.now()
 INVOCATION_COUNT = 0
 
-# 使用绝对路径定义文件（按项目结构存储在data目录）
-RUNTIME_FILE = os.path.join(PROJECT_ROOT, 'data', 'current_runtime.json')
-PORTFOLIO_STATS_FILE = os.path.join(PROJECT_ROOT, 'data', 'portfolio_stats.json')
-AI_DECISIONS_FILE = os.path.join(PROJECT_ROOT, 'data', 'ai_decisions.json')
+# 使用绝对路径定义文件（按项目结构存储在data目录；基准测试等离线运行时可用环境变量指向临时目录）
+CONFIG_FILE = os.getenv('PORTFOLIO_CONFIG_FILE', os.path.join(PROJECT_ROOT, 'config', 'coins_config.json'))
+DATA_DIR = os.getenv('PORTFOLIO_DATA_DIR', os.path.join(PROJECT_ROOT, 'data'))
+RUNTIME_FILE = os.path.join(DATA_DIR, 'current_runtime.json')
+PORTFOLIO_STATS_FILE = os.path.join(DATA_DIR, 'portfolio_stats.json')
+AI_DECISIONS_FILE = os.path.join(DATA_DIR, 'ai_decisions.json')
+
+# 每轮各阶段耗时（portfolio_bot 结束时输出，benchmarks/bench_cycle.py 读取）
+CYCLE_TIMER = StageTimer()
 
 # 配置日志
 log_handler = RotatingFileHandler(
-    os.path.join(PROJECT_ROOT, 'portfolio_manager.log'),
+    os.getenv('PORTFOLIO_LOG_FILE', os.path.join(PROJECT_ROOT, 'portfolio_manager.log')),
     maxBytes=10*1024*1024,
     backupCount=3,
     encoding='utf-8'
@@ -49,30 +65,26 @@ logging.basicConfig(
     level=logging.INFO,
     handlers=[log_handler, console_handler]
 )
+logger = logging.getLogger(__name__)
 
 def print(*args, **kwargs):
     message = ' '.join(str(arg) for arg in args)
     logging.info(message)
 
-def format_price(price, coin):
-    """根据币种格式化价格，低价币种显示更多小数位"""
-    if coin in ['DOGE', 'XRP']:
-        return f"${price:.4f}"
-    else:
-        return f"${price:.2f}"
-
-def format_symbol_for_exchange(base_symbol, exchange_obj):
+def stop_order_fill(order, stop_price):
     """
-    根据交易所类型格式化symbol
-    :param base_symbol: 基础symbol格式，如 "ETH/USDT"
-    :param exchange_obj: CCXT交易所对象
-    :return: 格式化后的symbol
+    止损单是否已成交，已成交时返回 (触发时间, 成交均价)，否则返回None
+
+    CCXT 统一格式的已成交订单 status 为 'closed'，成交时间和均价在 lastTradeTimestamp / average；
+    'FILLED'、updateTime、avgPrice 是币安原始字段（order['info'] 或旧版接口），一并兼容。
+    成交均价缺失时按止损价计算。
     """
-    # Gate.io 的 swap 市场需要添加 settle 货币后缀
-    if exchange_obj.id == 'gateio' and 'defaultType' in exchange_obj.options:
-        if exchange_obj.options['defaultType'] == 'swap':
-            return f"{base_symbol}:USDT"
-    return base_symbol
+    if order.get('status') not in ('closed', 'FILLED'):
+        return None
+    trigger_ms = order.get('lastTradeTimestamp') or order.get('timestamp') or order.get('updateTime')
+    trigger_time = datetime.fromtimestamp(trigger_ms / 1000) if trigger_ms else datetime.now()
+    avg_price = float(order.get('average') or order.get('avgPrice') or order.get('price') or stop_price)
+    return trigger_time, avg_price
 
 def create_stop_order(exchange_obj, symbol, side, amount, stop_price):
     """
@@ -145,7 +157,7 @@ deepseek_client = OpenAI(
 )
 
 # 读取配置文件获取交易所类型
-config_path = os.path.join(PROJECT_ROOT, 'config', 'coins_config.json')
+config_path = CONFIG_FILE
 with open(config_path, 'r', encoding='utf-8') as f:
     config = json.load(f)
     exchange_name = config.get('exchange', 'binance').lower()
@@ -159,7 +171,7 @@ api_secret_name = f"{exchange_name.upper()}_SECRET"
 api_key = os.getenv(api_key_name)
 api_secret = os.getenv(api_secret_name)
 
-if not api_key or not api_secret:
+if exchange_name != 'fake' and (not api_key or not api_secret):
     print(f"❌ 未找到 {exchange_name.upper()} 的API密钥配置")
     print(f"   请在 .env 文件中设置 {api_key_name} 和 {api_secret_name}")
     sys.exit(1)
@@ -171,7 +183,12 @@ retry_delay = 3
 for attempt in range(max_retries):
     try:
         # 根据配置创建对应的交易所对象
-        exchange_class = getattr(ccxt, exchange_name)
+        # fake: 本地模拟交易所（src/sim/fake_exchange.py），不需要网络和API密钥；只在使用时导入，不影响实盘启动
+        if exchange_name == 'fake':
+            from sim.fake_exchange import FakeExchange
+            exchange_class = FakeExchange
+        else:
+            exchange_class = getattr(ccxt, exchange_name)
         
         # 基础配置
         exchange_config = {
@@ -203,6 +220,13 @@ for attempt in range(max_retries):
             exchange_config['options'] = {
                 'defaultType': 'linear',  # Bybit 使用 linear
             }
+        elif exchange_name == 'fake':
+            exchange_config['options'] = {
+                'defaultType': 'swap',
+            }
+            # 预先生成配置币种的市场信息（合约面值、精度），其余交易对首次请求时生成
+            exchange_config['fake'] = dict(config.get('fake_exchange', {}))
+            exchange_config['fake'].setdefault('symbols', [c['symbol'] for c in config.get('coins', []) if c.get('symbol')])
         else:
             # 其他交易所默认使用 swap
             exchange_config['options'] = {
@@ -211,9 +235,13 @@ for attempt in range(max_retries):
         
         exchange = exchange_class(exchange_config)
         
-        # 测试连接
-        exchange.load_markets()
-        print(f"✅ {exchange_name.upper()} 客户端初始化成功")
+        # 加载市场信息（优先读取 data/ 下的缓存，避免每次启动都下载；模拟交易所不使用缓存）
+        markets_source = load_markets_cached(
+            exchange,
+            markets_cache_file(DATA_DIR, exchange),
+            float(config.get('markets_cache_hours', 24)) if exchange_name != 'fake' else 0
+        )
+        print(f"✅ {exchange_name.upper()} 客户端初始化成功" + ("（市场信息来自缓存）" if markets_source == 'cache' else ""))
         break
     except Exception as e:
         print(f"⚠️ {exchange_name.upper()} 连接失败 (尝试 {attempt + 1}/{max_retries}): {str(e)[:100]}")
@@ -235,7 +263,7 @@ if exchange is None:
     exit(1)
 
 # 初始化模块（使用全局定义的路径常量）
-portfolio_stats = PortfolioStatistics(PORTFOLIO_STATS_FILE, exchange)
+portfolio_stats = PortfolioStatistics(PORTFOLIO_STATS_FILE, exchange, config_path)
 
 # 使用已加载的配置
 market_scanner = MarketScanner(exchange, config_path)
@@ -312,6 +340,8 @@ def load_portfolio_config():
             'leverage': portfolio_rules.get('leverage', 3),
             'min_cash_reserve_percent': portfolio_rules.get('min_cash_reserve_percent', 10),
             'check_interval_minutes': portfolio_rules.get('check_interval_minutes', 5),  # 从配置文件读取
+            'align_to_candle_close': portfolio_rules.get('align_to_candle_close', True),
+            'candle_close_delay_seconds': portfolio_rules.get('candle_close_delay_seconds', 5),
             'test_mode': False  # 实盘模式
         }
     except Exception as e:
@@ -320,6 +350,8 @@ def load_portfolio_config():
             'leverage': 3,
             'min_cash_reserve_percent': 10,
             'check_interval_minutes': 5,
+            'align_to_candle_close': True,
+            'candle_close_delay_seconds': 5,
             'test_mode': False
         }
 
@@ -327,15 +359,45 @@ PORTFOLIO_CONFIG = load_portfolio_config()
 print(f"📋 配置加载成功 - 杠杆: {PORTFOLIO_CONFIG['leverage']}x, 最低保留资金: {PORTFOLIO_CONFIG['min_cash_reserve_percent']}%")
 
 
+def prompt_config():
+    """提示词配置（coins_config.json 的 prompt 字段），每轮读取，修改配置文件后下一轮生效"""
+    config = market_scanner.coins_config.get('prompt', {})
+    encoding = config.get('encoding', 'text')
+    if encoding not in ENCODINGS:
+        print(f"⚠️ 未知的行情编码 {encoding}，使用 text")
+        encoding = 'text'
+    return {'encoding': encoding, 'token_budget': int(config.get('token_budget', 0) or 0)}
+
+
+def llm_config():
+    """AI调用配置（coins_config.json 的 llm 字段），每轮读取"""
+    config = market_scanner.coins_config.get('llm', {})
+    return {
+        'stream': bool(config.get('stream', False)),
+        'early_actions': set(config.get('early_actions', ['CLOSE', 'HOLD'])),
+        'shard_size': int(config.get('shard_size', 0) or 0),
+        'max_parallel': max(1, int(config.get('max_parallel', 4) or 1)),
+    }
+
+
+def coin_price_decimals(coin, price):
+    """行情紧凑编码的价格小数位：交易所市场精度 > 配置中的 price_precision > 按价格保留6位有效数字"""
+    info = market_scanner.symbols.get(coin)
+    market = info.market if info is not None else None
+    precision = (market.get('precision') or {}).get('price') if market else None
+    if precision is None and info is not None and info.price_precision is not None:
+        return price_decimals(price, info.price_precision, tick_size=False)
+    tick_size = getattr(exchange, 'precisionMode', ccxt.TICK_SIZE) == ccxt.TICK_SIZE
+    return price_decimals(price, precision, tick_size=tick_size)
+
+
 def setup_exchange():
     """设置交易所参数"""
     try:
         # 为所有币种设置杠杆（如果交易所不支持就跳过）
-        for coin_info in market_scanner.coins_config['coins']:
-            base_symbol = coin_info['symbol']  # CCXT基础格式 ETH/USDT
-            symbol = format_symbol_for_exchange(base_symbol, exchange)
-            
-            coin_name = base_symbol.split('/')[0]
+        for coin_info in market_scanner.symbols:
+            symbol = coin_info.symbol
+            coin_name = coin_info.coin
             try:
                 # 逐仓模式（isolated margin）- 更安全，风险隔离
                 exchange.set_leverage(PORTFOLIO_CONFIG['leverage'], symbol)
@@ -394,43 +456,191 @@ def safe_json_parse(json_str):
 
 
 
-def _build_kline_text(klines, title, count):
-    if not klines:
-        return f"【{title}】: 无数据"
+def render_system_message(external_prompt, leverage, min_cash_reserve_percent, coin_limits_text, market_encoding='text'):
+    """构建 System Message（身份 + 策略 + 格式规则），只依赖配置和外部提示词，不能包含每轮变化的数据"""
+    return f"""您是专业的加密货币投资组合经理(Portfolio Manager)。
+
+{external_prompt}
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📝 返回格式要求（JSON）
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+格式示例：
+{{{{
+  "decisions": [
+    {{{{
+      "coin": "ETH",
+      "action": "OPEN_LONG | OPEN_SHORT | CLOSE | ADD | HOLD",
+      "reason": "K线形态 | 技术指标说明",
+      "position_value": 100,
+      "stop_loss": 3200.5,
+      "take_profit": 3500.0
+    }}}}
+  ],
+  "strategy": "整体策略说明",
+  "risk_level": "LOW | MEDIUM | HIGH",
+  "confidence": "LOW | MEDIUM | HIGH"
+}}}}
+
+⚠️ 语言要求（重要）：
+- 所有文本字段（reason、strategy）必须使用简体中文
+- 保持简洁专业，每个 reason 不超过 80 字
+- 避免冗长描述和重复内容
+
+⚠️ 字段说明：
+- action: 操作类型（OPEN_LONG/OPEN_SHORT/CLOSE/ADD/HOLD）
+- reason: 必须包含K线形态+技术指标，简洁明了
+- position_value: 保证金金额（USDT），系统会自动计算杠杆后的名义价值
+  * 示例：填 24 表示使用 24 USDT 保证金
+  * 实际开仓：24 × {leverage}倍杠杆 = {24 * leverage} USDT 名义价值
+  * HOLD/CLOSE时填0
+- stop_loss/take_profit: 必填具体价格（CLOSE时可填0）
+- decisions为空数组时表示观望
+
+💡 移动止损机制（重要）：
+当您想要移动止损时，只需在HOLD操作中填入新的stop_loss价格即可。
+示例：
+{{{{
+  "coin": "BTC",
+  "action": "HOLD",
+  "stop_loss": 45000,
+  "take_profit": 50000,
+  "reason": "已盈利5%，上移止损至45000保护利润"
+}}}}
+系统会自动：
+1. 取消旧的止损订单
+2. 创建新的止损订单
+您无需做任何额外操作，只需提供新价格。
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+⚠️ 硬性规则（系统限制，必须遵守）
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+1. 资金保护（重要）：
+   - 必须保留至少 {min_cash_reserve_percent}% 的账户总资产作为手续费和风险缓冲
+   - 最大可用保证金 = 账户总资产 × {100-min_cash_reserve_percent}% - 已用保证金
+   - 示例：总资产 100 USDT，已用 50 USDT → 最多还能用 {100*(100-min_cash_reserve_percent)/100-50} USDT (100×{(100-min_cash_reserve_percent)/100}-50)
+   - 这是为了确保有足够资金支付手续费和应对突发波动
+
+2. 杠杆固定：当前使用 {leverage}x 杠杆，由系统管理，无需考虑调整
+
+3. 最小开仓金额说明：
+   ⚠️ 重要：position_value 填写的是保证金金额，不是杠杆后的名义价值
+   
+   计算公式：
+   - 名义价值 = position_value（保证金）× {leverage}（杠杆）
+   - 示例：position_value=24 → 实际开仓 24×{leverage}={24*leverage} USDT 名义价值
+   
+   最小限制（针对保证金）：
+   - 🔒 全局限制：任何币种的保证金不得低于 10 USDT（硬编码）
+   - 币种限制：{coin_limits_text}
+   - 实际生效：取两者中的较大值
+
+4. 止损必填：所有开仓（OPEN_LONG/OPEN_SHORT）和持仓（HOLD）必须提供止损价格{COMPACT_LEGEND if market_encoding == 'compact' else ''}
+
+请基于用户消息中的数据和上述策略进行分析，严格按JSON格式返回决策。"""
+
+
+# 外部提示词（策略和理念）文件修改或配置变化时才重新构建
+SYSTEM_PROMPT = SystemPromptCache(os.path.join(PROJECT_ROOT, 'prompts', 'default.txt'), render_system_message)
+PROMPT_CACHE_STATS = PromptCacheStats()
+
+
+def request_ai_reply(request):
+    """非流式调用AI，返回 (回复文本, usage)"""
+    response = deepseek_client.chat.completions.create(stream=False, **request)
+    return response.choices[0].message.content, getattr(response, 'usage', None)
+
+
+def parse_ai_reply(result):
+    """从回复中提取JSON（第一个 { 到最后一个 }），解析失败时返回None"""
+    start_idx = result.find('{')
+    end_idx = result.rfind('}') + 1
+    if start_idx != -1 and end_idx != 0:
+        return safe_json_parse(result[start_idx:end_idx])
+    return None
+
+
+def record_prompt_cache(response_usage):
+    usage = PROMPT_CACHE_STATS.record(response_usage)
+    if usage['cached_tokens'] is not None:
+        print(f"🧠 前缀缓存: 命中 {usage['cached_tokens']}/{usage['prompt_tokens']} 输入tokens | "
+              f"累计命中率 {PROMPT_CACHE_STATS.hit_rate:.1f}% | 系统提示词 {SYSTEM_PROMPT.hash}")
+
+
+def stream_ai_decisions(request, market_data, early_actions, decisions=None):
+    """
+    流式调用AI：每收到一个完整的决策就解析出来，early_actions 中的操作（默认 CLOSE / HOLD）立即执行，
+    不用等其余决策生成完；开仓/加仓需要结合整体策略和资金保留规则，仍在完整回复后执行
+
+    :param request: chat.completions.create 的参数（不含 stream）
+    :param decisions: 接收解析出的决策的列表（由调用方传入时，流式中途出错也能拿到已提前执行的决策）
+    :return: (完整回复文本, 流式解析出的决策列表, usage)
+    """
+    parser = DecisionStreamParser(safe_json_parse)
+    decisions = [] if decisions is None else decisions
+    usage = None
+    early_count = 0
+    started = time.perf_counter()
+    CYCLE_TIMER.start('llm')
+    try:
+        stream = deepseek_client.chat.completions.create(
+            stream=True,
+            stream_options={'include_usage': True},
+            **request
+        )
+        for chunk in stream:
+            if getattr(chunk, 'usage', None) is not None:
+                usage = chunk.usage
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            for decision in parser.feed(chunk.choices[0].delta.content):
+                decisions.append(decision)
+                if len(decisions) == 1:
+                    CYCLE_TIMER.record('first_decision', time.perf_counter() - started)
+                if decision['action'] in early_actions and not PORTFOLIO_CONFIG['test_mode']:
+                    # 执行期间服务端继续生成后面的决策，执行耗时计入执行阶段
+                    CYCLE_TIMER.stop('llm')
+                    with CYCLE_TIMER.stage('execute'):
+                        execute_decision(decision, market_data, len(decisions))
+                    CYCLE_TIMER.start('llm')
+                    decision['executed_early'] = True
+                    early_count += 1
+    finally:
+        CYCLE_TIMER.stop('llm')
+
+    elapsed = time.perf_counter() - started
+    first_decision = CYCLE_TIMER.metrics.get('first_decision')
+    if first_decision is not None:
+        print(f"⚡ 流式回复: 首个决策 {first_decision:.2f}秒 | 完整回复 {elapsed:.2f}秒 | "
+              f"提前执行 {early_count}/{len(decisions)} 个决策")
+    else:
+        print(f"⚡ 流式回复: 完整回复 {elapsed:.2f}秒，未解析出决策")
+    return parser.text, decisions, usage
+
+
+def merge_streamed_decisions(decisions_data, streamed):
+    """流式解析的决策与完整回复的解析结果合并：保留提前执行标记，strategy 等字段取自完整回复"""
+    if not decisions_data or 'decisions' not in decisions_data:
+        return {'decisions': streamed, 'strategy': '', 'risk_level': 'UNKNOWN', 'confidence': 'UNKNOWN'}
+    decisions = decisions_data['decisions']
+    if len(decisions) <= len(streamed):
+        decisions_data['decisions'] = streamed
+        return decisions_data
+    # 完整回复经过容错处理解析出更多决策时，以完整回复为准，按币种和操作标记已提前执行的决策
+    for early in (d for d in streamed if d.get('executed_early')):
+        for decision in decisions:
+            if not decision.get('executed_early') and decision.get('coin') == early['coin'] \
+                    and decision.get('action') == early['action']:
+                decision['executed_early'] = True
+                break
+    return decisions_data
 
-    text = f"【{title}】最近 {count} 根:"
-    for i, kline in enumerate(klines[-count:], 1):
-        # 适配字典格式（market_scanner返回的格式）
-        if isinstance(kline, dict):
-            open_p = kline['open']
-            high_p = kline['high']
-            low_p = kline['low']
-            close_p = kline['close']
-            volume = kline['volume']
-        else:
-            # 兼容原始列表格式（币安API原始格式）
-            open_p, high_p, low_p, close_p, volume = kline[1:6]
-
-        change = ((close_p - open_p) / open_p * 100) if open_p > 0 else 0
-        body = "🟢" if close_p > open_p else "🔴" if close_p < open_p else "➖"
-        text += f"\n  K{i}: {body} O:{open_p} H:{high_p} L:{low_p} C:{close_p} ({change:+.2f}%) V:{volume}"
-    return text
-
-def _build_indicator_text(data, timeframe, indicators):
-    text = ""
-    for name, key in indicators:
-        value = data.get(key)
-        if value is not None:
-            if isinstance(value, dict): # 处理布林带等复合指标
-                value_str = f"Upper:{value.get('upper', 0):.2f}, Middle:{value.get('middle', 0):.2f}, Lower:{value.get('lower', 0):.2f}"
-            else:
-                value_str = f"{value:.4f}"
-            text += f"- {name}: {value_str}\n"
-    return text
 
 def analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, account_info):
     """AI投资组合分析"""
 
+    CYCLE_TIMER.start('prompt')
+
     # 更新调用次数
     global INVOCATION_COUNT
     INVOCATION_COUNT += 1
@@ -607,70 +817,11 @@ def analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, accoun
     - {coin} {sl['side'].upper()}仓 | 开仓{format_price(sl['entry_price'], coin)} → 止损{format_price(sl['stop_price'], coin)} | 盈亏{sl['pnl']:+.2f} USDT | 触发时间{trigger_time} (开仓后{duration}分钟)"""
         portfolio_text += stop_loss_text
     
-    # 构建各币种行情（多周期技术指标）
-    market_text = "\n【各币种市场分析】"
-    for coin, data in market_data.items():
-        # 格式化价格
-        price_display = format_price(data['price'], coin)
-
-        # 资金费率
-        funding_rate = data.get('funding_rate')
-        if funding_rate is not None:
-            funding_text = f"{funding_rate:.6f} {'(多头付费)' if funding_rate > 0 else '(空头付费)' if funding_rate < 0 else '(中性)'}"
-        else:
-            funding_text = "⚠️ 数据不可用"
-
-        # 持仓量
-        open_interest = data.get('open_interest')
-        if open_interest is not None:
-            open_interest_text = f"{open_interest:,.0f}"
-        else:
-            open_interest_text = "⚠️ 数据不可用"
-
-        # 构建各周期文本
-        kline_5m_text = _build_kline_text(data.get('kline_5m'), "5分钟K线 (执行层)", 13)
-        kline_15m_text = _build_kline_text(data.get('kline_15m'), "15分钟K线 (战术层)", 16)
-        kline_1h_text = _build_kline_text(data.get('kline_1h'), "1小时K线 (策略层)", 10)
-        kline_4h_text = _build_kline_text(data.get('kline_4h'), "4小时K线 (战略层)", 6)
-
-        indicators_15m_text = _build_indicator_text(data, '15m', [
-            ('EMA(20)', 'ema_20_15m'), ('EMA(50)', 'ema_50_15m'),
-            ('RSI(14)', 'rsi_14_15m'), ('MACD', 'macd_15m')
-        ])
-
-        indicators_1h_text = _build_indicator_text(data, '1h', [
-            ('EMA(20)', 'ema_20_1h'), ('EMA(50)', 'ema_50_1h'),
-            ('ATR(14)', 'atr_14_1h'), ('BBands(20,2)', 'bbands_1h')
-        ])
-
-        indicators_4h_text = _build_indicator_text(data, '4h', [
-            ('EMA(20)', 'ema_20_4h'), ('EMA(50)', 'ema_50_4h'),
-            ('ATR(14)', 'atr_14_4h')
-        ])
-
-        market_text += f"""
-
-    {coin}/USDT:
-    - 价格: {price_display} | 24h: {data.get('change_24h', 0):+.2f}%
-    - 资金费率: {funding_text} | 持仓量: {open_interest_text}
-    - 最小开仓: {data.get('min_order_value', 0)} USDT
-
-    --- 5分钟周期 (执行层) ---
-    {kline_5m_text}
-    - ATR(14): {data.get('atr_14_5m', 0):.4f}
-
-    --- 15分钟周期 (战术层) ---
-    {kline_15m_text}
-    {indicators_15m_text}
-
-    --- 1小时周期 (策略层) ---
-    {kline_1h_text}
-    {indicators_1h_text}
-
-    --- 4小时周期 (战略层) ---
-    {kline_4h_text}
-    {indicators_4h_text}
-    """
+    # 各币种行情的编码方式（多周期技术指标，在 token 预算调整后构建）
+    prompt_settings = prompt_config()
+    market_encoding = prompt_settings['encoding']
+    decimals = {coin: coin_price_decimals(coin, data['price']) for coin, data in market_data.items()} \
+        if market_encoding == 'compact' else {}
     
     # 获取统计信息
     stats_text = portfolio_stats.generate_stats_text_for_ai()
@@ -710,27 +861,23 @@ def analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, accoun
     else:
         runtime_text = f"{elapsed_hours:.1f}小时 ({elapsed_minutes}分钟)"
 
-    # 加载外部提示词（策略和理念）
-    external_prompt = ""
-    try:
-        prompt_file = os.path.join(PROJECT_ROOT, 'prompts', 'default.txt')
-        with open(prompt_file, 'r', encoding='utf-8') as f:
-            external_prompt = f.read()
-    except FileNotFoundError:
-        print("⚠️ 外部提示词文件不存在，使用默认配置")
-        external_prompt = ""
-    except Exception as e:
-        print(f"⚠️ 读取外部提示词失败: {e}")
-        external_prompt = ""
-
     # 动态生成币种最小限制说明（从配置文件读取）
     coin_limits = []
-    for coin_info in market_scanner.coins_config['coins']:
-        coin_limits.append(f"{coin_info['symbol']} {coin_info['min_order_value']}")
+    for coin_info in market_scanner.symbols:
+        coin_limits.append(f"{coin_info.base_symbol} {coin_info.min_order_value}")
     coin_limits_text = " | ".join(coin_limits)
 
+    # System Message（身份 + 策略 + 格式规则）只由配置和提示词文件决定，各轮逐字节相同以命中前缀缓存
+    system_message = SYSTEM_PROMPT.get(
+        leverage=PORTFOLIO_CONFIG['leverage'],
+        min_cash_reserve_percent=PORTFOLIO_CONFIG['min_cash_reserve_percent'],
+        coin_limits_text=coin_limits_text,
+        market_encoding=market_encoding
+    )
+
     # 构建 User Message（仅包含变化的数据）
-    user_message = f"""
+    def render_user_message(stats_text, last_decisions_text, market_text):
+        return f"""
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 ⚠️ 系统运行状态
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
@@ -762,113 +909,84 @@ def analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, accoun
 {market_text}
 """
 
-    try:
-        # 构建 System Message（身份 + 策略 + 格式规则，不变的内容）
-        system_message = f"""您是专业的加密货币投资组合经理(Portfolio Manager)。
-
-{external_prompt}
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-📝 返回格式要求（JSON）
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-格式示例：
-{{{{
-  "decisions": [
-    {{{{
-      "coin": "ETH",
-      "action": "OPEN_LONG | OPEN_SHORT | CLOSE | ADD | HOLD",
-      "reason": "K线形态 | 技术指标说明",
-      "position_value": 100,
-      "stop_loss": 3200.5,
-      "take_profit": 3500.0
-    }}}}
-  ],
-  "strategy": "整体策略说明",
-  "risk_level": "LOW | MEDIUM | HIGH",
-  "confidence": "LOW | MEDIUM | HIGH"
-}}}}
-
-⚠️ 语言要求（重要）：
-- 所有文本字段（reason、strategy）必须使用简体中文
-- 保持简洁专业，每个 reason 不超过 80 字
-- 避免冗长描述和重复内容
-
-⚠️ 字段说明：
-- action: 操作类型（OPEN_LONG/OPEN_SHORT/CLOSE/ADD/HOLD）
-- reason: 必须包含K线形态+技术指标，简洁明了
-- position_value: 保证金金额（USDT），系统会自动计算杠杆后的名义价值
-  * 示例：填 24 表示使用 24 USDT 保证金
-  * 实际开仓：24 × {PORTFOLIO_CONFIG['leverage']}倍杠杆 = {24 * PORTFOLIO_CONFIG['leverage']} USDT 名义价值
-  * HOLD/CLOSE时填0
-- stop_loss/take_profit: 必填具体价格（CLOSE时可填0）
-- decisions为空数组时表示观望
-
-💡 移动止损机制（重要）：
-当您想要移动止损时，只需在HOLD操作中填入新的stop_loss价格即可。
-示例：
-{{{{
-  "coin": "BTC",
-  "action": "HOLD",
-  "stop_loss": 45000,
-  "take_profit": 50000,
-  "reason": "已盈利5%，上移止损至45000保护利润"
-}}}}
-系统会自动：
-1. 取消旧的止损订单
-2. 创建新的止损订单
-您无需做任何额外操作，只需提供新价格。
-
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-⚠️ 硬性规则（系统限制，必须遵守）
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-1. 资金保护（重要）：
-   - 必须保留至少 {PORTFOLIO_CONFIG['min_cash_reserve_percent']}% 的账户总资产作为手续费和风险缓冲
-   - 最大可用保证金 = 账户总资产 × {100-PORTFOLIO_CONFIG['min_cash_reserve_percent']}% - 已用保证金
-   - 示例：总资产 100 USDT，已用 50 USDT → 最多还能用 {100*(100-PORTFOLIO_CONFIG['min_cash_reserve_percent'])/100-50} USDT (100×{(100-PORTFOLIO_CONFIG['min_cash_reserve_percent'])/100}-50)
-   - 这是为了确保有足够资金支付手续费和应对突发波动
-
-2. 杠杆固定：当前使用 {PORTFOLIO_CONFIG['leverage']}x 杠杆，由系统管理，无需考虑调整
-
-3. 最小开仓金额说明：
-   ⚠️ 重要：position_value 填写的是保证金金额，不是杠杆后的名义价值
-   
-   计算公式：
-   - 名义价值 = position_value（保证金）× {PORTFOLIO_CONFIG['leverage']}（杠杆）
-   - 示例：position_value=24 → 实际开仓 24×{PORTFOLIO_CONFIG['leverage']}={24*PORTFOLIO_CONFIG['leverage']} USDT 名义价值
-   
-   最小限制（针对保证金）：
-   - 🔒 全局限制：任何币种的保证金不得低于 10 USDT（硬编码）
-   - 币种限制：{coin_limits_text}
-   - 实际生效：取两者中的较大值
-
-4. 止损必填：所有开仓（OPEN_LONG/OPEN_SHORT）和持仓（HOLD）必须提供止损价格
-
-请基于用户消息中的数据和上述策略进行分析，严格按JSON格式返回决策。"""
+    # Token 预算：超出时按优先级降级决策记录、统计和各币种行情（BTC背景和投资组合不降级，见 prompt_budget.py）
+    token_budget = prompt_settings['token_budget']
+    held_coins = [coin for coin, pos in portfolio_positions.items() if pos]
+
+    def prepare_user_message(coins_data, market_header=MARKET_HEADER):
+        fitted = fit_prompt(
+            token_budget,
+            count_tokens(system_message) + count_tokens(render_user_message('', '', market_header)),
+            {'stats': stats_text, 'last_decisions': last_decisions_text},
+            coins_data,
+            lambda coin, level: build_coin_text(coin, coins_data[coin], market_encoding, decimals.get(coin), level),
+            held=held_coins
+        )
+        market_text = market_header + ''.join(fitted['coin_texts'][coin] for coin in coins_data)
+        user_message = render_user_message(fitted['sections']['stats'], fitted['sections']['last_decisions'], market_text)
+        return user_message, market_text, fitted
 
-        response = deepseek_client.chat.completions.create(
+    def build_request(user_message):
+        return dict(
             model=os.getenv('OPENAI_MODEL_NAME', 'deepseek-chat'),
             messages=[
                 {"role": "system", "content": system_message},
                 {"role": "user", "content": user_message}
             ],
-            stream=False,
             temperature=0.3,
             timeout=120  # 120秒超时，避免长时间等待
         )
-        
-        result = response.choices[0].message.content
+
+    llm_settings = llm_config()
+    shards = shard_coins(list(market_data), llm_settings['shard_size'])
+    if len(shards) > 1:
+        return analyze_shards(shards, market_data, account_info, prepare_user_message, build_request, llm_settings)
+
+    user_message, market_text, fitted = prepare_user_message(market_data)
+
+    section_tokens = {
+        'btc': count_tokens(btc_text),
+        'portfolio': count_tokens(portfolio_text),
+        'stats': count_tokens(fitted['sections']['stats']),
+        'last_decisions': count_tokens(fitted['sections']['last_decisions']),
+        'market': count_tokens(market_text),
+    }
+    size_text = ' | '.join(f"{SECTION_LABELS[name]} {tokens}" for name, tokens in section_tokens.items())
+    if market_encoding != 'text':
+        text_tokens = count_tokens(build_market_text(market_data, 'text', levels=fitted['levels']))
+        size_text += f"（text编码 {text_tokens}，减少 {(1 - section_tokens['market'] / text_tokens) * 100 if text_tokens else 0:.0f}%）"
+    print(f"📏 提示词大小: 系统 {count_tokens(system_message)} + 用户 {count_tokens(user_message)} tokens | "
+          f"{size_text} | {market_encoding}编码，{token_counter()}计数")
+    if token_budget:
+        print(f"🎯 Token预算 {token_budget}: {fitted['before']} → {fitted['tokens']}（{format_applied(fitted['applied'])}）")
+        if not fitted['fits']:
+            print(f"⚠️ 已降级到底仍超出 Token 预算 {token_budget}，请提高预算或减少币种数")
+
+    CYCLE_TIMER.stop('prompt')
+
+    request = build_request(user_message)
+
+    streamed_decisions = []
+    try:
+        if llm_settings['stream']:
+            result, _, response_usage = stream_ai_decisions(
+                request, market_data, llm_settings['early_actions'], streamed_decisions)
+        else:
+            with CYCLE_TIMER.stage('llm'):
+                result, response_usage = request_ai_reply(request)
         print(f"\n🤖 AI原始回复:\n{result}\n")
+
+        record_prompt_cache(response_usage)
         
         # 提取JSON
-        start_idx = result.find('{')
-        end_idx = result.rfind('}') + 1
-        
-        if start_idx != -1 and end_idx != 0:
-            json_str = result[start_idx:end_idx]
-            decisions_data = safe_json_parse(json_str)
+        with CYCLE_TIMER.stage('parse'):
+            decisions_data = parse_ai_reply(result)
+
+            if streamed_decisions:
+                decisions_data = merge_streamed_decisions(decisions_data, streamed_decisions)
             
-            if decisions_data and 'decisions' in decisions_data:
-                return decisions_data
+        if decisions_data and 'decisions' in decisions_data:
+            return decisions_data
         
         return {'decisions': [], 'strategy': '无操作', 'risk_level': 'LOW', 'confidence': 'LOW'}
         
@@ -876,17 +994,383 @@ def analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, accoun
         error_msg = str(e).lower()
         if "timeout" in error_msg or "timed out" in error_msg:
             print(f"⚠️ AI调用超时（120秒），本次跳过决策（HOLD）")
-            return {'decisions': [], 'strategy': 'AI服务超时，保持观望', 'risk_level': 'HIGH', 'confidence': 'LOW'}
+            strategy = 'AI服务超时，保持观望'
         else:
             print(f"❌ AI分析失败: {e}")
+            strategy = 'AI服务异常，保持观望'
+        # 流式回复中途出错时，已提前执行的决策（已经发到交易所）照常返回并记录，其余决策放弃
+        executed = [d for d in streamed_decisions if d.get('executed_early')]
+        if executed:
+            executed_text = ', '.join(f"{d['coin']} {d['action']}" for d in executed)
+            print(f"⚠️ 流式回复中断，已提前执行的 {len(executed)} 个决策照常记录: {executed_text}")
+            strategy = f"{strategy}（中断前已执行 {len(executed)} 个决策）"
+        return {'decisions': executed, 'strategy': strategy, 'risk_level': 'HIGH', 'confidence': 'LOW'}
+
+
+def analyze_shards(shards, market_data, account_info, prepare_user_message, build_request, llm_settings):
+    """
+    分片模式：每组币种一个提示词（共享BTC背景、投资组合、统计和决策记录），并行请求AI，
+    合并各分片的决策后按全局资金保留规则统一调整开仓金额（见 decision_merge.py）
+    """
+    if llm_settings['stream']:
+        print("ℹ️ 分片模式不使用流式接收，各分片完整回复后统一执行")
+
+    requests = []
+    sizes = []
+    for coins in shards:
+        header = (f"{MARKET_HEADER}（本次只分析 {', '.join(coins)}，其余币种由并行请求分析，"
+                  f"开仓保证金总额由系统按资金保留规则统一调整）")
+        user_message, _, _ = prepare_user_message({coin: market_data[coin] for coin in coins}, header)
+        requests.append(build_request(user_message))
+        sizes.append(count_tokens(user_message))
+    print(f"📏 分片提示词: {len(shards)} 个分片 × 每组最多 {llm_settings['shard_size']} 个币种 | "
+          f"系统 {count_tokens(requests[0]['messages'][0]['content'])} + 用户 {'/'.join(map(str, sizes))} tokens")
+
+    CYCLE_TIMER.stop('prompt')
+
+    def run(request):
+        started = time.perf_counter()
+        try:
+            result, usage = request_ai_reply(request)
+        except Exception as e:
+            print(f"❌ 分片AI分析失败: {e}")
+            result, usage = None, None
+        return result, usage, time.perf_counter() - started
+
+    with CYCLE_TIMER.stage('llm'):
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=llm_settings['max_parallel'], thread_name_prefix='ai-shard') as pool:
+            replies = list(pool.map(run, requests))
+        wall = time.perf_counter() - started
+
+    serial = sum(elapsed for _, _, elapsed in replies)
+    CYCLE_TIMER.record('llm_serial', serial)
+    print(f"🧩 分片分析: {len(shards)} 个分片并行 | 墙钟 {wall:.2f}秒 | 各分片 "
+          f"{'/'.join(f'{elapsed:.2f}' for _, _, elapsed in replies)}秒（合计 {serial:.2f}秒）")
+
+    with CYCLE_TIMER.stage('parse'):
+        results = []
+        for coins, (result, usage, _) in zip(shards, replies):
+            if result is None:
+                results.append(None)
+                continue
+            print(f"\n🤖 AI原始回复（{'/'.join(coins)}）:\n{result}\n")
+            record_prompt_cache(usage)
+            results.append(parse_ai_reply(result))
+        if not any(results):
             return {'decisions': [], 'strategy': 'AI服务异常，保持观望', 'risk_level': 'HIGH', 'confidence': 'LOW'}
 
+        decisions_data = merge_shard_decisions(shards, results)
+        min_order_values = {info.coin: info.min_order_value for info in market_scanner.symbols}
+        decisions_data['decisions'] = enforce_cash_reserve(
+            decisions_data['decisions'], account_info, PORTFOLIO_CONFIG['min_cash_reserve_percent'], min_order_values)
+    return decisions_data
+
 # ==========================================
 # 下单逻辑说明：
 # CCXT 支持直接用 USDT 金额下单，无需手动计算币数量
 # 使用 params={'cost': usdt_value} 即可
 # ==========================================
 
+def execute_decision(decision, market_data, i, total=None):
+    """
+    执行单个决策
+    :param i: 决策序号（日志用）
+    :param total: 决策总数；流式回复中提前执行时总数未知，为None
+    """
+    coin = decision['coin']
+    action = decision['action']
+    reason = decision['reason']
+    position_value = float(decision.get('position_value', 0))
+    stop_loss = float(decision.get('stop_loss', 0))
+    take_profit = float(decision.get('take_profit', 0))
+    
+    print(f"\n{'─'*60}")
+    print(f"决策 {i}/{total}: {coin}" if total else f"决策 {i}: {coin}（流式提前执行）")
+    print(f"操作: {action}")
+    print(f"理由: {reason}")
+    print(f"开仓金额: {position_value:.2f} USDT")
+    if stop_loss > 0:
+        print(f"止损: {format_price(stop_loss, coin)}")
+    if take_profit > 0:
+        print(f"止盈: {format_price(take_profit, coin)}")
+    print(f"{'─'*60}")
+    
+    try:
+        # 匹配币种：支持 "ETH" 匹配到 "ETH/USDT"
+        coin_info = market_scanner.symbols.get(coin)
+        if not coin_info:
+            print(f"❌ 未找到{coin}的配置")
+            return
+        
+        symbol = coin_info.symbol  # 交易所格式（如 Gate.io 的 ETH/USDT:USDT）
+        coin_market = market_data.get(coin)
+        if not coin_market:
+            print(f"❌ 未找到{coin}的市场数据")
+            return
+        
+        current_price = coin_market['price']
+        
+        # 获取当前持仓
+        positions = market_scanner.get_portfolio_positions()
+        current_position = positions.get(coin)
+        
+        if action == 'HOLD':
+            if current_position:
+                print(f"💎 持仓: {current_position['amount']} {coin} ({current_position['side']})")
+                print(f"   当前盈亏: {current_position.get('pnl', 0):.2f} USDT")
+                
+                # 检查止损价格是否变化（AI可能动态调整）
+                old_stop_loss = current_position.get('stop_loss', 0)
+                stop_order_id = 0
+
+                if stop_loss != old_stop_loss and stop_loss > 0:
+                    print(f"   🔄 止损价格变化: {format_price(old_stop_loss, coin)} → {format_price(stop_loss, coin)}")
+
+                    # 使用"先建后删"策略，确保始终有止损保护
+                    new_stop_order = None
+                    try:
+                        # 1. 先下新止损单
+                        side_for_stop = 'sell' if current_position['side'] == 'long' else 'buy'
+                        amount_for_stop = current_position['amount']
+
+                        # 创建止损单（自动适配交易所）
+                        new_stop_order = create_stop_order(
+                            exchange, symbol, side_for_stop, amount_for_stop, stop_loss
+                        )
+                        stop_order_id = new_stop_order.get('id', '')
+                        print(f"   ✅ 新止损单已下: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
+
+                        # 2. 新止损单成功后，再取消旧止损单
+                        portfolio_stats.cancel_stop_loss_order(coin, symbol)
+                        print(f"   ✅ 旧止损单已取消")
+
+                    except Exception as e:
+                        print(f"   ❌ 调整止损失败: {str(e)[:100]}")
+                        # 如果新止损单已创建但后续步骤失败，尝试回滚
+                        if new_stop_order and 'id' in new_stop_order:
+                            try:
+                                exchange.cancel_order(new_stop_order['id'], symbol)
+                                print(f"   ↩️ 已回滚新止损单")
+                            except:
+                                print(f"   ⚠️ 回滚失败，可能同时存在两个止损单，请手动检查")
+                        # 保持旧止损单不变
+                        stop_order_id = current_position.get('stop_order_id', 0)
+
+                # 更新止损止盈（AI可能动态调整）
+                portfolio_stats.update_stop_loss_take_profit(coin, stop_loss, take_profit, stop_order_id)
+                print(f"✅ {coin} 继续持仓")
+            else:
+                print(f"⚠️ {coin} 无持仓但AI决定HOLD（可能是观望状态）")
+        
+        elif action == 'CLOSE':
+            if current_position:
+                amount = current_position['amount']  # CCXT自动处理精度
+                side = 'SELL' if current_position['side'] == 'long' else 'BUY'
+                
+                print(f"📤 平{current_position['side']}仓: {amount} {coin}")
+                
+                # 1. 先取消止损单（如果存在）
+                portfolio_stats.cancel_stop_loss_order(coin, symbol)
+                
+                # 2. 平仓 - CCXT
+                exchange.create_order(
+                    symbol=symbol,
+                    type='market',
+                    side='sell' if current_position['side'] == 'long' else 'buy',
+                    amount=amount,
+                    params={'reduceOnly': True}
+                )
+                
+                # 3. 记录平仓
+                portfolio_stats.record_trade_exit(coin, current_price, 'ai_decision')
+                print(f"✅ {coin} 平仓成功")
+            else:
+                print(f"⚠️ {coin} 无持仓，跳过平仓")
+        
+        elif action in ['OPEN_LONG', 'OPEN_SHORT', 'ADD']:
+            # 检查仓位价值是否符合最小要求
+            GLOBAL_MIN_ORDER_VALUE = 10  # USDT
+            if position_value < GLOBAL_MIN_ORDER_VALUE:
+                print(f"⚠️ {coin}: {position_value:.2f} USDT < 最小限制 {GLOBAL_MIN_ORDER_VALUE} USDT")
+                return
+            
+            if action == 'OPEN_LONG' or (action == 'ADD' and current_position and current_position['side'] == 'long'):
+                print(f"📈 {'开' if action == 'OPEN_LONG' else '加'}多仓: 保证金 ${position_value:.2f} USDT (杠杆 {PORTFOLIO_CONFIG['leverage']}x)")
+                
+                try:
+                    # 1. 计算合约张数（保证金模式）
+                    leverage = PORTFOLIO_CONFIG['leverage']
+                    
+                    # 获取市场信息（合约面值来自交易对注册表）
+                    contract_size = coin_info.contract_size
+                    if contract_size is not None:
+                        # 合约市场：保证金 × 杠杆 = 名义价值
+                        nominal_value = position_value * leverage
+                        eth_needed = nominal_value / current_price
+                        contracts = eth_needed / contract_size
+                        contracts = max(1, round(contracts))  # 至少1张，四舍五入
+                        
+                        print(f"   📊 合约模式: 保证金 {position_value:.2f} × {leverage}x = {nominal_value:.2f} USDT → {contracts} 张")
+                        
+                        order = exchange.create_order(
+                            symbol=symbol,
+                            type='market',
+                            side='buy',
+                            amount=contracts
+                        )
+                    else:
+                        # 现货市场：直接用 USDT 金额购买（无杠杆）
+                        print(f"   📊 现货模式: 直接使用 {position_value:.2f} USDT")
+                        
+                        # 先尝试 cost 参数
+                        try:
+                            order = exchange.create_order(
+                                symbol=symbol,
+                                type='market',
+                                side='buy',
+                                amount=None,
+                                params={'cost': position_value}
+                            )
+                        except:
+                            # fallback: 手动计算
+                            amount = position_value / current_price
+                            order = exchange.create_order(
+                                symbol=symbol,
+                                type='market',
+                                side='buy',
+                                amount=amount
+                            )
+                    
+                    # 从订单结果获取实际成交数量
+                    if order and 'filled' in order and order['filled'] is not None:
+                        filled_amount = float(order['filled'])
+                    elif order and 'amount' in order and order['amount'] is not None:
+                        filled_amount = float(order['amount'])
+                    else:
+                        print(f"   ⚠️ 订单结构异常: {order}")
+                        filled_amount = 0
+                except Exception as e:
+                    print(f"   ❌ 开仓失败: {e}")
+                    filled_amount = 0
+                
+                # 2. 立即下止损单（如果AI设置了止损价格）
+                stop_order_id = 0
+                if action == 'OPEN_LONG' and stop_loss > 0 and filled_amount > 0:
+                    try:
+                        stop_order = create_stop_order(
+                            exchange, symbol, 'sell', filled_amount, stop_loss
+                        )
+                        stop_order_id = stop_order.get('id', '')
+                        print(f"   🛡️ 止损单已设置: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
+                    except Exception as e:
+                        print(f"   ⚠️ 止损单下单失败: {str(e)[:200]}")
+                
+                # 3. 记录持仓
+                if action == 'OPEN_LONG' and filled_amount > 0:
+                    portfolio_stats.record_position_entry(coin, 'long', current_price, filled_amount, stop_loss, take_profit, stop_order_id)
+                
+                # 显示成功信息
+                contract_size = coin_info.contract_size
+                if contract_size is not None:
+                    eth_amount = filled_amount * contract_size
+                    print(f"✅ {coin} 多仓成功: {filled_amount:.0f} 张合约 (≈ {eth_amount:.4f} {coin})")
+                else:
+                    print(f"✅ {coin} 多仓成功 ({filled_amount:.4f} {coin})")
+                
+            elif action == 'OPEN_SHORT' or (action == 'ADD' and current_position and current_position['side'] == 'short'):
+                print(f"📉 {'开' if action == 'OPEN_SHORT' else '加'}空仓: 保证金 ${position_value:.2f} USDT (杠杆 {PORTFOLIO_CONFIG['leverage']}x)")
+                
+                try:
+                    # 1. 计算合约张数（保证金模式）
+                    leverage = PORTFOLIO_CONFIG['leverage']
+                    
+                    # 获取市场信息（合约面值来自交易对注册表）
+                    contract_size = coin_info.contract_size
+                    if contract_size is not None:
+                        # 合约市场：保证金 × 杠杆 = 名义价值
+                        nominal_value = position_value * leverage
+                        eth_needed = nominal_value / current_price
+                        contracts = eth_needed / contract_size
+                        contracts = max(1, round(contracts))  # 至少1张，四舍五入
+                        
+                        print(f"   📊 合约模式: 保证金 {position_value:.2f} × {leverage}x = {nominal_value:.2f} USDT → {contracts} 张")
+                        
+                        order = exchange.create_order(
+                            symbol=symbol,
+                            type='market',
+                            side='sell',
+                            amount=contracts
+                        )
+                    else:
+                        # 现货市场：直接用 USDT 金额购买（无杠杆）
+                        print(f"   📊 现货模式: 直接使用 {position_value:.2f} USDT")
+                        
+                        # 先尝试 cost 参数
+                        try:
+                            order = exchange.create_order(
+                                symbol=symbol,
+                                type='market',
+                                side='sell',
+                                amount=None,
+                                params={'cost': position_value}
+                            )
+                        except:
+                            # fallback: 手动计算
+                            amount = position_value / current_price
+                            order = exchange.create_order(
+                                symbol=symbol,
+                                type='market',
+                                side='sell',
+                                amount=amount
+                            )
+                    
+                    # 从订单结果获取实际成交数量
+                    if order and 'filled' in order and order['filled'] is not None:
+                        filled_amount = float(order['filled'])
+                    elif order and 'amount' in order and order['amount'] is not None:
+                        filled_amount = float(order['amount'])
+                    else:
+                        print(f"   ⚠️ 订单结构异常: {order}")
+                        filled_amount = 0
+                except Exception as e:
+                    print(f"   ❌ 开仓失败: {e}")
+                    filled_amount = 0
+                
+                # 2. 立即下止损单（如果AI设置了止损价格）
+                stop_order_id = 0
+                if action == 'OPEN_SHORT' and stop_loss > 0 and filled_amount > 0:
+                    try:
+                        stop_order = create_stop_order(
+                            exchange, symbol, 'buy', filled_amount, stop_loss
+                        )
+                        stop_order_id = stop_order.get('id', '')
+                        print(f"   🛡️ 止损单已设置: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
+                    except Exception as e:
+                        print(f"   ⚠️ 止损单下单失败: {str(e)[:200]}")
+                
+                # 3. 记录持仓
+                if action == 'OPEN_SHORT' and filled_amount > 0:
+                    portfolio_stats.record_position_entry(coin, 'short', current_price, filled_amount, stop_loss, take_profit, stop_order_id)
+                
+                # 显示成功信息
+                contract_size = coin_info.contract_size
+                if contract_size is not None:
+                    eth_amount = filled_amount * contract_size
+                    print(f"✅ {coin} 空仓成功: {filled_amount:.0f} 张合约 (≈ {eth_amount:.4f} {coin})")
+                else:
+                    print(f"✅ {coin} 空仓成功 ({filled_amount:.4f} {coin})")
+            else:
+                print(f"⚠️ {coin} 未知动作: {action}")
+        
+        time.sleep(0.5)  # 避免API限流
+        
+    except ccxt.ExchangeError as e:
+        print(f"❌ {coin} 交易所API错误: {e}")
+    except Exception as e:
+        print(f"❌ {coin} 执行失败: {e}")
+
+
 def execute_portfolio_decisions(decisions_data, market_data):
     """执行投资组合决策"""
     strategy = decisions_data.get('strategy', '')
@@ -951,305 +1435,12 @@ def execute_portfolio_decisions(decisions_data, market_data):
             print(f"{i}. {decision['coin']}: {decision['action']} - {decision['reason']}")
         return
     
-    # 执行每个决策
+    # 执行每个决策（流式回复时 CLOSE/HOLD 等可能已在接收过程中提前执行）
     for i, decision in enumerate(decisions, 1):
-        coin = decision['coin']
-        action = decision['action']
-        reason = decision['reason']
-        position_value = float(decision.get('position_value', 0))
-        stop_loss = float(decision.get('stop_loss', 0))
-        take_profit = float(decision.get('take_profit', 0))
-        
-        print(f"\n{'─'*60}")
-        print(f"决策 {i}/{len(decisions)}: {coin}")
-        print(f"操作: {action}")
-        print(f"理由: {reason}")
-        print(f"开仓金额: {position_value:.2f} USDT")
-        if stop_loss > 0:
-            print(f"止损: {format_price(stop_loss, coin)}")
-        if take_profit > 0:
-            print(f"止盈: {format_price(take_profit, coin)}")
-        print(f"{'─'*60}")
-        
-        try:
-            # 匹配币种：支持 "ETH" 匹配到 "ETH/USDT"
-            coin_info = next((c for c in market_scanner.coins_config['coins'] 
-                            if c['symbol'] == coin or c['symbol'].startswith(f"{coin}/")), None)
-            if not coin_info:
-                print(f"❌ 未找到{coin}的配置")
-                continue
-            
-            base_symbol = coin_info['symbol']  # CCXT基础格式 ETH/USDT
-            symbol = format_symbol_for_exchange(base_symbol, exchange)
-            coin_market = market_data.get(coin)
-            if not coin_market:
-                print(f"❌ 未找到{coin}的市场数据")
-                continue
-            
-            current_price = coin_market['price']
-            
-            # 获取当前持仓
-            positions = market_scanner.get_portfolio_positions()
-            current_position = positions.get(coin)
-            
-            if action == 'HOLD':
-                if current_position:
-                    print(f"💎 持仓: {current_position['amount']} {coin} ({current_position['side']})")
-                    print(f"   当前盈亏: {current_position.get('pnl', 0):.2f} USDT")
-                    
-                    # 检查止损价格是否变化（AI可能动态调整）
-                    old_stop_loss = current_position.get('stop_loss', 0)
-                    stop_order_id = 0
-
-                    if stop_loss != old_stop_loss and stop_loss > 0:
-                        print(f"   🔄 止损价格变化: {format_price(old_stop_loss, coin)} → {format_price(stop_loss, coin)}")
-
-                        # 使用"先建后删"策略，确保始终有止损保护
-                        new_stop_order = None
-                        try:
-                            # 1. 先下新止损单
-                            side_for_stop = 'sell' if current_position['side'] == 'long' else 'buy'
-                            amount_for_stop = current_position['amount']
-
-                            # 创建止损单（自动适配交易所）
-                            new_stop_order = create_stop_order(
-                                exchange, symbol, side_for_stop, amount_for_stop, stop_loss
-                            )
-                            stop_order_id = new_stop_order.get('id', '')
-                            print(f"   ✅ 新止损单已下: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
-
-                            # 2. 新止损单成功后，再取消旧止损单
-                            portfolio_stats.cancel_stop_loss_order(coin, symbol)
-                            print(f"   ✅ 旧止损单已取消")
-
-                        except Exception as e:
-                            print(f"   ❌ 调整止损失败: {str(e)[:100]}")
-                            # 如果新止损单已创建但后续步骤失败，尝试回滚
-                            if new_stop_order and 'id' in new_stop_order:
-                                try:
-                                    exchange.cancel_order(new_stop_order['id'], symbol)
-                                    print(f"   ↩️ 已回滚新止损单")
-                                except:
-                                    print(f"   ⚠️ 回滚失败，可能同时存在两个止损单，请手动检查")
-                            # 保持旧止损单不变
-                            stop_order_id = current_position.get('stop_order_id', 0)
-
-                    # 更新止损止盈（AI可能动态调整）
-                    portfolio_stats.update_stop_loss_take_profit(coin, stop_loss, take_profit, stop_order_id)
-                    print(f"✅ {coin} 继续持仓")
-                else:
-                    print(f"⚠️ {coin} 无持仓但AI决定HOLD（可能是观望状态）")
-            
-            elif action == 'CLOSE':
-                if current_position:
-                    amount = current_position['amount']  # CCXT自动处理精度
-                    side = 'SELL' if current_position['side'] == 'long' else 'BUY'
-                    
-                    print(f"📤 平{current_position['side']}仓: {amount} {coin}")
-                    
-                    # 1. 先取消止损单（如果存在）
-                    portfolio_stats.cancel_stop_loss_order(coin, symbol)
-                    
-                    # 2. 平仓 - CCXT
-                    exchange.create_order(
-                        symbol=symbol,
-                        type='market',
-                        side='sell' if current_position['side'] == 'long' else 'buy',
-                        amount=amount,
-                        params={'reduceOnly': True}
-                    )
-                    
-                    # 3. 记录平仓
-                    portfolio_stats.record_trade_exit(coin, current_price, 'ai_decision')
-                    print(f"✅ {coin} 平仓成功")
-                else:
-                    print(f"⚠️ {coin} 无持仓，跳过平仓")
-            
-            elif action in ['OPEN_LONG', 'OPEN_SHORT', 'ADD']:
-                # 检查仓位价值是否符合最小要求
-                GLOBAL_MIN_ORDER_VALUE = 10  # USDT
-                if position_value < GLOBAL_MIN_ORDER_VALUE:
-                    print(f"⚠️ {coin}: {position_value:.2f} USDT < 最小限制 {GLOBAL_MIN_ORDER_VALUE} USDT")
-                    continue
-                
-                if action == 'OPEN_LONG' or (action == 'ADD' and current_position and current_position['side'] == 'long'):
-                    print(f"📈 {'开' if action == 'OPEN_LONG' else '加'}多仓: 保证金 ${position_value:.2f} USDT (杠杆 {PORTFOLIO_CONFIG['leverage']}x)")
-                    
-                    try:
-                        # 1. 计算合约张数（保证金模式）
-                        leverage = PORTFOLIO_CONFIG['leverage']
-                        
-                        # 获取市场信息
-                        market = exchange.markets.get(symbol)
-                        if market and 'contractSize' in market:
-                            # 合约市场：保证金 × 杠杆 = 名义价值
-                            nominal_value = position_value * leverage
-                            contract_size = float(market['contractSize'])
-                            eth_needed = nominal_value / current_price
-                            contracts = eth_needed / contract_size
-                            contracts = max(1, round(contracts))  # 至少1张，四舍五入
-                            
-                            print(f"   📊 合约模式: 保证金 {position_value:.2f} × {leverage}x = {nominal_value:.2f} USDT → {contracts} 张")
-                            
-                            order = exchange.create_order(
-                                symbol=symbol,
-                                type='market',
-                                side='buy',
-                                amount=contracts
-                            )
-                        else:
-                            # 现货市场：直接用 USDT 金额购买（无杠杆）
-                            print(f"   📊 现货模式: 直接使用 {position_value:.2f} USDT")
-                            
-                            # 先尝试 cost 参数
-                            try:
-                                order = exchange.create_order(
-                                    symbol=symbol,
-                                    type='market',
-                                    side='buy',
-                                    amount=None,
-                                    params={'cost': position_value}
-                                )
-                            except:
-                                # fallback: 手动计算
-                                amount = position_value / current_price
-                                order = exchange.create_order(
-                                    symbol=symbol,
-                                    type='market',
-                                    side='buy',
-                                    amount=amount
-                                )
-                        
-                        # 从订单结果获取实际成交数量
-                        if order and 'filled' in order and order['filled'] is not None:
-                            filled_amount = float(order['filled'])
-                        elif order and 'amount' in order and order['amount'] is not None:
-                            filled_amount = float(order['amount'])
-                        else:
-                            print(f"   ⚠️ 订单结构异常: {order}")
-                            filled_amount = 0
-                    except Exception as e:
-                        print(f"   ❌ 开仓失败: {e}")
-                        filled_amount = 0
-                    
-                    # 2. 立即下止损单（如果AI设置了止损价格）
-                    stop_order_id = 0
-                    if action == 'OPEN_LONG' and stop_loss > 0 and filled_amount > 0:
-                        try:
-                            stop_order = create_stop_order(
-                                exchange, symbol, 'sell', filled_amount, stop_loss
-                            )
-                            stop_order_id = stop_order.get('id', '')
-                            print(f"   🛡️ 止损单已设置: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
-                        except Exception as e:
-                            print(f"   ⚠️ 止损单下单失败: {str(e)[:200]}")
-                    
-                    # 3. 记录持仓
-                    if action == 'OPEN_LONG' and filled_amount > 0:
-                        portfolio_stats.record_position_entry(coin, 'long', current_price, filled_amount, stop_loss, take_profit, stop_order_id)
-                    
-                    # 显示成功信息
-                    market = exchange.markets.get(symbol)
-                    if market and 'contractSize' in market:
-                        contract_size = float(market['contractSize'])
-                        eth_amount = filled_amount * contract_size
-                        print(f"✅ {coin} 多仓成功: {filled_amount:.0f} 张合约 (≈ {eth_amount:.4f} {coin})")
-                    else:
-                        print(f"✅ {coin} 多仓成功 ({filled_amount:.4f} {coin})")
-                    
-                elif action == 'OPEN_SHORT' or (action == 'ADD' and current_position and current_position['side'] == 'short'):
-                    print(f"📉 {'开' if action == 'OPEN_SHORT' else '加'}空仓: 保证金 ${position_value:.2f} USDT (杠杆 {PORTFOLIO_CONFIG['leverage']}x)")
-                    
-                    try:
-                        # 1. 计算合约张数（保证金模式）
-                        leverage = PORTFOLIO_CONFIG['leverage']
-                        
-                        # 获取市场信息
-                        market = exchange.markets.get(symbol)
-                        if market and 'contractSize' in market:
-                            # 合约市场：保证金 × 杠杆 = 名义价值
-                            nominal_value = position_value * leverage
-                            contract_size = float(market['contractSize'])
-                            eth_needed = nominal_value / current_price
-                            contracts = eth_needed / contract_size
-                            contracts = max(1, round(contracts))  # 至少1张，四舍五入
-                            
-                            print(f"   📊 合约模式: 保证金 {position_value:.2f} × {leverage}x = {nominal_value:.2f} USDT → {contracts} 张")
-                            
-                            order = exchange.create_order(
-                                symbol=symbol,
-                                type='market',
-                                side='sell',
-                                amount=contracts
-                            )
-                        else:
-                            # 现货市场：直接用 USDT 金额购买（无杠杆）
-                            print(f"   📊 现货模式: 直接使用 {position_value:.2f} USDT")
-                            
-                            # 先尝试 cost 参数
-                            try:
-                                order = exchange.create_order(
-                                    symbol=symbol,
-                                    type='market',
-                                    side='sell',
-                                    amount=None,
-                                    params={'cost': position_value}
-                                )
-                            except:
-                                # fallback: 手动计算
-                                amount = position_value / current_price
-                                order = exchange.create_order(
-                                    symbol=symbol,
-                                    type='market',
-                                    side='sell',
-                                    amount=amount
-                                )
-                        
-                        # 从订单结果获取实际成交数量
-                        if order and 'filled' in order and order['filled'] is not None:
-                            filled_amount = float(order['filled'])
-                        elif order and 'amount' in order and order['amount'] is not None:
-                            filled_amount = float(order['amount'])
-                        else:
-                            print(f"   ⚠️ 订单结构异常: {order}")
-                            filled_amount = 0
-                    except Exception as e:
-                        print(f"   ❌ 开仓失败: {e}")
-                        filled_amount = 0
-                    
-                    # 2. 立即下止损单（如果AI设置了止损价格）
-                    stop_order_id = 0
-                    if action == 'OPEN_SHORT' and stop_loss > 0 and filled_amount > 0:
-                        try:
-                            stop_order = create_stop_order(
-                                exchange, symbol, 'buy', filled_amount, stop_loss
-                            )
-                            stop_order_id = stop_order.get('id', '')
-                            print(f"   🛡️ 止损单已设置: {format_price(stop_loss, coin)} (订单ID: {stop_order_id})")
-                        except Exception as e:
-                            print(f"   ⚠️ 止损单下单失败: {str(e)[:200]}")
-                    
-                    # 3. 记录持仓
-                    if action == 'OPEN_SHORT' and filled_amount > 0:
-                        portfolio_stats.record_position_entry(coin, 'short', current_price, filled_amount, stop_loss, take_profit, stop_order_id)
-                    
-                    # 显示成功信息
-                    market = exchange.markets.get(symbol)
-                    if market and 'contractSize' in market:
-                        contract_size = float(market['contractSize'])
-                        eth_amount = filled_amount * contract_size
-                        print(f"✅ {coin} 空仓成功: {filled_amount:.0f} 张合约 (≈ {eth_amount:.4f} {coin})")
-                    else:
-                        print(f"✅ {coin} 空仓成功 ({filled_amount:.4f} {coin})")
-                else:
-                    print(f"⚠️ {coin} 未知动作: {action}")
-            
-            time.sleep(0.5)  # 避免API限流
-            
-        except ccxt.ExchangeError as e:
-            print(f"❌ {coin} 交易所API错误: {e}")
-        except Exception as e:
-            print(f"❌ {coin} 执行失败: {e}")
+        if decision.get('executed_early'):
+            print(f"⏩ 决策 {i}/{len(decisions)}: {decision['coin']} {decision['action']} 已在流式接收时提前执行")
+            continue
+        execute_decision(decision, market_data, i, len(decisions))
     
     print(f"\n{'='*60}")
     print("✅ 投资组合调整完成")
@@ -1332,27 +1523,25 @@ def sync_portfolio_positions_on_startup():
             stop_order_id = stats_pos.get('stop_order_id', 0)
             stop_loss_triggered = False
             
-            if stop_order_id > 0:
+            if stop_order_id:
                 try:
                     # 查询止损单状态，匹配币种：支持 "ETH" 匹配到 "ETH/USDT"
-                    coin_info = next((c for c in market_scanner.coins_config['coins'] 
-                                    if c['symbol'] == coin or c['symbol'].startswith(f"{coin}/")), None)
+                    coin_info = market_scanner.symbols.get(coin)
                     if not coin_info:
                         print(f"   ⚠️ 无法找到 {coin} 的配置信息")
                         continue
                     
-                    base_symbol = coin_info['symbol']
-                    symbol = format_symbol_for_exchange(base_symbol, exchange)
+                    symbol = coin_info.symbol
                     order = exchange.fetch_order(
                         id=stop_order_id,
                         symbol=symbol
                     )
                     
-                    if order['status'] == 'FILLED':
+                    fill = stop_order_fill(order, stats_pos['stop_loss'])
+                    if fill:
                         # 止损单已触发！
                         stop_loss_triggered = True
-                        trigger_time = datetime.fromtimestamp(order['updateTime'] / 1000)
-                        avg_price = float(order.get('avgPrice', order.get('price', stats_pos['stop_loss'])))
+                        trigger_time, avg_price = fill
                         
                         print(f"   🔴 确认：止损单已触发！")
                         print(f"   触发时间: {trigger_time.strftime('%Y-%m-%d %H:%M:%S')}")
@@ -1417,22 +1606,32 @@ def portfolio_bot():
     print("\n" + "="*60)
     print(f"⏰ 执行时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print("="*60)
+    CYCLE_TIMER.reset()
     
-    # 1. 扫描市场（获取所有周期数据）
-    print("📊 扫描所有市场，获取多周期数据...")
-    market_data = market_scanner.scan_all_markets()
-    if not market_data:
-        print("❌ 市场数据获取失败")
-        return
-    
-    # 2. 获取BTC背景
-    btc_data = market_scanner.get_btc_context()
-    
-    # 3. 获取持仓
-    portfolio_positions = market_scanner.get_portfolio_positions()
-    
-    # 4. 获取账户信息
-    account_info = market_scanner.get_account_info()
+    # 本轮内相同的行情请求只发一次（BTC背景复用扫描时已获取的BTC数据）
+    market_scanner.begin_cycle()
+    try:
+        # 1. 获取持仓（启用预筛选时，有持仓的币种始终深度扫描）
+        with CYCLE_TIMER.stage('positions'):
+            portfolio_positions = market_scanner.get_portfolio_positions()
+
+        # 2. 扫描市场（获取所有周期数据）
+        print("📊 扫描所有市场，获取多周期数据...")
+        with CYCLE_TIMER.stage('scan'):
+            market_data = market_scanner.scan_all_markets(positions=portfolio_positions)
+        if not market_data:
+            print("❌ 市场数据获取失败")
+            return
+
+        # 3. 获取BTC背景
+        with CYCLE_TIMER.stage('btc'):
+            btc_data = market_scanner.get_btc_context()
+
+        # 4. 获取账户信息
+        with CYCLE_TIMER.stage('account'):
+            account_info = market_scanner.get_account_info()
+    finally:
+        market_scanner.end_cycle()
     
     # 更新统计模块中的账户信息
     portfolio_stats.update_account_info(account_info['total_balance'], account_info['free_balance'])
@@ -1441,7 +1640,10 @@ def portfolio_bot():
     decisions_data = analyze_portfolio_with_ai(market_data, portfolio_positions, btc_data, account_info)
     
     # 6. 执行决策
-    execute_portfolio_decisions(decisions_data, market_data)
+    with CYCLE_TIMER.stage('execute'):
+        execute_portfolio_decisions(decisions_data, market_data)
+
+    print(f"⏱️ 本轮阶段耗时: {CYCLE_TIMER.summary()}")
 
 
 def main():
@@ -1472,13 +1674,25 @@ def main():
     sync_portfolio_positions_on_startup()
     
     # 设置定时任务
-    schedule.every(PORTFOLIO_CONFIG['check_interval_minutes']).minutes.do(portfolio_bot)
-    print(f"⏰ 执行频率: 每{PORTFOLIO_CONFIG['check_interval_minutes']}分钟一次\n")
+    if PORTFOLIO_CONFIG['align_to_candle_close']:
+        # 对齐K线收盘：每个周期在K线收盘后几秒执行，使用刚收盘的K线
+        scheduler = CandleScheduler(
+            PORTFOLIO_CONFIG['check_interval_minutes'],
+            PORTFOLIO_CONFIG['candle_close_delay_seconds']
+        )
+        print(f"⏰ 执行频率: 每{PORTFOLIO_CONFIG['check_interval_minutes']}分钟一次"
+              f"（K线收盘后{PORTFOLIO_CONFIG['candle_close_delay_seconds']}秒）\n")
+    else:
+        scheduler = None
+        schedule.every(PORTFOLIO_CONFIG['check_interval_minutes']).minutes.do(portfolio_bot)
+        print(f"⏰ 执行频率: 每{PORTFOLIO_CONFIG['check_interval_minutes']}分钟一次\n")
     
     # 立即执行一次
     portfolio_bot()
     
     # 循环执行
+    if scheduler is not None:
+        scheduler.run_forever(portfolio_bot)
     while True:
         schedule.run_pending()
         time.sleep(1)
@@ -43,7 +43,8 @@ class PortfolioStatistics:
             with open(config_file, 'r', encoding='utf-8') as f:
                 config = json.load(f)
                 coins = config.get('coins', [])
-                symbols = [coin.get('symbol') for coin in coins if coin.get('symbol')]
+                # 统计按币种名（ETH）记录，与 portfolio_manager 调用时传入的键一致
+                symbols = [self._coin_key(coin['symbol']) for coin in coins if coin.get('symbol')]
                 if symbols:
                     return symbols
                 print(f"⚠️ 配置文件中未找到有效币种，将使用默认列表")
@@ -54,6 +55,29 @@ class PortfolioStatistics:
         # 默认回退
         return ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'ADA', 'DOGE']
     
+    @staticmethod
+    def _coin_key(coin) -> str:
+        """交易对或币种名 -> 币种名（ETH/USDT、ETH/USDT:USDT -> ETH）"""
+        return str(coin or '').split('/')[0].upper()
+
+    def _migrate_positions(self, stored_positions: Dict) -> Dict:
+        """
+        旧版统计文件按交易对（ETH/USDT）保存持仓，转换为按币种名（ETH）；两种键同时存在时以币种名为准
+        """
+        positions = {}
+        migrated = []
+        for key, position in stored_positions.items():
+            coin = self._coin_key(key)
+            if key != coin:
+                if position and not stored_positions.get(coin):
+                    positions[coin] = position
+                    migrated.append(key)
+            elif position or coin not in positions:
+                positions[coin] = position
+        if migrated:
+            print(f"🔄 统计文件中的持仓已从交易对键迁移为币种名: {', '.join(migrated)}")
+        return positions
+
     def load(self):
         """从文件加载统计数据"""
         if os.path.exists(self.stats_file):
@@ -68,9 +92,12 @@ class PortfolioStatistics:
                     self.total_pnl = data.get('total_pnl', 0.0)
                     self.total_balance = data.get('total_balance', 0.0)  # 加载总权益
                     self.free_balance = data.get('free_balance', 0.0)    # 加载可用余额
-                    stored_positions = data.get('current_positions', {})
+                    stored_positions = self._migrate_positions(data.get('current_positions', {}))
                     self.current_positions = {coin: stored_positions.get(coin) for coin in self.coins}
                     self.stop_loss_history = data.get('stop_loss_history', [])  # 加载止损历史
+                    for record in self.trade_history + self.stop_loss_history:
+                        if record.get('coin'):
+                            record['coin'] = self._coin_key(record['coin'])
                     
                     # 重建按币种分类的历史
                     self.trade_history_by_coin = {coin: [] for coin in self.coins}
@@ -158,7 +185,7 @@ class PortfolioStatistics:
         decimals = 4 if coin in ['DOGE', 'XRP'] else 2
         sl_text = f" | 止损${stop_loss:.{decimals}f}" if stop_loss > 0 else ""
         tp_text = f" | 止盈${take_profit:.{decimals}f}" if take_profit > 0 else ""
-        sl_status = "✅" if stop_order_id > 0 else ""
+        sl_status = "✅" if stop_order_id else ""
         print(f"📝 记录{coin}开仓: {side} @ ${entry_price:.{decimals}f}{sl_text}{sl_status}{tp_text}")
     
     def update_stop_loss_take_profit(self, coin: str, stop_loss: float = 0, take_profit: float = 0, stop_order_id: int = 0):
@@ -176,7 +203,7 @@ class PortfolioStatistics:
         
         self.current_positions[coin]['stop_loss'] = stop_loss
         self.current_positions[coin]['take_profit'] = take_profit
-        if stop_order_id > 0:
+        if stop_order_id:
             self.current_positions[coin]['stop_order_id'] = stop_order_id
         self.save()
         
@@ -186,7 +213,7 @@ class PortfolioStatistics:
             decimals = 4 if coin in ['DOGE', 'XRP'] else 2
             sl_text = f"${old_sl:.{decimals}f}→${stop_loss:.{decimals}f}" if stop_loss > 0 else f"${old_sl:.{decimals}f}→无"
             tp_text = f"${old_tp:.{decimals}f}→${take_profit:.{decimals}f}" if take_profit > 0 else f"${old_tp:.{decimals}f}→无"
-            sl_status = "✅" if stop_order_id > 0 else ""
+            sl_status = "✅" if stop_order_id else ""
             print(f"📝 {coin}调整止损止盈: 止损{sl_text}{sl_status} | 止盈{tp_text}")
     
     def cancel_stop_loss_order(self, coin: str, symbol: str) -> bool:
@@ -199,7 +226,7 @@ class PortfolioStatistics:
             return False
         
         stop_order_id = self.current_positions[coin].get('stop_order_id', 0)
-        if stop_order_id == 0:
+        if not stop_order_id:
             return False  # 没有止损单
         
         try:
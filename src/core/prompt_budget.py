@@ -0,0 +1,119 @@
+"""
+提示词 token 预算 - 估算用户消息各部分（BTC背景、投资组合、统计、决策记录、各币种行情）的 token 数，
+超出预算时按优先级从低到高逐步降级，使输入长度不随币种数、持仓和历史记录无限增长
+
+降级顺序（DEGRADE_STEPS，币种按 market_data 中的顺序从后往前逐个降级，每降一个币种检查一次预算）:
+    1. 无持仓币种 K线减半        2. 无持仓币种省略4h K线      3. 省略最近决策记录
+    4. 无持仓币种只保留指标      5. 持仓币种 K线减半          6. 持仓币种省略4h K线
+    7. 省略统计信息
+BTC背景和投资组合状态（含持仓、止损记录）不降级。
+"""
+from typing import Callable, Dict, Iterable, List
+
+from prompt_encoding import count_tokens
+
+# (对象, 参数): ('idle' / 'held', 详细程度) 把无持仓/持仓币种降到该详细程度（prompt_encoding.DETAIL_LEVELS）；
+# ('section', 名称) 省略整个部分
+DEGRADE_STEPS = [
+    ('idle', 1),
+    ('idle', 2),
+    ('section', 'last_decisions'),
+    ('idle', 3),
+    ('held', 1),
+    ('held', 2),
+    ('section', 'stats'),
+]
+
+STEP_LABELS = {
+    ('idle', 1): '无持仓币种K线减半',
+    ('idle', 2): '无持仓币种省略4h K线',
+    ('idle', 3): '无持仓币种只保留指标',
+    ('held', 1): '持仓币种K线减半',
+    ('held', 2): '持仓币种省略4h K线',
+    ('section', 'last_decisions'): '省略决策记录',
+    ('section', 'stats'): '省略统计信息',
+}
+
+# 日志中各部分的名称
+SECTION_LABELS = {
+    'btc': 'BTC',
+    'portfolio': '组合',
+    'stats': '统计',
+    'last_decisions': '决策记录',
+    'market': '行情',
+}
+
+
+def fit_prompt(budget: int, fixed_tokens: int, sections: Dict[str, str], coins: Iterable[str],
+               coin_text: Callable[[str, int], str], held: Iterable[str] = ()) -> Dict:
+    """
+    把可降级的部分调整到预算以内
+
+    :param budget: 目标输入 token 数（系统+用户消息），0 表示不限制
+    :param fixed_tokens: 不参与降级的部分（系统消息、用户消息模板、BTC背景、投资组合）的 token 数
+    :param sections: 可整体省略的部分 {'stats': ..., 'last_decisions': ...}
+    :param coins: 参与分析的币种，越靠前优先级越高（最后降级）
+    :param coin_text: (币种, 详细程度) -> 该币种的行情文本
+    :param held: 有持仓的币种
+    :return: {
+        'sections': 调整后的 sections,
+        'coin_texts': {币种: 行情文本},
+        'levels': {币种: 详细程度},
+        'tokens': 估算的总 token 数（各部分之和）,
+        'before': 降级前的估算 token 数,
+        'applied': [(步骤名称, 影响的币种数)],
+        'fits': 是否在预算以内
+    }
+    """
+    coins = list(coins)
+    held = set(held)
+    sections = dict(sections)
+    section_tokens = {name: count_tokens(text) for name, text in sections.items()}
+    levels = {coin: 0 for coin in coins}
+    coin_texts = {coin: coin_text(coin, 0) for coin in coins}
+    coin_tokens = {coin: count_tokens(text) for coin, text in coin_texts.items()}
+
+    def total() -> int:
+        return fixed_tokens + sum(section_tokens.values()) + sum(coin_tokens.values())
+
+    before = total()
+    applied: List = []
+    for step in DEGRADE_STEPS:
+        if not budget or total() <= budget:
+            break
+        target, value = step
+        if target == 'section':
+            if section_tokens.get(value):
+                sections[value] = ''
+                section_tokens[value] = 0
+                applied.append((STEP_LABELS[step], 0))
+            continue
+        affected = 0
+        for coin in reversed(coins):
+            if total() <= budget:
+                break
+            if (coin in held) != (target == 'held') or levels[coin] >= value:
+                continue
+            levels[coin] = value
+            coin_texts[coin] = coin_text(coin, value)
+            coin_tokens[coin] = count_tokens(coin_texts[coin])
+            affected += 1
+        if affected:
+            applied.append((STEP_LABELS[step], affected))
+
+    return {
+        'sections': sections,
+        'coin_texts': coin_texts,
+        'levels': levels,
+        'tokens': total(),
+        'before': before,
+        'applied': applied,
+        'fits': not budget or total() <= budget,
+    }
+
+
+def format_applied(applied: List) -> str:
+    """降级步骤的日志文本：无持仓币种K线减半×3, 省略决策记录"""
+    if not applied:
+        return '无需降级'
+    return ', '.join(f"{label}×{count}" if count else label for label, count in applied)
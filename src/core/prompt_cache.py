@@ -0,0 +1,101 @@
+"""
+系统提示词缓存 - 系统提示词只由配置和提示词文件决定，按（提示词文件版本, 参数）构建一次并保持逐字节不变，
+支持前缀缓存的 OpenAI 兼容服务（如 DeepSeek）可以直接复用缓存，减少首字延迟和输入费用
+"""
+import os
+import hashlib
+from typing import Callable, Dict, Optional, Tuple
+
+
+class SystemPromptCache:
+    """
+    系统提示词缓存
+
+    - get(**params): 提示词文件（修改时间/大小）和参数都没变时返回同一个字符串，否则重新读取文件并调用 render 构建
+    - hash: 当前系统提示词的 sha256 前12位，日志中用于确认各轮是否逐字节一致
+    - version: 构建次数（首次为1，之后每次内容变化加1）
+
+    :param prompt_file: 外部策略提示词文件（prompts/default.txt），不存在时按空字符串处理
+    :param render: (external_prompt, **params) -> 系统提示词
+    """
+
+    def __init__(self, prompt_file: str, render: Callable[..., str]):
+        self.prompt_file = prompt_file
+        self.render = render
+        self.message = None
+        self.hash = None
+        self.version = 0
+        self._key = None
+
+    def _file_version(self) -> Optional[Tuple[float, int]]:
+        try:
+            stat = os.stat(self.prompt_file)
+            return stat.st_mtime, stat.st_size
+        except OSError:
+            return None
+
+    def _read_prompt(self) -> str:
+        try:
+            with open(self.prompt_file, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            print("⚠️ 外部提示词文件不存在，使用默认配置")
+        except Exception as e:
+            print(f"⚠️ 读取外部提示词失败: {e}")
+        return ""
+
+    def get(self, **params) -> str:
+        key = (self._file_version(), tuple(sorted(params.items())))
+        if key == self._key:
+            return self.message
+        message = self.render(self._read_prompt(), **params)
+        digest = hashlib.sha256(message.encode('utf-8')).hexdigest()[:12]
+        if digest != self.hash:
+            self.version += 1
+            previous = self.hash
+            self.hash = digest
+            if previous is None:
+                print(f"🧩 系统提示词: hash {digest}（{len(message)} 字符）")
+            else:
+                print(f"🧩 系统提示词已变更: {previous} → {digest}（第{self.version}版，前缀缓存将重新建立）")
+        self.message = message
+        self._key = key
+        return message
+
+
+def cached_prompt_tokens(usage) -> Optional[int]:
+    """
+    从接口返回的 usage 中读取命中前缀缓存的输入 token 数，服务不返回时为None
+    - DeepSeek: usage.prompt_cache_hit_tokens
+    - OpenAI: usage.prompt_tokens_details.cached_tokens
+    """
+    if usage is None:
+        return None
+    hit = getattr(usage, 'prompt_cache_hit_tokens', None)
+    if hit is not None:
+        return int(hit)
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached = getattr(details, 'cached_tokens', None) if details is not None else None
+    return int(cached) if cached is not None else None
+
+
+class PromptCacheStats:
+    """累计前缀缓存命中情况（日志用）"""
+
+    def __init__(self):
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage) -> Dict:
+        """记录一次调用，返回本次的 {prompt_tokens, cached_tokens}（cached_tokens 可能为None）"""
+        prompt_tokens = int(getattr(usage, 'prompt_tokens', 0) or 0) if usage is not None else 0
+        cached = cached_prompt_tokens(usage)
+        self.calls += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached or 0
+        return {'prompt_tokens': prompt_tokens, 'cached_tokens': cached}
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cached_tokens / self.prompt_tokens * 100 if self.prompt_tokens else 0.0
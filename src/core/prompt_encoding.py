@@ -0,0 +1,329 @@
+"""
+行情提示词编码 - 把各币种的多周期K线和指标转成AI提示词中的文本，并统计提示词 token 数
+
+- text: 原有格式，每根K线一行（涨跌标记、O/H/L/C、涨跌幅、成交量），指标逐行列出
+- compact: 紧凑格式，K线为 "o,h,l,c,v" 表格，价格按交易所最小变动价位保留小数（K线价格和成交量无损），指标合并为一行；
+  涨跌标记和涨跌幅可由开盘/收盘价算出，不再重复给出，约为 text 格式 token 数的一半以下
+"""
+import math
+import re
+from typing import Dict, Optional
+
+ENCODINGS = ('text', 'compact')
+
+# 各周期发送给AI的K线根数，按详细程度分级（token 预算不足时逐级降低，见 prompt_budget.py），0 表示省略该周期K线
+DETAIL_LEVELS = [
+    {'5m': 13, '15m': 16, '1h': 10, '4h': 6},  # 0: 完整
+    {'5m': 6, '15m': 8, '1h': 5, '4h': 3},     # 1: K线减半
+    {'5m': 6, '15m': 8, '1h': 5, '4h': 0},     # 2: 再省略4h K线
+    {'5m': 0, '15m': 0, '1h': 0, '4h': 0},     # 3: 只保留指标
+]
+KLINE_COUNTS = DETAIL_LEVELS[0]
+
+# compact 编码的格式说明（追加到系统提示词，各轮不变）
+COMPACT_LEGEND = """
+
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+📐 行情数据格式（紧凑编码）
+━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+- 每个币种以 "币种/USDT:" 开头，下一行依次为：价格 | 24h涨跌幅 | 资金费率（正数多头付费，负数空头付费）| 持仓量 | 最小开仓保证金(USDT)
+- "5m o,h,l,c,v" 之后每行一根K线：开盘,最高,最低,收盘,成交量，从旧到新；开盘价为空表示与上一根收盘价相同；15m/1h/4h 同理
+- K线之后一行为该周期指标：EMA20/EMA50 指数均线、RSI14、MACD(12,26,9)、ATR14、BB 布林带(20,2) 上轨/中轨/下轨
+- K线价格和成交量为交易所原始数值，省略末尾的0"""
+
+
+def format_price(price, coin):
+    """根据币种格式化价格，低价币种显示更多小数位"""
+    if coin in ['DOGE', 'XRP']:
+        return f"${price:.4f}"
+    else:
+        return f"${price:.2f}"
+
+
+def price_decimals(price: float, precision=None, tick_size: bool = True) -> int:
+    """
+    价格保留的小数位数
+    :param precision: 市场信息中的价格精度 market['precision']['price']，None 时按价格保留6位有效数字
+    :param tick_size: precision 是最小变动价位（ccxt TICK_SIZE 模式，如 0.01）还是小数位数（DECIMAL_PLACES 模式，如 2）
+    """
+    if precision:
+        if not tick_size:
+            return max(0, int(precision))
+        return max(0, -math.floor(math.log10(float(precision)) + 1e-9))
+    if not price:
+        return 4
+    return max(0, 5 - math.floor(math.log10(abs(price))))
+
+
+def _number(value, decimals: int) -> str:
+    """定点格式并去掉末尾的0（3082.10 → 3082.1，100.00 → 100）"""
+    text = f"{value:.{decimals}f}"
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    return '0' if text == '-0' else text
+
+
+def _exact(value) -> str:
+    """能还原出同一浮点数的最短十进制文本（12.0 → 12，0.00001 → 1e-05）"""
+    text = repr(float(value))
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _price(value, decimals: int) -> str:
+    """K线价格：按最小变动价位的小数位输出；原值不在该精度上时输出完整数值，不丢失信息"""
+    text = _number(value, decimals)
+    return text if float(text) == value else _exact(value)
+
+
+def _volume(value) -> str:
+    """成交量：交易所原始数值（不舍入）"""
+    return _exact(value)
+
+
+def _kline_rows(klines):
+    """兼容 dict / 原始列表 / KlineView 行，返回 (open, high, low, close, volume)"""
+    for kline in klines:
+        if isinstance(kline, dict):
+            # 适配字典格式（旧版market_scanner返回的格式）
+            yield kline['open'], kline['high'], kline['low'], kline['close'], kline['volume']
+        elif isinstance(kline, (list, tuple)):
+            # 兼容原始列表格式（币安API原始格式）
+            yield tuple(kline[1:6])
+        else:
+            # KlineView 的行（market_scanner返回的格式）
+            yield kline.open, kline.high, kline.low, kline.close, kline.volume
+
+
+def _build_kline_text(klines, title, count):
+    if not count:
+        return f"【{title}】: 已省略"
+    if not klines:
+        return f"【{title}】: 无数据"
+
+    text = f"【{title}】最近 {count} 根:"
+    for i, (open_p, high_p, low_p, close_p, volume) in enumerate(_kline_rows(klines[-count:]), 1):
+        change = ((close_p - open_p) / open_p * 100) if open_p > 0 else 0
+        body = "🟢" if close_p > open_p else "🔴" if close_p < open_p else "➖"
+        text += f"\n  K{i}: {body} O:{open_p} H:{high_p} L:{low_p} C:{close_p} ({change:+.2f}%) V:{volume}"
+    return text
+
+
+def _build_indicator_text(data, timeframe, indicators):
+    text = ""
+    for name, key in indicators:
+        value = data.get(key)
+        if value is not None:
+            if isinstance(value, dict): # 处理布林带等复合指标
+                value_str = f"Upper:{value.get('upper', 0):.2f}, Middle:{value.get('middle', 0):.2f}, Lower:{value.get('lower', 0):.2f}"
+            else:
+                value_str = f"{value:.4f}"
+            text += f"- {name}: {value_str}\n"
+    return text
+
+
+def _stale_text(data) -> str:
+    # 扫描超时时使用的是上一次的快照
+    if data.get('stale'):
+        return f" ⚠️ 本轮扫描超时，以下为{data.get('stale_age_seconds', 0) / 60:.1f}分钟前的数据"
+    return ""
+
+
+def _coin_text(coin, data, counts) -> str:
+    """text 编码的单个币种行情"""
+    # 格式化价格
+    price_display = format_price(data['price'], coin)
+
+    # 资金费率
+    funding_rate = data.get('funding_rate')
+    if funding_rate is not None:
+        funding_text = f"{funding_rate:.6f} {'(多头付费)' if funding_rate > 0 else '(空头付费)' if funding_rate < 0 else '(中性)'}"
+    else:
+        funding_text = "⚠️ 数据不可用"
+
+    # 持仓量
+    open_interest = data.get('open_interest')
+    if open_interest is not None:
+        open_interest_text = f"{open_interest:,.0f}"
+    else:
+        open_interest_text = "⚠️ 数据不可用"
+
+    # 构建各周期文本
+    kline_5m_text = _build_kline_text(data.get('kline_5m'), "5分钟K线 (执行层)", counts['5m'])
+    kline_15m_text = _build_kline_text(data.get('kline_15m'), "15分钟K线 (战术层)", counts['15m'])
+    kline_1h_text = _build_kline_text(data.get('kline_1h'), "1小时K线 (策略层)", counts['1h'])
+    kline_4h_text = _build_kline_text(data.get('kline_4h'), "4小时K线 (战略层)", counts['4h'])
+
+    indicators_15m_text = _build_indicator_text(data, '15m', [
+        ('EMA(20)', 'ema_20_15m'), ('EMA(50)', 'ema_50_15m'),
+        ('RSI(14)', 'rsi_14_15m'), ('MACD', 'macd_15m')
+    ])
+
+    indicators_1h_text = _build_indicator_text(data, '1h', [
+        ('EMA(20)', 'ema_20_1h'), ('EMA(50)', 'ema_50_1h'),
+        ('ATR(14)', 'atr_14_1h'), ('BBands(20,2)', 'bbands_1h')
+    ])
+
+    indicators_4h_text = _build_indicator_text(data, '4h', [
+        ('EMA(20)', 'ema_20_4h'), ('EMA(50)', 'ema_50_4h'),
+        ('ATR(14)', 'atr_14_4h')
+    ])
+
+    return f"""
+
+    {coin}/USDT:{_stale_text(data)}
+    - 价格: {price_display} | 24h: {data.get('change_24h', 0):+.2f}%
+    - 资金费率: {funding_text} | 持仓量: {open_interest_text}
+    - 最小开仓: {data.get('min_order_value', 0)} USDT
+
+    --- 5分钟周期 (执行层) ---
+    {kline_5m_text}
+    - ATR(14): {data.get('atr_14_5m', 0):.4f}
+
+    --- 15分钟周期 (战术层) ---
+    {kline_15m_text}
+    {indicators_15m_text}
+
+    --- 1小时周期 (策略层) ---
+    {kline_1h_text}
+    {indicators_1h_text}
+
+    --- 4小时周期 (战略层) ---
+    {kline_4h_text}
+    {indicators_4h_text}
+    """
+
+
+def _compact_klines(klines, timeframe, count, decimals) -> str:
+    if not count:
+        return f"{timeframe} 已省略"
+    if not klines:
+        return f"{timeframe} 无数据"
+    rows = [f"{timeframe} o,h,l,c,v"]
+    prev_close = None
+    for open_p, high_p, low_p, close_p, volume in _kline_rows(klines[-count:]):
+        # 开盘价等于上一根收盘价（连续K线的常见情况）时留空
+        open_text = '' if open_p == prev_close else _price(open_p, decimals)
+        rows.append(f"{open_text},{_price(high_p, decimals)},{_price(low_p, decimals)},"
+                    f"{_price(close_p, decimals)},{_volume(volume)}")
+        prev_close = close_p
+    return '\n'.join(rows)
+
+
+def _compact_indicators(data, indicators, decimals) -> str:
+    """一行指标：EMA20 3075.2 | RSI14 55.3 | BB 3100/3050/3000（价格类指标按价格精度，RSI 1位小数）"""
+    parts = []
+    for name, key, digits in indicators:
+        value = data.get(key)
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            value_str = '/'.join(_number(value.get(band, 0), decimals) for band in ('upper', 'middle', 'lower'))
+        else:
+            value_str = _number(value, decimals + digits if digits is not None else 1)
+        parts.append(f"{name} {value_str}")
+    return ' | '.join(parts)
+
+
+def _coin_compact(coin, data, decimals: int, counts) -> str:
+    """compact 编码的单个币种行情（格式见 COMPACT_LEGEND）"""
+    funding_rate = data.get('funding_rate')
+    open_interest = data.get('open_interest')
+    header = ' | '.join([
+        _price(data['price'], decimals),
+        f"{data.get('change_24h', 0):+.2f}%",
+        f"{funding_rate:.6f}" if funding_rate is not None else '无',
+        f"{open_interest:.0f}" if open_interest is not None else '无',
+        f"{data.get('min_order_value', 0)}",
+    ])
+    # 价格类指标的小数位 = 价格精度 + digits；digits 为 None 时按 RSI 保留1位小数
+    sections = [
+        _compact_klines(data.get('kline_5m'), '5m', counts['5m'], decimals),
+        _compact_indicators(data, [('ATR14', 'atr_14_5m', 1)], decimals),
+        _compact_klines(data.get('kline_15m'), '15m', counts['15m'], decimals),
+        _compact_indicators(data, [('EMA20', 'ema_20_15m', 0), ('EMA50', 'ema_50_15m', 0),
+                                   ('RSI14', 'rsi_14_15m', None), ('MACD', 'macd_15m', 1)], decimals),
+        _compact_klines(data.get('kline_1h'), '1h', counts['1h'], decimals),
+        _compact_indicators(data, [('EMA20', 'ema_20_1h', 0), ('EMA50', 'ema_50_1h', 0),
+                                   ('ATR14', 'atr_14_1h', 1), ('BB', 'bbands_1h', 0)], decimals),
+        _compact_klines(data.get('kline_4h'), '4h', counts['4h'], decimals),
+        _compact_indicators(data, [('EMA20', 'ema_20_4h', 0), ('EMA50', 'ema_50_4h', 0),
+                                   ('ATR14', 'atr_14_4h', 1)], decimals),
+    ]
+    body = '\n'.join(section for section in sections if section)
+    return f"\n\n{coin}/USDT:{_stale_text(data)}\n{header}\n{body}"
+
+
+MARKET_HEADER = "\n【各币种市场分析】"
+
+
+def build_coin_text(coin: str, data: Dict, encoding: str = 'text', decimals: Optional[int] = None,
+                    level: int = 0) -> str:
+    """
+    单个币种的行情文本
+    :param decimals: compact 编码的价格小数位数，None 时按价格保留6位有效数字
+    :param level: 详细程度（DETAIL_LEVELS 的下标）
+    """
+    counts = DETAIL_LEVELS[level]
+    if encoding == 'compact':
+        if decimals is None:
+            decimals = price_decimals(data['price'])
+        return _coin_compact(coin, data, decimals, counts)
+    return _coin_text(coin, data, counts)
+
+
+def build_market_text(market_data: Dict[str, Dict], encoding: str = 'text',
+                      decimals: Optional[Dict[str, int]] = None, levels: Optional[Dict[str, int]] = None) -> str:
+    """
+    构建提示词中的【各币种市场分析】部分
+    :param encoding: 'text' 或 'compact'
+    :param decimals: compact 编码各币种价格的小数位数 {币种: 位数}，缺少的币种按价格保留6位有效数字
+    :param levels: 各币种的详细程度 {币种: DETAIL_LEVELS 下标}，缺少的币种为完整
+    """
+    decimals = decimals or {}
+    levels = levels or {}
+    return MARKET_HEADER + ''.join(
+        build_coin_text(coin, data, encoding, decimals.get(coin), levels.get(coin, 0))
+        for coin, data in market_data.items()
+    )
+
+
+# ---------------------------------------------------------------------------
+# token 计数
+# ---------------------------------------------------------------------------
+
+# 估算规则接近 cl100k 分词：数字每3位一个token，连续英文字母一个token，其他每个非空白字符一个token
+_TOKEN_PATTERN = re.compile(r'\d{1,3}|[A-Za-z]+|[^\sA-Za-z\d]')
+_encoder = None
+TOKEN_COUNTER = None
+
+
+def _load_encoder():
+    """安装了 tiktoken 且能加载 cl100k_base 时使用精确计数，否则使用估算"""
+    global _encoder, TOKEN_COUNTER
+    if TOKEN_COUNTER is not None:
+        return _encoder
+    try:
+        import tiktoken
+        _encoder = tiktoken.get_encoding('cl100k_base')
+        TOKEN_COUNTER = 'tiktoken'
+    except Exception:
+        # 未安装，或首次使用需要下载词表但无网络
+        _encoder = None
+        TOKEN_COUNTER = '估算'
+    return _encoder
+
+
+def count_tokens(text: str) -> int:
+    """提示词 token 数（tiktoken cl100k_base 或估算，使用的方式见 token_counter()）"""
+    if not text:
+        return 0
+    encoder = _load_encoder()
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+def token_counter() -> str:
+    """当前使用的计数方式：'tiktoken' 或 '估算'"""
+    _load_encoder()
+    return TOKEN_COUNTER
@@ -0,0 +1,291 @@
+"""
+本地行情回放服务器 - 通过 WebSocket 按模拟时钟推送录制的K线，用于离线测试和压测行情推送（market_feed.py）
+
+用法：
+    # 从交易所录制K线（REST）
+    python3 src/core/replay_server.py record --exchange binance --symbols BTC/USDT,ETH/USDT --out data/replay/market.json
+    # 回放（每秒推进 speed 根5分钟K线）
+    python3 src/core/replay_server.py serve --file data/replay/market.json --port 8765 --speed 1
+
+然后在 coins_config.json 中设置 scanner.market_feed = {"mode": "replay", "replay_url": "ws://127.0.0.1:8765/ws"}
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import Dict, List
+
+import ccxt
+
+DEFAULT_TIMEFRAMES = ['5m', '15m', '1h', '4h']
+
+
+def load_recording(path: str) -> Dict:
+    """读取录制文件：{"ohlcv": {symbol: {timeframe: [[ts, o, h, l, c, v], ...]}}}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def record(exchange_id: str, symbols: List[str], timeframes: List[str], limit: int, out: str):
+    """从交易所REST接口录制最近 limit 根K线"""
+    exchange = getattr(ccxt, exchange_id)({'enableRateLimit': True})
+    recording = {'exchange': exchange_id, 'ohlcv': {}}
+    for symbol in symbols:
+        recording['ohlcv'][symbol] = {}
+        for timeframe in timeframes:
+            recording['ohlcv'][symbol][timeframe] = exchange.fetch_ohlcv(symbol, timeframe, limit=limit)
+            print(f"✅ 已录制 {symbol} {timeframe}: {len(recording['ohlcv'][symbol][timeframe])} 根")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(recording, f)
+    print(f"💾 录制文件已保存: {out}")
+
+
+def generate_recording(symbols: List[str], bars: int = 2000, timeframes: List[str] = None, seed: int = 0) -> Dict:
+    """生成随机游走的合成录制数据（5分钟K线及其聚合周期），用于压测"""
+    timeframes = timeframes or DEFAULT_TIMEFRAMES
+    rng = random.Random(seed)
+    base_ms = 300000
+    start = (int(time.time() * 1000) // 14400000 - bars * base_ms // 14400000 - 1) * 14400000
+    recording = {'exchange': 'synthetic', 'ohlcv': {}}
+    for symbol in symbols:
+        price = rng.uniform(1, 1000)
+        base = []
+        for i in range(bars):
+            open_ = price
+            price = max(price * (1 + rng.gauss(0, 0.002)), 1e-6)
+            high = max(open_, price) * (1 + abs(rng.gauss(0, 0.001)))
+            low = min(open_, price) * (1 - abs(rng.gauss(0, 0.001)))
+            base.append([start + i * base_ms, open_, high, low, price, rng.uniform(10, 1000)])
+        series = {}
+        for timeframe in timeframes:
+            timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+            candles = {}
+            for candle in base:
+                bucket = candle[0] // timeframe_ms * timeframe_ms
+                if bucket not in candles:
+                    candles[bucket] = [bucket] + candle[1:]
+                else:
+                    merged = candles[bucket]
+                    merged[2] = max(merged[2], candle[2])
+                    merged[3] = min(merged[3], candle[3])
+                    merged[4] = candle[4]
+                    merged[5] += candle[5]
+            series[timeframe] = list(candles.values())
+        recording['ohlcv'][symbol] = series
+    return recording
+
+
+class ReplayServer:
+    """
+    回放服务器 - 模拟时钟从各周期都有 warmup 根K线的位置开始，每 1/speed 秒推进一根5分钟K线
+
+    订阅后先推送截至当前时钟的最近 warmup 根K线（相当于历史快照），
+    之后每次推进推送该周期最新一根K线（高周期K线在收盘前会重复推送，与交易所的未收盘K线更新一致）。
+    """
+
+    def __init__(self, recording: Dict, speed: float = 1.0, warmup: int = 300, loop_replay: bool = True):
+        import aiohttp  # noqa: F401  回放服务器依赖 aiohttp（见 requirements.txt）
+
+        self.ohlcv = recording['ohlcv']
+        self.speed = speed
+        self.warmup = warmup
+        self.loop_replay = loop_replay
+        first_symbol = next(iter(self.ohlcv))
+        self.base_timeframe = min(self.ohlcv[first_symbol], key=ccxt.Exchange.parse_timeframe)
+        self.base_times = [c[0] for c in self.ohlcv[first_symbol][self.base_timeframe]]
+        self.start_step = self._start_step(self.ohlcv[first_symbol])
+        self.step = self.start_step
+        self._subscribers = {}  # ws -> set of (type, symbol, timeframe)
+        self._runner = None
+        self._tick_task = None
+        self._loop = None
+        self.sent = 0
+
+    def _start_step(self, series: Dict) -> int:
+        """起始时钟：最粗周期也已有 warmup 根K线的位置（数据不足时从最后一根开始）"""
+        coarsest = max(series, key=ccxt.Exchange.parse_timeframe)
+        candles = series[coarsest]
+        if len(candles) < self.warmup:
+            return len(self.base_times) - 1
+        ready = candles[self.warmup - 1][0]
+        return next((i for i, ts in enumerate(self.base_times) if ts >= ready), len(self.base_times) - 1)
+
+    @property
+    def clock(self) -> int:
+        return self.base_times[self.step]
+
+    def _visible(self, symbol: str, timeframe: str, count: int) -> List:
+        """截至当前时钟（含当前根）的最近 count 根K线"""
+        candles = self.ohlcv[symbol][timeframe]
+        clock = self.clock
+        lo, hi = 0, len(candles)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if candles[mid][0] <= clock:
+                lo = mid + 1
+            else:
+                hi = mid
+        return candles[max(0, lo - count):lo]
+
+    def _message(self, kind: str, symbol: str, timeframe: str, count: int) -> str:
+        if kind == 'ohlcv':
+            data = self._visible(symbol, timeframe, count)
+        else:
+            last = self._visible(symbol, self.base_timeframe, 1)
+            data = {'symbol': symbol, 'last': last[-1][4] if last else None, 'timestamp': int(time.time() * 1000)}
+        payload = {'type': kind, 'symbol': symbol, 'data': data}
+        if timeframe is not None:
+            payload['timeframe'] = timeframe
+        return json.dumps(payload)
+
+    async def _handle(self, request):
+        from aiohttp import web, WSMsgType
+
+        ws = web.WebSocketResponse(heartbeat=30)
+        await ws.prepare(request)
+        subscriptions = self._subscribers.setdefault(ws, set())
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                request_data = json.loads(message.data)
+                if request_data.get('op') != 'subscribe':
+                    continue
+                kind = request_data['type']
+                symbol = request_data['symbol']
+                timeframe = request_data.get('timeframe') if kind == 'ohlcv' else None
+                if symbol not in self.ohlcv or (timeframe is not None and timeframe not in self.ohlcv[symbol]):
+                    await ws.send_str(json.dumps({'type': 'error', 'symbol': symbol, 'data': '未录制该交易对/周期'}))
+                    continue
+                key = (kind, symbol, timeframe)
+                subscriptions.add(key)
+                await ws.send_str(self._message(kind, symbol, timeframe, self.warmup))
+                self.sent += 1
+        finally:
+            self._subscribers.pop(ws, None)
+        return ws
+
+    async def _handle_rest(self, request):
+        """REST对照接口：GET /ohlcv?symbol=BTC/USDT&timeframe=5m&limit=100（与推送相同的数据，用于压测对比）"""
+        from aiohttp import web
+
+        symbol = request.query.get('symbol')
+        timeframe = request.query.get('timeframe', self.base_timeframe)
+        limit = int(request.query.get('limit', 100))
+        if symbol not in self.ohlcv or timeframe not in self.ohlcv[symbol]:
+            return web.json_response({'error': '未录制该交易对/周期'}, status=404)
+        return web.json_response(self._visible(symbol, timeframe, limit))
+
+    async def _tick_loop(self):
+        while True:
+            await asyncio.sleep(1 / self.speed)
+            count = 1
+            if self.step + 1 >= len(self.base_times):
+                if not self.loop_replay:
+                    continue
+                # 循环回放：时钟回到起点，重新推送历史快照
+                self.step = self.start_step
+                count = self.warmup
+            else:
+                self.step += 1
+            for ws, subscriptions in list(self._subscribers.items()):
+                for kind, symbol, timeframe in list(subscriptions):
+                    try:
+                        await ws.send_str(self._message(kind, symbol, timeframe, count))
+                        self.sent += 1
+                    except Exception:
+                        break
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_get('/ws', self._handle)
+        app.router.add_get('/ohlcv', self._handle_rest)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self._tick_task = asyncio.ensure_future(self._tick_loop())
+        return self._runner.addresses[0][1] if self._runner.addresses else port
+
+    async def stop(self):
+        self._tick_task.cancel()
+        for ws in list(self._subscribers):
+            await ws.close()
+        await self._runner.cleanup()
+
+    def run_in_thread(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """在后台线程中运行（压测用），返回 WebSocket 地址；port=0 时自动分配端口"""
+        ready = threading.Event()
+        result = {}
+
+        def runner():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            result['port'] = loop.run_until_complete(self.start(host, port))
+            self._loop = loop
+            ready.set()
+            loop.run_forever()
+
+        threading.Thread(target=runner, name='replay-server', daemon=True).start()
+        ready.wait()
+        return f"ws://{host}:{result['port']}/ws"
+
+    def shutdown(self):
+        """停止 run_in_thread 启动的服务器"""
+        loop = self._loop
+        if loop is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.stop(), loop)
+        future.result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='行情录制与WebSocket回放')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help='从交易所录制K线')
+    rec.add_argument('--exchange', default='binance')
+    rec.add_argument('--symbols', required=True, help='逗号分隔，如 BTC/USDT,ETH/USDT')
+    rec.add_argument('--timeframes', default=','.join(DEFAULT_TIMEFRAMES))
+    rec.add_argument('--limit', type=int, default=1000)
+    rec.add_argument('--out', default='data/replay/market.json')
+
+    serve = sub.add_parser('serve', help='回放录制文件')
+    serve.add_argument('--file', help='录制文件（不指定时生成合成数据）')
+    serve.add_argument('--symbols', default='BTC/USDT,ETH/USDT', help='合成数据的交易对')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--speed', type=float, default=1.0, help='每秒推进的5分钟K线根数')
+    serve.add_argument('--warmup', type=int, default=300, help='订阅时推送的历史K线根数')
+
+    args = parser.parse_args()
+    if args.command == 'record':
+        record(args.exchange, args.symbols.split(','), args.timeframes.split(','), args.limit, args.out)
+        return
+
+    recording = load_recording(args.file) if args.file else generate_recording(args.symbols.split(','))
+    server = ReplayServer(recording, speed=args.speed, warmup=args.warmup)
+
+    async def serve_forever():
+        await server.start(args.host, args.port)
+        print(f"📼 回放服务器已启动: ws://{args.host}:{args.port}/ws "
+              f"({len(server.ohlcv)}个交易对, 每秒推进{args.speed}根)")
+        while True:
+            await asyncio.sleep(3600)
+
+    try:
+        asyncio.run(serve_forever())
+    except KeyboardInterrupt:
+        print("\n👋 回放服务器已停止")
+
+
+if __name__ == '__main__':
+    sys.exit(main())
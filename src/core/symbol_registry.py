@@ -0,0 +1,134 @@
+"""
+交易对注册表 - 由 coins_config.json 和交易所市场信息一次性构建
+按币种名 O(1) 查询配置、交易所格式的交易对、合约面值、精度和最小开仓金额
+"""
+import os
+import json
+import threading
+from typing import Dict, List, Optional
+
+
+def format_symbol_for_exchange(base_symbol, exchange_obj):
+    """
+    根据交易所类型格式化symbol
+    :param base_symbol: 基础symbol格式，如 "ETH/USDT"
+    :param exchange_obj: CCXT交易所对象
+    :return: 格式化后的symbol
+    """
+    # Gate.io 的 swap 市场需要添加 settle 货币后缀
+    if exchange_obj.id == 'gateio' and 'defaultType' in exchange_obj.options:
+        if exchange_obj.options['defaultType'] == 'swap':
+            return f"{base_symbol}:USDT"
+    return base_symbol
+
+
+class SymbolInfo:
+    """单个币种的预计算信息"""
+
+    __slots__ = ('coin', 'base_symbol', 'symbol', 'precision', 'price_precision',
+                 'min_order_value', 'contract_size', 'market', 'config')
+
+    def __init__(self, coin_config: Dict, exchange_obj):
+        self.config = coin_config
+        self.base_symbol = coin_config['symbol']  # CCXT基础格式 ETH/USDT
+        self.coin = self.base_symbol.split('/')[0]
+        self.symbol = format_symbol_for_exchange(self.base_symbol, exchange_obj)
+        self.precision = coin_config.get('precision')
+        self.price_precision = coin_config.get('price_precision')
+        self.min_order_value = coin_config.get('min_order_value', 13)
+        markets = getattr(exchange_obj, 'markets', None) or {}
+        self.market = markets.get(self.symbol)
+        # 合约面值：非合约市场（或未加载市场信息）为None
+        contract_size = self.market.get('contractSize') if self.market else None
+        self.contract_size = float(contract_size) if contract_size is not None else None
+
+
+class SymbolRegistry:
+    """
+    交易对注册表 - 所有模块共享同一个实例（MarketScanner.symbols）
+
+    - get(coin): 支持 "ETH" 或 "ETH/USDT"，返回 SymbolInfo 或 None
+    - refresh(): 配置文件被修改或交易所重新 load_markets 后重建，返回是否重建
+    """
+
+    def __init__(self, exchange, config_file: str):
+        self.exchange = exchange
+        self.config_file = config_file
+        self.config = {'coins': [], 'portfolio_rules': {}}
+        self._by_coin = {}
+        self._by_base = {}
+        self._by_symbol = {}
+        self._symbol_cache = {}
+        self._config_mtime = None
+        self._markets = None
+        self._lock = threading.Lock()
+        self.reload()
+
+    def _load_config(self) -> Dict:
+        try:
+            with open(self.config_file, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"❌ 加载配置文件失败: {e}")
+            return {'coins': [], 'portfolio_rules': {}}
+
+    def _config_mtime_now(self):
+        try:
+            return os.path.getmtime(self.config_file)
+        except OSError:
+            return None
+
+    def reload(self):
+        """重新读取配置并重建索引"""
+        with self._lock:
+            self._config_mtime = self._config_mtime_now()
+            self._markets = getattr(self.exchange, 'markets', None)
+            config = self._load_config()
+            infos = [SymbolInfo(c, self.exchange) for c in config.get('coins', []) if c.get('symbol')]
+            # 整体替换，读取方不会看到构建到一半的索引
+            self._by_coin = {info.coin: info for info in infos}
+            self._by_base = {info.base_symbol: info for info in infos}
+            self._by_symbol = {info.symbol: info for info in infos}
+            self._symbol_cache = {}
+            self.config = config
+
+    def refresh(self) -> bool:
+        """配置文件或交易所市场信息变化时重建，返回是否重建"""
+        markets = getattr(self.exchange, 'markets', None)
+        if self._config_mtime_now() == self._config_mtime and markets is self._markets:
+            return False
+        self.reload()
+        return True
+
+    def get(self, coin: str) -> Optional[SymbolInfo]:
+        """按币种名（ETH）或基础交易对（ETH/USDT）查询"""
+        return self._by_coin.get(coin) or self._by_base.get(coin)
+
+    def by_symbol(self, symbol: str) -> Optional[SymbolInfo]:
+        """按交易所格式的交易对查询（如 ETH/USDT:USDT）"""
+        return self._by_symbol.get(symbol)
+
+    def exchange_symbol(self, base_symbol: str) -> str:
+        """任意基础交易对转换为交易所格式（未配置的交易对如BTC背景也可用）"""
+        info = self._by_base.get(base_symbol)
+        if info is not None:
+            return info.symbol
+        symbol = self._symbol_cache.get(base_symbol)
+        if symbol is None:
+            symbol = format_symbol_for_exchange(base_symbol, self.exchange)
+            self._symbol_cache[base_symbol] = symbol
+        return symbol
+
+    @property
+    def coins(self) -> List[str]:
+        return list(self._by_coin)
+
+    @property
+    def symbols(self) -> List[str]:
+        return [info.symbol for info in self._by_coin.values()]
+
+    def __iter__(self):
+        return iter(list(self._by_coin.values()))
+
+    def __len__(self):
+        return len(self._by_coin)
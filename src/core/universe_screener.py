@@ -0,0 +1,102 @@
+"""
+币种预筛选 - 用一次批量Ticker（fetch_tickers）给全部币种打分排序，
+只对排名靠前的币种和当前持仓做多周期深度扫描（scanner.prescreen）
+"""
+from typing import Dict, List, Optional, Tuple
+
+
+def ticker_metrics(ticker: Dict) -> Optional[Dict]:
+    """
+    从CCXT Ticker提取排序指标，缺少最新价时返回None
+    - volume: 24小时成交额（quoteVolume，没有时用 baseVolume × 最新价）
+    - change: 24小时涨跌幅绝对值（%）
+    - volatility: 24小时振幅（(最高 - 最低) / 最新价，%）
+    """
+    if not ticker or not ticker.get('last'):
+        return None
+    last = float(ticker['last'])
+    volume = ticker.get('quoteVolume')
+    if volume is None and ticker.get('baseVolume') is not None:
+        volume = float(ticker['baseVolume']) * last
+    change = ticker.get('percentage')
+    if change is None and ticker.get('open'):
+        change = (last - float(ticker['open'])) / float(ticker['open']) * 100
+    high, low = ticker.get('high'), ticker.get('low')
+    volatility = (float(high) - float(low)) / last * 100 if high is not None and low is not None else 0.0
+    return {
+        'volume': float(volume or 0),
+        'change': abs(float(change or 0)),
+        'volatility': volatility,
+    }
+
+
+def _percentile_ranks(values: Dict[str, float]) -> Dict[str, float]:
+    """按数值从小到大换算为 0~1 的名次分（只有一个币种时为1）"""
+    ordered = sorted(values, key=values.get)
+    if len(ordered) == 1:
+        return {ordered[0]: 1.0}
+    return {coin: i / (len(ordered) - 1) for i, coin in enumerate(ordered)}
+
+
+def rank_universe(metrics: Dict[str, Dict], rank_by: str = 'score',
+                  weights: Dict[str, float] = None) -> List[Tuple[str, float]]:
+    """
+    对币种排序（分数从高到低）
+    :param rank_by: volume / change / volatility 按单项指标排序；score 按各项名次分加权
+    :param weights: score 模式下各项权重，默认等权
+    :return: [(coin, score), ...]
+    """
+    if not metrics:
+        return []
+    if rank_by in ('volume', 'change', 'volatility'):
+        scores = {coin: m[rank_by] for coin, m in metrics.items()}
+    else:
+        weights = weights or {'volume': 1, 'change': 1, 'volatility': 1}
+        total_weight = sum(weights.values()) or 1
+        scores = {coin: 0.0 for coin in metrics}
+        for name, weight in weights.items():
+            if not weight:
+                continue
+            ranks = _percentile_ranks({coin: m.get(name, 0.0) for coin, m in metrics.items()})
+            for coin, rank in ranks.items():
+                scores[coin] += rank * weight / total_weight
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+class UniverseScreener:
+    """
+    预筛选配置（scanner.prescreen）
+
+    - top_n: 深度扫描排名前 N 的币种（币种总数不超过 N 时不做预筛选）
+    - rank_by: 排序方式 score / volume / change / volatility
+    - weights: score 模式下 volume / change / volatility 的权重
+    - min_quote_volume: 24小时成交额低于该值的币种不参与排名（持仓币种除外）
+    """
+
+    def __init__(self, config: Dict = None):
+        config = config or {}
+        self.top_n = int(config.get('top_n', 20))
+        self.rank_by = config.get('rank_by', 'score')
+        self.weights = config.get('weights')
+        self.min_quote_volume = float(config.get('min_quote_volume', 0))
+
+    def active(self, universe_size: int) -> bool:
+        return 0 < self.top_n < universe_size
+
+    def select(self, tickers: Dict[str, Dict], keep: List[str] = None) -> Tuple[List[str], List[Tuple[str, float]]]:
+        """
+        :param tickers: {coin: ticker}
+        :param keep: 必须深度扫描的币种（当前持仓）
+        :return: (深度扫描币种, 排名)
+        """
+        metrics = {}
+        for coin, ticker in tickers.items():
+            m = ticker_metrics(ticker)
+            if m is not None and m['volume'] >= self.min_quote_volume:
+                metrics[coin] = m
+        ranking = rank_universe(metrics, self.rank_by, self.weights)
+        selected = [coin for coin, _ in ranking[:self.top_n]]
+        for coin in keep or []:
+            if coin not in selected:
+                selected.append(coin)
+        return selected, ranking
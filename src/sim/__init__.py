@@ -0,0 +1,7 @@
+"""
+模拟模块 - 本地模拟交易所，用于离线运行和可复现的性能测试
+"""
+from .fake_exchange import FakeExchange, LatencyModel
+from .fake_llm import FakeLLMServer, hold_all_responder, prompt_coins
+
+__all__ = ['FakeExchange', 'LatencyModel', 'FakeLLMServer', 'hold_all_responder', 'prompt_coins']
@@ -0,0 +1,512 @@
+"""
+本地模拟交易所 - 与 CCXT 接口兼容，不需要网络和API密钥
+
+行情来自确定性的随机游走（按 seed 和交易对生成）或录制文件（replay_server.py record 的格式），
+账户、持仓、市价单和止损单在内存中撮合；可配置接口延迟分布、限频错误和网络故障，
+用于离线运行 MarketScanner / portfolio_manager 和可复现的性能测试。
+
+在 coins_config.json 中设置 "exchange": "fake" 即可让交易程序使用本模拟交易所（参数见 fake_exchange 字段）。
+"""
+import json
+import math
+import time
+import zlib
+import random
+import threading
+from typing import Dict, List, Optional
+
+import ccxt
+
+BASE_TIMEFRAME = '5m'
+BASE_MS = 300000
+
+
+def price_tick(price: float) -> float:
+    """最小变动价位：价格的5位有效数字"""
+    return 10 ** math.floor(math.log10(price) - 4) if price > 0 else 0.0001
+
+
+class LatencyModel:
+    """
+    接口延迟分布（毫秒）
+    - constant: 固定 mean
+    - uniform: [min, max] 均匀分布
+    - normal: 均值 mean、标准差 std（截断到 >= 0）
+    - lognormal: 中位数 mean、对数标准差 sigma（长尾，接近真实网络延迟）
+    """
+
+    def __init__(self, config: Dict = None):
+        config = config or {}
+        self.distribution = config.get('distribution', 'constant')
+        self.mean = float(config.get('mean', 0))
+        self.std = float(config.get('std', self.mean * 0.2))
+        self.sigma = float(config.get('sigma', 0.5))
+        self.min = float(config.get('min', 0))
+        self.max = float(config.get('max', self.mean * 2))
+
+    def sample(self, rng: random.Random) -> float:
+        if self.distribution == 'uniform':
+            return rng.uniform(self.min, self.max)
+        if self.distribution == 'normal':
+            return max(0.0, rng.gauss(self.mean, self.std))
+        if self.distribution == 'lognormal':
+            return self.mean * math.exp(rng.gauss(0, self.sigma)) if self.mean > 0 else 0.0
+        return self.mean
+
+
+class FakeExchange:
+    """
+    CCXT 兼容的模拟交易所
+
+    构造参数与 CCXT 交易所相同（字典），模拟参数放在 config['fake'] 中：
+    - seed: 随机种子（行情、延迟、故障注入都由它决定）
+    - symbols: 预先生成市场信息的交易对（其他交易对在首次请求时自动生成）
+    - recording: 录制文件路径或 {"ohlcv": {symbol: {timeframe: [...]}}}，不指定时生成随机游走行情
+    - history_bars: 生成行情时当前时间之前的5分钟K线根数
+    - start_prices: {交易对或币种: 起始价格}，未指定的交易对随机取 0.1 ~ 30000
+    - balance: 初始USDT余额
+    - fee_rate / slippage_bps: 手续费率 / 市价单滑点（基点）
+    - latency_ms: 默认延迟分布（见 LatencyModel），latency_by_method: {方法名: 延迟分布}
+    - error_rates: {"rate_limit": p, "network": p, "timeout": p} 每次调用按概率抛出对应的 CCXT 异常
+    - error_rates_by_method: {方法名: error_rates}
+    - max_requests_per_second: 超过该请求速率时抛出 RateLimitExceeded（0 表示不限制）
+    - clock: 返回当前秒数的函数（默认 time.time）
+    """
+
+    def __init__(self, config: Dict = None):
+        config = dict(config or {})
+        fake = dict(config.get('fake') or {})
+        self.id = 'fake'
+        self.name = 'Fake Exchange'
+        self.options = dict(config.get('options') or {'defaultType': 'swap'})
+        self.enableRateLimit = config.get('enableRateLimit', True)
+        self.rateLimit = fake.get('rate_limit_ms', 0)
+        self.timeout = config.get('timeout', 30000)
+        self.has = {
+            'fetchOHLCV': True, 'fetchTicker': True, 'fetchTickers': True,
+            'fetchFundingRate': True, 'fetchFundingRates': True,
+            'fetchOpenInterest': True, 'fetchOpenInterests': False,
+            'fetchPositions': True, 'fetchBalance': True,
+            'createOrder': True, 'cancelOrder': True, 'fetchOrder': True, 'setLeverage': True,
+        }
+        self.markets = {}
+        self.currencies = {}
+
+        self.seed = int(fake.get('seed', 0))
+        self.clock = fake.get('clock', time.time)
+        self.history_bars = int(fake.get('history_bars', 6000))
+        self.start_prices = dict(fake.get('start_prices') or {})
+        self.fee_rate = float(fake.get('fee_rate', 0.0004))
+        self.slippage_bps = float(fake.get('slippage_bps', 0))
+        self.latency = LatencyModel(fake.get('latency_ms'))
+        self.latency_by_method = {m: LatencyModel(c) for m, c in (fake.get('latency_by_method') or {}).items()}
+        self.error_rates = dict(fake.get('error_rates') or {})
+        self.error_rates_by_method = dict(fake.get('error_rates_by_method') or {})
+        self.max_requests_per_second = float(fake.get('max_requests_per_second', 0))
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.seed)
+        self._series = {}          # symbol -> {'origin': 毫秒, 'closes': [...], 'bars': [...]}
+        self._recording = self._load_recording(fake.get('recording'))
+        self._request_times = []
+        self.calls = {}            # 方法名 -> 调用次数
+        self.injected_errors = {}  # 异常类型 -> 次数
+
+        # 账户
+        self.balance = float(fake.get('balance', 10000))
+        self.leverage = {}
+        self.positions = {}        # symbol -> {'side', 'contracts', 'entry_price'}
+        self.orders = {}           # id -> order
+        self._next_order_id = 1
+
+        for symbol in fake.get('symbols', []):
+            self._ensure_market(symbol)
+
+    # ------------------------------------------------------------------ 基础
+
+    def _load_recording(self, recording) -> Optional[Dict]:
+        if recording is None:
+            return None
+        if isinstance(recording, str):
+            with open(recording, 'r', encoding='utf-8') as f:
+                recording = json.load(f)
+        return recording['ohlcv']
+
+    def _now_ms(self) -> int:
+        return int(self.clock() * 1000)
+
+    def _call(self, method: str):
+        """统计调用、模拟延迟、注入限频错误和网络故障"""
+        with self._lock:
+            self.calls[method] = self.calls.get(method, 0) + 1
+            latency = self.latency_by_method.get(method, self.latency).sample(self._rng)
+            rates = self.error_rates_by_method.get(method, self.error_rates)
+            roll = self._rng.random()
+            error = None
+            threshold = 0.0
+            for kind, exc in (('rate_limit', ccxt.RateLimitExceeded), ('network', ccxt.NetworkError),
+                              ('timeout', ccxt.RequestTimeout)):
+                threshold += float(rates.get(kind, 0))
+                if roll < threshold:
+                    error = exc(f"fake {method}: 注入的{kind}错误")
+                    break
+            if error is None and self.max_requests_per_second > 0:
+                now = time.monotonic()
+                self._request_times = [t for t in self._request_times if now - t < 1.0]
+                if len(self._request_times) >= self.max_requests_per_second:
+                    error = ccxt.RateLimitExceeded(f"fake {method}: 超过 {self.max_requests_per_second:g} 次/秒")
+                else:
+                    self._request_times.append(now)
+            if error is not None:
+                name = type(error).__name__
+                self.injected_errors[name] = self.injected_errors.get(name, 0) + 1
+        if latency > 0:
+            time.sleep(latency / 1000)
+        if error is not None:
+            raise error
+
+    # ------------------------------------------------------------------ 市场信息
+
+    def _ensure_market(self, symbol: str) -> Dict:
+        market = self.markets.get(symbol)
+        if market is not None:
+            return market
+        base, rest = symbol.split('/')
+        quote = rest.split(':')[0]
+        series = self._series_for(symbol)
+        price = series['closes'][-1]
+        # 合约面值：每张约 1~10 USDT
+        contract_size = 10 ** math.floor(math.log10(10 / price)) if price > 0 else 1
+        market = {
+            'id': symbol.replace('/', '').split(':')[0], 'symbol': symbol,
+            'base': base, 'quote': quote, 'settle': quote,
+            'type': 'swap', 'spot': False, 'margin': False, 'swap': True, 'future': False, 'option': False,
+            'contract': True, 'linear': True, 'inverse': False, 'active': True,
+            'contractSize': contract_size,
+            'precision': {'amount': 1, 'price': series.get('tick') or price_tick(price)},
+            'limits': {'amount': {'min': 1}, 'cost': {'min': 5}},
+            'info': {},
+        }
+        with self._lock:
+            self.markets.setdefault(symbol, market)
+            self.currencies.setdefault(base, {'id': base, 'code': base})
+            self.currencies.setdefault(quote, {'id': quote, 'code': quote})
+        return self.markets[symbol]
+
+    def load_markets(self, reload=False, params={}):
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = dict(markets) if isinstance(markets, dict) else {m['symbol']: m for m in markets}
+        self.currencies = dict(currencies or {})
+        return self.markets
+
+    def market(self, symbol: str) -> Dict:
+        return self._ensure_market(symbol)
+
+    # ------------------------------------------------------------------ 行情
+
+    def _series_for(self, symbol: str) -> Dict:
+        """5分钟基础K线序列（随机游走按需延伸到当前时间；录制数据按时间平移到当前）"""
+        with self._lock:
+            series = self._series.get(symbol)
+            if series is None:
+                series = self._create_series(symbol)
+                self._series[symbol] = series
+            if self._recording is None:
+                self._extend(symbol, series)
+            return series
+
+    def _create_series(self, symbol: str) -> Dict:
+        now_bar = self._now_ms() // BASE_MS * BASE_MS
+        recorded = self._recording_bars(symbol)
+        if recorded:
+            # 录制数据平移到当前时间：最后一根录制K线对齐当前未收盘K线
+            shift = now_bar - recorded[-1][0]
+            bars = [[c[0] + shift] + list(c[1:6]) for c in recorded]
+            return {'origin': bars[0][0], 'bars': bars, 'closes': [c[4] for c in bars]}
+        rng = random.Random(zlib.crc32(f"{self.seed}:{symbol}".encode()))
+        start_price = 10 ** rng.uniform(-1, 4.5)
+        start_price = float(self.start_prices.get(symbol) or self.start_prices.get(symbol.split('/')[0]) or start_price)
+        origin = now_bar - (self.history_bars - 1) * BASE_MS
+        # 与交易所一样，K线价格落在最小变动价位上（起始价格的5位有效数字）
+        decimals = -math.floor(math.log10(price_tick(start_price)) + 1e-9)
+        start_price = round(start_price, decimals)
+        return {'origin': origin, 'bars': [], 'closes': [], 'rng': rng, 'price': start_price,
+                'decimals': decimals, 'tick': 10.0 ** -decimals}
+
+    def _recording_bars(self, symbol: str) -> List:
+        if self._recording is None:
+            return []
+        series = self._recording.get(symbol) or self._recording.get(symbol.split(':')[0]) or {}
+        return series.get(BASE_TIMEFRAME, [])
+
+    def _extend(self, symbol: str, series: Dict):
+        now_bar = self._now_ms() // BASE_MS * BASE_MS
+        rng = series['rng']
+        while series['origin'] + len(series['bars']) * BASE_MS <= now_bar:
+            ts = series['origin'] + len(series['bars']) * BASE_MS
+            open_ = series['price']
+            decimals = series['decimals']
+            close = max(round(open_ * math.exp(rng.gauss(0, 0.002)), decimals), series['tick'])
+            high = round(max(open_, close) * (1 + abs(rng.gauss(0, 0.001))), decimals)
+            low = max(round(min(open_, close) * (1 - abs(rng.gauss(0, 0.001))), decimals), series['tick'])
+            series['bars'].append([ts, open_, high, low, close, round(rng.uniform(10, 1000), 3)])
+            series['closes'].append(close)
+            series['price'] = close
+
+    def _last_price(self, symbol: str) -> float:
+        return self._series_for(symbol)['closes'][-1]
+
+    def last_price(self, symbol: str) -> float:
+        """当前模拟价格（不计入调用次数、没有延迟和故障，供测试脚本使用）"""
+        return self._last_price(symbol)
+
+    def _aggregate(self, bars: List, timeframe: str) -> List:
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        if timeframe_ms == BASE_MS:
+            return [list(c) for c in bars]
+        candles = []
+        for candle in bars:
+            bucket = candle[0] // timeframe_ms * timeframe_ms
+            if candles and candles[-1][0] == bucket:
+                merged = candles[-1]
+                merged[2] = max(merged[2], candle[2])
+                merged[3] = min(merged[3], candle[3])
+                merged[4] = candle[4]
+                # 成交量按交易所的数量精度累加，去掉浮点加法的尾差
+                merged[5] = round(merged[5] + candle[5], 8)
+            else:
+                candles.append([bucket] + list(candle[1:6]))
+        return candles
+
+    def fetch_ohlcv(self, symbol: str, timeframe='1m', since=None, limit=None, params={}):
+        self._call('fetch_ohlcv')
+        series = self._series_for(symbol)
+        timeframe_ms = ccxt.Exchange.parse_timeframe(timeframe) * 1000
+        limit = limit or 500
+        bars = series['bars']
+        # 只聚合需要的那一段5分钟K线
+        per_bar = max(1, timeframe_ms // BASE_MS)
+        if since is None:
+            first = max(0, len(bars) - (limit + 1) * per_bar)
+        else:
+            start = since // timeframe_ms * timeframe_ms
+            first = max(0, (start - series['origin']) // BASE_MS)
+        candles = self._aggregate(bars[first:first + (limit + 1) * per_bar + per_bar], timeframe)
+        if since is not None:
+            candles = [c for c in candles if c[0] >= since]
+            return candles[:limit]
+        return candles[-limit:]
+
+    def fetch_ticker(self, symbol: str, params={}):
+        self._call('fetch_ticker')
+        return self._ticker(symbol)
+
+    def _ticker(self, symbol: str) -> Dict:
+        series = self._series_for(symbol)
+        day = series['bars'][-288:]
+        last = day[-1][4]
+        open_ = day[0][1]
+        return {
+            'symbol': symbol, 'timestamp': self._now_ms(), 'last': last, 'close': last,
+            'open': open_, 'high': max(c[2] for c in day), 'low': min(c[3] for c in day),
+            'baseVolume': sum(c[5] for c in day), 'quoteVolume': sum(c[5] * c[4] for c in day),
+            'percentage': (last - open_) / open_ * 100, 'bid': last, 'ask': last,
+        }
+
+    def fetch_tickers(self, symbols=None, params={}):
+        self._call('fetch_tickers')
+        return {symbol: self._ticker(symbol) for symbol in (symbols or list(self.markets))}
+
+    def _funding(self, symbol: str) -> Dict:
+        rng = random.Random(zlib.crc32(f"{self.seed}:{symbol}:{self._now_ms() // 28800000}".encode()))
+        return {'symbol': symbol, 'fundingRate': round(rng.gauss(0.0001, 0.0002), 6), 'timestamp': self._now_ms()}
+
+    def fetch_funding_rate(self, symbol: str, params={}):
+        self._call('fetch_funding_rate')
+        return self._funding(symbol)
+
+    def fetch_funding_rates(self, symbols=None, params={}):
+        self._call('fetch_funding_rates')
+        return {symbol: self._funding(symbol) for symbol in (symbols or list(self.markets))}
+
+    def fetch_open_interest(self, symbol: str, params={}):
+        self._call('fetch_open_interest')
+        series = self._series_for(symbol)
+        volume = sum(c[5] for c in series['bars'][-288:])
+        return {'symbol': symbol, 'openInterestAmount': volume * 3, 'timestamp': self._now_ms()}
+
+    # ------------------------------------------------------------------ 账户
+
+    def set_leverage(self, leverage, symbol=None, params={}):
+        self._call('set_leverage')
+        self.leverage[symbol] = int(leverage)
+        return {'symbol': symbol, 'leverage': int(leverage)}
+
+    def _position_view(self, symbol: str, position: Dict) -> Dict:
+        market = self._ensure_market(symbol)
+        price = self._last_price(symbol)
+        size = position['contracts'] * market['contractSize']
+        direction = 1 if position['side'] == 'long' else -1
+        leverage = self.leverage.get(symbol, 1)
+        notional = size * price
+        return {
+            'symbol': symbol, 'side': position['side'], 'contracts': position['contracts'],
+            'contractSize': market['contractSize'], 'entryPrice': position['entry_price'],
+            'markPrice': price, 'notional': notional, 'leverage': leverage,
+            'unrealizedPnl': (price - position['entry_price']) * size * direction,
+            'initialMargin': size * position['entry_price'] / leverage,
+            'marginMode': 'isolated', 'info': {},
+        }
+
+    def fetch_positions(self, symbols=None, params={}):
+        self._call('fetch_positions')
+        self._check_stops()
+        with self._lock:
+            positions = list(self.positions.items())
+        return [self._position_view(symbol, p) for symbol, p in positions
+                if symbols is None or symbol in symbols]
+
+    def fetch_balance(self, params={}):
+        self._call('fetch_balance')
+        self._check_stops()
+        with self._lock:
+            positions = list(self.positions.items())
+        views = [self._position_view(symbol, p) for symbol, p in positions]
+        used = sum(v['initialMargin'] for v in views)
+        total = self.balance + sum(v['unrealizedPnl'] for v in views)
+        usdt = {'free': total - used, 'used': used, 'total': total}
+        return {'USDT': usdt, 'free': {'USDT': usdt['free']}, 'used': {'USDT': used},
+                'total': {'USDT': total}, 'info': {}}
+
+    def _fill(self, symbol: str, side: str, contracts: float, price: float, reduce_only: bool = False) -> float:
+        """按价格成交，更新持仓和余额（扣除手续费），返回实际成交张数"""
+        size_per_contract = self._ensure_market(symbol)['contractSize']
+        with self._lock:
+            filled = self._apply_fill(symbol, side, contracts, price, reduce_only, size_per_contract)
+            self.balance -= filled * size_per_contract * price * self.fee_rate
+            return filled
+
+    def _apply_fill(self, symbol, side, contracts, price, reduce_only, size_per_contract) -> float:
+        """更新持仓和已实现盈亏（调用方持有锁）"""
+        position = self.positions.get(symbol)
+        direction = 'long' if side == 'buy' else 'short'
+        if position is None or position['side'] == direction:
+            if reduce_only:
+                return 0.0
+            if position is None:
+                self.positions[symbol] = {'side': direction, 'contracts': contracts, 'entry_price': price}
+            else:
+                total = position['contracts'] + contracts
+                position['entry_price'] = (position['entry_price'] * position['contracts'] + price * contracts) / total
+                position['contracts'] = total
+            return contracts
+        # 反向成交：先平仓，剩余部分（非 reduceOnly）开反向仓
+        closed = min(contracts, position['contracts'])
+        sign = 1 if position['side'] == 'long' else -1
+        self.balance += (price - position['entry_price']) * closed * size_per_contract * sign
+        position['contracts'] -= closed
+        if position['contracts'] <= 1e-12:
+            del self.positions[symbol]
+        remaining = contracts - closed
+        if remaining > 0 and not reduce_only:
+            self.positions[symbol] = {'side': direction, 'contracts': remaining, 'entry_price': price}
+            return contracts
+        return closed
+
+    def _new_order(self, symbol, type_, side, amount, price, status, params) -> Dict:
+        with self._lock:
+            order_id = str(self._next_order_id)
+            self._next_order_id += 1
+            now = self._now_ms()
+            order = {
+                'id': order_id, 'symbol': symbol, 'type': type_, 'side': side,
+                'amount': amount, 'price': price, 'average': None, 'filled': 0.0,
+                'remaining': amount, 'status': status, 'timestamp': now, 'lastTradeTimestamp': None,
+                'stopPrice': params.get('stopPrice') or params.get('triggerPrice'),
+                'reduceOnly': bool(params.get('reduceOnly')), 'info': {},
+            }
+            self.orders[order_id] = order
+        return order
+
+    def create_order(self, symbol, type, side, amount=None, price=None, params={}):
+        self._call('create_order')
+        params = params or {}
+        market = self._ensure_market(symbol)
+        last = self._last_price(symbol)
+        if amount is None and params.get('cost'):
+            amount = params['cost'] / (last * market['contractSize'])
+        if not amount or amount <= 0:
+            raise ccxt.InvalidOrder(f"fake create_order: 无效数量 {amount}")
+
+        stop_price = params.get('stopPrice') or params.get('triggerPrice') or params.get('stopLossPrice')
+        if stop_price or 'stop' in str(type).lower():
+            # 止损单：挂单，价格触及时按触发价成交
+            order = self._new_order(symbol, type, side, float(amount), price, 'open',
+                                    dict(params, stopPrice=stop_price or price))
+            return dict(order)
+
+        slippage = last * self.slippage_bps / 10000
+        fill_price = last + slippage if side == 'buy' else last - slippage
+        order = self._new_order(symbol, type, side, float(amount), price, 'open', params)
+        filled = self._fill(symbol, side, float(amount), fill_price, bool(params.get('reduceOnly')))
+        with self._lock:
+            order.update(filled=filled, remaining=order['amount'] - filled, average=fill_price,
+                         status='closed', lastTradeTimestamp=self._now_ms())
+            return dict(order)
+
+    def _check_stops(self):
+        """最新价触及止损价的挂单按触发价成交"""
+        with self._lock:
+            pending = [o for o in self.orders.values() if o['status'] == 'open' and o['stopPrice']]
+        for order in pending:
+            last = self._last_price(order['symbol'])
+            stop = float(order['stopPrice'])
+            triggered = last <= stop if order['side'] == 'sell' else last >= stop
+            if not triggered:
+                continue
+            filled = self._fill(order['symbol'], order['side'], order['amount'], stop, reduce_only=True)
+            with self._lock:
+                order.update(filled=filled, remaining=order['amount'] - filled, average=stop,
+                             status='closed', lastTradeTimestamp=self._now_ms())
+
+    def cancel_order(self, id, symbol=None, params={}):
+        self._call('cancel_order')
+        with self._lock:
+            order = self.orders.get(str(id))
+            if order is None or order['status'] != 'open':
+                raise ccxt.OrderNotFound(f"fake cancel_order: Unknown order {id}")
+            order['status'] = 'canceled'
+            return dict(order)
+
+    def fetch_order(self, id, symbol=None, params={}):
+        self._call('fetch_order')
+        self._check_stops()
+        with self._lock:
+            order = self.orders.get(str(id))
+            if order is None:
+                raise ccxt.OrderNotFound(f"fake fetch_order: Unknown order {id}")
+            return dict(order)
+
+    def fetch_open_orders(self, symbol=None, since=None, limit=None, params={}):
+        self._call('fetch_open_orders')
+        with self._lock:
+            return [dict(o) for o in self.orders.values()
+                    if o['status'] == 'open' and (symbol is None or o['symbol'] == symbol)]
+
+    def close(self):
+        pass
+
+    # ------------------------------------------------------------------ 统计
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'total_calls': sum(self.calls.values()),
+                'injected_errors': dict(self.injected_errors),
+                'orders': len(self.orders),
+                'positions': len(self.positions),
+                'balance': self.balance,
+            }
@@ -0,0 +1,179 @@
+"""
+本地模拟 OpenAI 兼容接口 - 响应 POST /v1/chat/completions，延迟可配置，回复内容由 responder 决定
+
+用于在没有 API 密钥和网络的情况下运行完整的决策流程（benchmarks/bench_cycle.py），支持 stream=True（SSE 分片返回）:
+    server = FakeLLMServer(latency_ms={'distribution': 'lognormal', 'mean': 800}, decode_ms_per_token=10)
+    base_url = server.run_in_thread()   # 设置 OPENAI_BASE_URL=base_url
+    ...
+    server.shutdown()
+"""
+import re
+import json
+import time
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+
+from .fake_exchange import LatencyModel
+
+COIN_PATTERN = re.compile(r'^\s*([A-Z0-9]+)/USDT:', re.MULTILINE)
+
+
+def prompt_coins(messages: List[Dict]) -> List[str]:
+    """从用户消息中提取本轮分析的币种（提示词中每个币种一段 "ETH/USDT:"）"""
+    text = '\n'.join(m.get('content') or '' for m in messages if m.get('role') == 'user')
+    return list(dict.fromkeys(COIN_PATTERN.findall(text)))
+
+
+def hold_all_responder(messages: List[Dict]) -> Dict:
+    """默认回复：所有币种 HOLD"""
+    return {
+        'decisions': [
+            {'coin': coin, 'action': 'HOLD', 'reason': '模拟回复：观望', 'position_value': 0,
+             'stop_loss': 0, 'take_profit': 0}
+            for coin in prompt_coins(messages)
+        ],
+        'strategy': '模拟回复：保持观望',
+        'risk_level': 'LOW',
+        'confidence': 'LOW',
+    }
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算 token 数（模拟 usage 字段用）"""
+    return max(1, len(text) // 3)
+
+
+class FakeLLMServer:
+    """
+    模拟 OpenAI 兼容的对话接口
+
+    :param responder: (messages) -> dict 或 str，返回的 dict 会序列化为 JSON 作为回复内容
+    :param latency_ms: 响应延迟分布（见 LatencyModel）
+    :param seed: 延迟随机种子
+    :param prefill_ms_per_1k: 每1000个未命中缓存的输入token增加的延迟（模拟预填充耗时）
+    :param decode_ms_per_token: 每个输出token的生成耗时；非流式请求在全部生成后一次返回，
+                                流式请求在首个token前等待 延迟+预填充，之后按生成速度分片返回
+
+    模拟前缀缓存：system 消息与之前某次请求相同时，这部分 token 计为命中缓存（不计预填充延迟），
+    usage 中同时返回 DeepSeek 的 prompt_cache_hit_tokens / prompt_cache_miss_tokens 和 OpenAI 的 prompt_tokens_details.cached_tokens。
+    """
+
+    def __init__(self, responder: Callable = None, latency_ms: Dict = None, seed: int = 0,
+                 prefill_ms_per_1k: float = 0, decode_ms_per_token: float = 0):
+        self.responder = responder or hold_all_responder
+        self.latency = LatencyModel(latency_ms)
+        self.prefill_ms_per_1k = float(prefill_ms_per_1k)
+        self.decode_ms_per_token = float(decode_ms_per_token)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._prefixes = set()
+        self.requests = 0
+        self.last_messages = []
+        self._server = None
+        self._thread = None
+
+    def _prepare(self, body: Dict):
+        """返回 (首个token前的延迟毫秒, 回复内容, usage)"""
+        messages = body.get('messages', [])
+        prompt_tokens = sum(estimate_tokens(m.get('content') or '') for m in messages)
+        system = ''.join(m.get('content') or '' for m in messages if m.get('role') == 'system')
+        with self._lock:
+            self.requests += 1
+            self.last_messages = messages
+            cached_tokens = estimate_tokens(system) if system and system in self._prefixes else 0
+            if system:
+                self._prefixes.add(system)
+            delay = self.latency.sample(self._rng)
+        delay += (prompt_tokens - cached_tokens) / 1000 * self.prefill_ms_per_1k
+        content = self.responder(messages)
+        if not isinstance(content, str):
+            content = json.dumps(content, ensure_ascii=False)
+        completion_tokens = estimate_tokens(content)
+        usage = {'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                 'total_tokens': prompt_tokens + completion_tokens,
+                 'prompt_cache_hit_tokens': cached_tokens,
+                 'prompt_cache_miss_tokens': prompt_tokens - cached_tokens,
+                 'prompt_tokens_details': {'cached_tokens': cached_tokens}}
+        return delay, content, usage
+
+    def _complete(self, body: Dict) -> Dict:
+        delay, content, usage = self._prepare(body)
+        delay += usage['completion_tokens'] * self.decode_ms_per_token
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return {
+            'id': f"chatcmpl-fake-{self.requests}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': content},
+                         'finish_reason': 'stop'}],
+            'usage': usage,
+        }
+
+    def _stream(self, body: Dict, write: Callable[[Dict], None], piece_chars: int = 12):
+        """流式回复：按 chat.completion.chunk 格式每 piece_chars 个字符一片，stream_options.include_usage 时最后附带 usage"""
+        delay, content, usage = self._prepare(body)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        chunk = {'id': f"chatcmpl-fake-{self.requests}", 'object': 'chat.completion.chunk',
+                 'created': int(time.time()), 'model': body.get('model', 'fake')}
+        for start in range(0, len(content), piece_chars):
+            piece = content[start:start + piece_chars]
+            if self.decode_ms_per_token > 0:
+                time.sleep(estimate_tokens(piece) * self.decode_ms_per_token / 1000)
+            delta = {'content': piece} if start else {'role': 'assistant', 'content': piece}
+            write(dict(chunk, choices=[{'index': 0, 'delta': delta, 'finish_reason': None}]))
+        write(dict(chunk, choices=[{'index': 0, 'delta': {}, 'finish_reason': 'stop'}]))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            write(dict(chunk, choices=[], usage=usage))
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if not self.path.rstrip('/').endswith('/chat/completions'):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get('Content-Length', 0))
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if body.get('stream'):
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'text/event-stream')
+                    self.end_headers()
+
+                    def write(event):
+                        self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                        self.wfile.flush()
+
+                    server._stream(body, write)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    return
+                payload = json.dumps(server._complete(body)).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def run_in_thread(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """后台线程启动服务，返回 base_url（如 http://127.0.0.1:54321/v1）"""
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-llm', daemon=True)
+        self._thread.start()
+        return f"http://{host}:{self._server.server_address[1]}/v1"
+
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
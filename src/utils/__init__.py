@@ -2,5 +2,11 @@
 工具模块 - 包含重试装饰器和其他辅助函数
 """
 from .retry_decorator import retry_on_api_error, retry_on_network_error
+from .rate_limiter import RateLimiter
+from .request_cache import RequestCache
+from .markets_cache import load_markets_cached, markets_cache_file
+from .candle_scheduler import CandleScheduler
+from .stage_timer import StageTimer
 
-__all__ = ['retry_on_api_error', 'retry_on_network_error']
+__all__ = ['retry_on_api_error', 'retry_on_network_error', 'RateLimiter', 'RequestCache',
+           'load_markets_cached', 'markets_cache_file', 'CandleScheduler', 'StageTimer']
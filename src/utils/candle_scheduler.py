@@ -0,0 +1,80 @@
+"""
+K线收盘对齐的定时器 - 在交易所K线收盘后几秒触发，替代按进程启动时间计时的 schedule.every(N).minutes
+"""
+import time
+import math
+from datetime import datetime
+
+
+class CandleScheduler:
+    """
+    按K线边界触发任务
+
+    交易所K线按 UTC 时间对齐（5分钟K线在 :00/:05/:10… 收盘），这里每 interval_minutes 分钟
+    在边界之后 delay_seconds 秒触发一次，保证每轮用到的是刚收盘的K线。
+    - 记录每次触发相对计划时间的偏差（drift）
+    - 某一轮执行超过一个周期时跳过已错过的触发，不会连续补跑
+
+    Args:
+        interval_minutes: 触发周期（分钟），通常等于最小K线周期或 check_interval_minutes
+        delay_seconds: 边界之后延迟的秒数（等待交易所生成收盘K线）
+        clock / sleep: 时间函数（测试时可替换）
+    """
+
+    def __init__(self, interval_minutes: float = 5, delay_seconds: float = 5,
+                 clock=time.time, sleep=time.sleep):
+        self.interval = max(1.0, float(interval_minutes) * 60)
+        self.delay = max(0.0, float(delay_seconds))
+        self.clock = clock
+        self.sleep = sleep
+        self.runs = 0
+        self.skipped = 0
+        self.last_drift = 0.0
+        self.max_drift = 0.0
+
+    def next_run(self, now: float = None) -> float:
+        """now 之后的下一个触发时间（K线边界 + delay_seconds）"""
+        now = self.clock() if now is None else now
+        boundary = math.floor((now - self.delay) / self.interval) * self.interval + self.interval
+        return boundary + self.delay
+
+    def wait_until(self, target: float):
+        """休眠到 target；分段休眠，系统时间调整后也能及时触发"""
+        while True:
+            remaining = target - self.clock()
+            if remaining <= 0:
+                return
+            self.sleep(min(remaining, 1.0))
+
+    def run_forever(self, job):
+        """循环执行 job：等待下一个K线边界 -> 执行 -> 检查是否错过触发"""
+        scheduled = self.next_run()
+        print(f"⏰ 下次执行: {datetime.fromtimestamp(scheduled).strftime('%H:%M:%S')}"
+              f"（K线收盘后{self.delay:g}秒）")
+        while True:
+            self.wait_until(scheduled)
+            drift = self.clock() - scheduled
+            self.runs += 1
+            self.last_drift = drift
+            self.max_drift = max(self.max_drift, drift)
+            print(f"⏰ K线收盘触发: 计划 {datetime.fromtimestamp(scheduled).strftime('%H:%M:%S')}，"
+                  f"偏差 {drift:+.2f}秒")
+
+            job()
+
+            finished = self.clock()
+            following = self.next_run(finished)
+            missed = int(round((following - scheduled) / self.interval)) - 1
+            if missed > 0:
+                self.skipped += missed
+                print(f"⏭️ 本轮耗时 {finished - scheduled:.1f}秒，超过执行周期，跳过 {missed} 次触发"
+                      f"（累计跳过 {self.skipped} 次）")
+            scheduled = following
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs,
+            'skipped': self.skipped,
+            'last_drift': self.last_drift,
+            'max_drift': self.max_drift,
+        }
@@ -0,0 +1,42 @@
+"""
+交易所市场信息缓存 - load_markets() 的结果保存到 data/ 下，重启时直接读取，不再每次启动都下载
+"""
+import os
+import json
+import time
+
+
+def markets_cache_file(data_dir: str, exchange_obj) -> str:
+    """缓存文件路径：按交易所和市场类型区分，如 data/markets_binance_future.json"""
+    market_type = exchange_obj.options.get('defaultType', 'default') if exchange_obj.options else 'default'
+    return os.path.join(data_dir, f"markets_{exchange_obj.id}_{market_type}.json")
+
+
+def load_markets_cached(exchange_obj, cache_file: str, max_age_hours: float = 24):
+    """
+    加载市场信息：缓存未过期时从文件读取（set_markets），否则调用 load_markets() 并写入缓存
+    max_age_hours <= 0 时不使用缓存
+    :return: 'cache' 或 'exchange'（数据来源）
+    """
+    if max_age_hours > 0 and os.path.exists(cache_file):
+        age_hours = (time.time() - os.path.getmtime(cache_file)) / 3600
+        if age_hours < max_age_hours:
+            try:
+                with open(cache_file, 'r', encoding='utf-8') as f:
+                    cached = json.load(f)
+                exchange_obj.set_markets(cached['markets'], cached.get('currencies'))
+                return 'cache'
+            except Exception as e:
+                print(f"⚠️ 市场信息缓存读取失败，重新下载: {e}")
+
+    exchange_obj.load_markets()
+    if max_age_hours > 0:
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            temp_file = f"{cache_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({'markets': exchange_obj.markets, 'currencies': exchange_obj.currencies}, f)
+            os.replace(temp_file, cache_file)
+        except Exception as e:
+            print(f"⚠️ 保存市场信息缓存失败: {e}")
+    return 'exchange'
@@ -0,0 +1,47 @@
+"""
+线程安全的请求节流器 - 多线程并发调用同一个CCXT交易所对象时共享限频预算
+"""
+import time
+import threading
+
+
+class RateLimiter:
+    """
+    按固定间隔分配请求时间槽的节流器
+
+    CCXT 同步版的 enableRateLimit 只记录"上一次请求时间"，多个线程同时读取
+    会一起放行，超出交易所的限频预算。这里用锁预约时间槽，保证任意线程发出的
+    请求之间至少间隔 interval_ms 毫秒，等待在锁外进行，不会阻塞其他线程预约。
+
+    Args:
+        interval_ms: 两次请求之间的最小间隔（毫秒），通常取 exchange.rateLimit
+        enabled: 为 False 时不做任何节流
+    """
+
+    def __init__(self, interval_ms: float = 0, enabled: bool = True):
+        self.interval = max(0.0, float(interval_ms or 0)) / 1000.0
+        self.enabled = enabled and self.interval > 0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+        self.total_wait = 0.0  # 累计等待秒数（用于统计）
+
+    @classmethod
+    def for_exchange(cls, exchange_obj) -> 'RateLimiter':
+        """根据交易所对象的 rateLimit / enableRateLimit 创建节流器"""
+        return cls(
+            interval_ms=getattr(exchange_obj, 'rateLimit', 0),
+            enabled=bool(getattr(exchange_obj, 'enableRateLimit', True))
+        )
+
+    def acquire(self, cost: float = 1):
+        """预约一个请求时间槽，必要时休眠到该时间点"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval * cost
+            delay = slot - now
+            self.total_wait += delay
+        if delay > 0:
+            time.sleep(delay)
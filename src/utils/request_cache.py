@@ -0,0 +1,89 @@
+"""
+单轮请求缓存 - 同一轮决策内相同的行情请求只发一次（single-flight）
+"""
+import threading
+
+
+class _Entry:
+    """一个请求的结果占位（请求进行中时其他线程在 done 上等待）"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCache:
+    """
+    按请求参数缓存结果，只在 begin() 与 end() 之间生效
+
+    - 第一次请求某个 key 时真正调用接口，其他线程同时请求同一个 key 会等待这次调用的结果
+    - 调用失败不缓存，后续请求（例如重试）会重新调用
+    - end() 后缓存清空并停止生效，避免跨轮使用过期数据
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.active = False
+        self.hits = 0
+        self.waits = 0
+        self.misses = 0
+
+    def begin(self):
+        """开始新一轮：清空缓存和统计"""
+        with self._lock:
+            self._entries.clear()
+            self.active = True
+            self.hits = self.waits = self.misses = 0
+
+    def end(self):
+        """结束本轮：清空缓存并停止生效"""
+        with self._lock:
+            self._entries.clear()
+            self.active = False
+
+    def call(self, key, fn, *args, **kwargs):
+        """
+        获取 key 对应的结果，未缓存时调用 fn(*args, **kwargs)
+        :param key: 可哈希的请求标识，如 ('fetch_ohlcv', 'BTC/USDT', '1h', 100)
+        """
+        if not self.active:
+            return fn(*args, **kwargs)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            owner = entry is None
+            if owner:
+                entry = _Entry()
+                self._entries[key] = entry
+                self.misses += 1
+            elif entry.done.is_set():
+                self.hits += 1
+            else:
+                self.waits += 1
+
+        if not owner:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+            return entry.result
+
+        try:
+            entry.result = fn(*args, **kwargs)
+            return entry.result
+        except Exception as e:
+            entry.error = e
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            raise
+        finally:
+            entry.done.set()
+
+    def stats(self) -> dict:
+        """本轮统计：hits=直接复用，waits=等待进行中的请求，misses=实际发出的请求"""
+        with self._lock:
+            return {'hits': self.hits, 'waits': self.waits, 'misses': self.misses}
@@ -0,0 +1,70 @@
+"""
+阶段计时器 - 记录每轮决策各阶段（扫描、BTC背景、持仓、账户、提示词、AI、解析、执行）的耗时
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+# 日志和基准测试报告中的阶段名称
+STAGE_LABELS = {
+    'positions': '持仓',
+    'scan': '扫描',
+    'btc': 'BTC背景',
+    'account': '账户',
+    'prompt': '提示词',
+    'llm': 'AI',
+    'parse': '解析',
+    'execute': '执行',
+}
+
+
+class StageTimer:
+    """
+    按阶段累计耗时（秒）
+
+    - reset(): 每轮开始时清空
+    - stage(name): with 语句计时；start(name) / stop(name): 跨越多段代码时手动计时（stop 未 start 的阶段时忽略）
+    - timings: {阶段: 秒}，同名阶段多次计时会累加
+    - record(name, seconds): 不属于任何阶段的时间点指标（如流式回复的首个决策耗时），保存在 metrics，不计入合计
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.timings = {}
+        self.metrics = {}
+        self._started = {}
+
+    def reset(self):
+        self.timings = {}
+        self.metrics = {}
+        self._started = {}
+
+    def start(self, name: str):
+        self._started[name] = self.clock()
+
+    def stop(self, name: str):
+        started = self._started.pop(name, None)
+        if started is not None:
+            self.timings[name] = self.timings.get(name, 0.0) + self.clock() - started
+
+    @contextmanager
+    def stage(self, name: str):
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def record(self, name: str, seconds: float):
+        self.metrics[name] = seconds
+
+    def total(self) -> float:
+        return sum(self.timings.values())
+
+    def summary(self) -> str:
+        """一行摘要: 扫描 1.23秒 | AI 8.90秒 | ... | 合计 10.50秒"""
+        parts = [f"{STAGE_LABELS.get(name, name)} {seconds:.2f}秒" for name, seconds in self.timings.items()]
+        return ' | '.join(parts + [f"合计 {self.total():.2f}秒"])
+
+    def snapshot(self) -> Dict[str, float]:
+        return dict(self.timings)
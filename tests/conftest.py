@@ -0,0 +1,85 @@
+"""
+测试公共设置 - 把 src、src/core 加入导入路径；pm fixture 在模拟交易所和模拟AI接口上导入 portfolio_manager，
+make_scanner fixture 在模拟交易所上创建独立的 MarketScanner
+
+portfolio_manager 在导入时连接交易所并读取配置，整个测试会话只导入一次；
+配置、数据文件和日志都写在临时目录，不影响 config/ 和 data/。
+"""
+import contextlib
+import io
+import json
+import logging
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from sim import FakeExchange, FakeLLMServer
+
+TEST_COINS = ['ETH', 'SOL']
+
+
+@pytest.fixture(scope='session')
+def fake_llm():
+    server = FakeLLMServer()
+    server.base_url = server.run_in_thread()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope='session')
+def pm(fake_llm, tmp_path_factory):
+    """导入 portfolio_manager（exchange: fake，币种 ETH/SOL）"""
+    workdir = tmp_path_factory.mktemp('portfolio')
+    with open(os.path.join(PROJECT_ROOT, 'config', 'coins_config.json'), 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config['coins'] = [{'symbol': f"{coin}/USDT", 'min_order_value': 13} for coin in TEST_COINS]
+    config['exchange'] = 'fake'
+    config['fake_exchange'] = {'seed': 0, 'start_prices': {'ETH/USDT': 3000, 'SOL/USDT': 150}}
+    config.setdefault('scanner', {})['candle_store'] = False
+    config_file = workdir / 'coins_config.json'
+    config_file.write_text(json.dumps(config, ensure_ascii=False), encoding='utf-8')
+
+    os.environ.update({
+        'OPENAI_API_KEY': 'fake',
+        'OPENAI_BASE_URL': fake_llm.base_url,
+        'OPENAI_MODEL_NAME': 'fake',
+        'PORTFOLIO_CONFIG_FILE': str(config_file),
+        'PORTFOLIO_DATA_DIR': str(workdir),
+        'PORTFOLIO_LOG_FILE': str(workdir / 'portfolio_manager.log'),
+    })
+    import portfolio_manager
+    # portfolio_manager 的 print 写入日志，测试中不需要控制台输出
+    logging.getLogger().handlers = [h for h in logging.getLogger().handlers
+                                    if not isinstance(h, logging.StreamHandler) or isinstance(h, logging.FileHandler)]
+    return portfolio_manager
+
+
+@pytest.fixture
+def make_scanner(tmp_path):
+    """
+    创建 MarketScanner（模拟交易所，币种 ETH/SOL，不写K线存储，不预筛选）
+    :param fake: 模拟交易所配置（如 latency_by_method）
+    :param scanner: 覆盖 scanner 配置
+    """
+    from market_scanner import MarketScanner
+
+    def make(fake=None, **scanner):
+        with open(os.path.join(PROJECT_ROOT, 'config', 'coins_config.json'), 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        config['coins'] = [{'symbol': f"{coin}/USDT", 'min_order_value': 13} for coin in TEST_COINS]
+        config['exchange'] = 'fake'
+        config.setdefault('scanner', {}).update(dict(candle_store=False, prescreen={'top_n': 0}), **scanner)
+        config_file = tmp_path / 'scanner_config.json'
+        config_file.write_text(json.dumps(config, ensure_ascii=False), encoding='utf-8')
+        symbols = [f"{coin}/USDT" for coin in TEST_COINS] + ['BTC/USDT']
+        exchange = FakeExchange({'fake': dict({'seed': 0, 'symbols': symbols}, **(fake or {}))})
+        exchange.load_markets()
+        with contextlib.redirect_stdout(io.StringIO()):
+            return MarketScanner(exchange, str(config_file))
+
+    return make
@@ -0,0 +1,76 @@
+"""
+K线缓存精度测试 - 环形缓冲默认 float64 原样保存；可选的 float32 缓冲取出后也应与交易所返回的数值一致，提示词中不出现 float32 展开噪声
+
+用法:
+    python3 -m pytest tests/test_candle_ring.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from candle_ring import CandleRing, widen_float32
+from kline_view import KlineView
+from market_scanner import OHLCVCache
+from prompt_encoding import _build_kline_text
+
+MINUTE_MS = 60 * 1000
+PRICES = [3456.78, 3460.12, 3450.01, 3455.5, 1234.567]
+
+
+def make_candles(count: int, prices=PRICES):
+    """以当前时间结尾的5分钟K线（每根价格略有不同）"""
+    end = int(time.time() * 1000) // (5 * MINUTE_MS) * (5 * MINUTE_MS)
+    start = end - (count - 1) * 5 * MINUTE_MS
+    return [[start + i * 5 * MINUTE_MS] + [round(p + i * 0.01, 2) for p in prices[:4]] + [prices[4]]
+            for i in range(count)]
+
+
+def test_to_list_returns_fetched_values():
+    candles = make_candles(20) + [[0, 0.12345, 0.00001234, 67234.56, 0.0, 98765.4]]
+    candles[-1][0] = candles[-2][0] + 5 * MINUTE_MS
+    ring = CandleRing.from_candles(candles, price_dtype=np.float32)
+    assert ring.window().dtype['open'] == np.float32
+    assert ring.to_list() == candles
+    assert isinstance(ring.to_list()[0][0], int)
+
+
+def test_default_float64_keeps_every_digit():
+    """默认 float64 存储：超出 float32 精度的价格和成交量也原样取出"""
+    candles = make_candles(5, [3456.789123, 3460.123456, 3450.012345, 3455.500001, 123456789.123])
+    ring = CandleRing.from_candles(candles)
+    assert ring.window().dtype['open'] == np.float64
+    assert ring.to_list() == candles
+    assert OHLCVCache().price_dtype == np.float64
+
+
+def test_widen_float32_keeps_special_values():
+    values = np.array([0.0, -2.5, np.inf, np.nan, 1e-8, 123456789.0], dtype=np.float32)
+    widened = widen_float32(values)
+    assert widened[0] == 0.0 and widened[1] == -2.5 and np.isinf(widened[2]) and np.isnan(widened[3])
+    assert widened[4] == 1e-8
+    assert np.float32(widened[5]) == values[5]
+
+
+def test_cached_candles_in_prompt_text():
+    """完整下载和增量更新后从缓存取出的K线，生成的提示词文本与直接使用交易所数据相同"""
+    fetched = make_candles(30)
+    update = [fetched[-1][:1] + [p + 1 for p in fetched[-1][1:5]] + [4321.987]]
+
+    def fetch(symbol, timeframe, since, limit):
+        return [list(c) for c in (fetched if since is None else update)][-limit:]
+
+    cache = OHLCVCache(price_dtype=np.float32)
+    for expected in (fetched, fetched[:-1] + update):
+        served = cache.get(fetch, 'ETH/USDT:USDT', '5m', 30)
+        assert served == expected
+        text = _build_kline_text(KlineView(served, 13), "5分钟K线", 13)
+        assert text == _build_kline_text(KlineView(expected, 13), "5分钟K线", 13)
+        last = expected[-1]
+        assert f"O:{last[1]} H:{last[2]} L:{last[3]} C:{last[4]}" in text
+        assert f"V:{last[5]}" in text
+    assert cache.hits == 1 and cache.misses == 1
@@ -0,0 +1,93 @@
+"""
+K线收盘定时器测试 - 用可控的时钟检查：触发时间对齐K线收盘 + 延迟、休眠误差不累积、执行超时时跳过错过的触发
+
+用法:
+    python3 -m pytest tests/test_candle_scheduler.py
+"""
+import contextlib
+import io
+
+import pytest
+
+from utils.candle_scheduler import CandleScheduler
+
+# 2026-01-01 00:00:00 UTC 之后 2分17秒（不在K线边界上）
+START = 1767225600.0 + 137
+
+
+class FakeClock:
+    """模拟时钟：sleep 直接推进时间，每次多睡 oversleep 秒（模拟系统调度误差）"""
+
+    def __init__(self, now: float, oversleep: float = 0.0):
+        self.now = now
+        self.oversleep = oversleep
+        self.sleeps = 0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps += 1
+        self.now += seconds + self.oversleep
+
+
+class Stop(Exception):
+    pass
+
+
+def run(scheduler, clock, runs, job_seconds=lambda run: 1.0):
+    """执行 runs 轮后停止，返回每轮开始执行的时间"""
+    started = []
+
+    def job():
+        started.append(clock.now)
+        clock.now += job_seconds(len(started))
+        if len(started) == runs:
+            raise Stop()
+
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(Stop):
+        scheduler.run_forever(job)
+    return started
+
+
+def make(clock, interval_minutes=5, delay_seconds=5):
+    return CandleScheduler(interval_minutes, delay_seconds, clock=clock.time, sleep=clock.sleep)
+
+
+def test_next_run_aligns_to_candle_close():
+    clock = FakeClock(START)
+    scheduler = make(clock)
+    assert scheduler.next_run() == 1767225600.0 + 300 + 5
+    # 恰好在边界 + 延迟时，下一次是下一个边界
+    assert scheduler.next_run(1767225600.0 + 305) == 1767225600.0 + 600 + 5
+    # 边界之后、延迟之内：仍是本次边界
+    assert scheduler.next_run(1767225600.0 + 302) == 1767225600.0 + 305
+
+
+def test_runs_fire_after_each_close():
+    clock = FakeClock(START)
+    started = run(make(clock), clock, runs=4)
+    assert started == [1767225600.0 + 300 * k + 5 for k in range(1, 5)]
+
+
+def test_sleep_overshoot_does_not_accumulate():
+    # 每次休眠多睡 0.05 秒（分段休眠最多1秒一段），各轮仍按K线边界计划，偏差不随轮数累积
+    clock = FakeClock(START, oversleep=0.05)
+    scheduler = make(clock)
+    started = run(scheduler, clock, runs=20)
+    for k, at in enumerate(started, start=1):
+        planned = 1767225600.0 + 300 * k + 5
+        assert planned <= at < planned + 0.06, k
+    assert scheduler.stats()['runs'] == 20
+    assert 0 <= scheduler.stats()['max_drift'] < 0.06
+    assert scheduler.stats()['skipped'] == 0
+
+
+def test_long_run_skips_missed_triggers():
+    clock = FakeClock(START)
+    scheduler = make(clock)
+    # 第2轮执行12分钟：错过之后的2次触发，下一轮在再下一个边界执行，不连续补跑
+    started = run(scheduler, clock, runs=4, job_seconds=lambda run: 720.0 if run == 2 else 1.0)
+    base = 1767225600.0 + 5
+    assert started == [base + 300, base + 600, base + 1500, base + 1800]
+    assert scheduler.stats()['skipped'] == 2
@@ -0,0 +1,55 @@
+"""
+分片决策合并测试 - 合并各分片决策后，开仓/加仓的保证金总额按资金保留规则缩减或跳过
+
+用法:
+    python3 -m pytest tests/test_decision_merge.py
+"""
+from decision_merge import enforce_cash_reserve, merge_shard_decisions
+
+# 总资产1000，保留30% → 最多 700 - 已用 500 = 200 USDT 可用于新开仓
+ACCOUNT = {'total_balance': 1000.0, 'used_margin': 500.0, 'free_balance': 500.0}
+
+
+def decision(coin, action, value=0):
+    return {'coin': coin, 'action': action, 'position_value': value, 'reason': '测试'}
+
+
+def test_within_reserve_is_unchanged():
+    decisions = [decision('ETH', 'OPEN_LONG', 120), decision('SOL', 'ADD', 80), decision('BNB', 'CLOSE')]
+    assert enforce_cash_reserve(decisions, ACCOUNT, 30) == decisions
+    assert decisions[0]['position_value'] == 120
+
+
+def test_over_budget_open_is_reduced():
+    decisions = [decision('ETH', 'OPEN_LONG', 150), decision('SOL', 'OPEN_SHORT', 100), decision('BNB', 'HOLD')]
+    kept = enforce_cash_reserve(decisions, ACCOUNT, 30)
+    assert [(d['coin'], d['position_value']) for d in kept] == [('ETH', 150), ('SOL', 50.0), ('BNB', 0)]
+    assert '资金保留规则' in kept[1]['reason']
+
+
+def test_open_below_minimum_is_skipped():
+    decisions = [decision('ETH', 'OPEN_LONG', 195), decision('SOL', 'ADD', 50), decision('BNB', 'CLOSE')]
+    kept = enforce_cash_reserve(decisions, ACCOUNT, 30, min_order_values={'SOL': 13})
+    # 剩余 5 USDT 低于最小开仓金额，SOL 加仓被跳过；平仓不受影响
+    assert [(d['coin'], d['action']) for d in kept] == [('ETH', 'OPEN_LONG'), ('BNB', 'CLOSE')]
+
+
+def test_free_balance_limits_available_margin():
+    account = dict(ACCOUNT, free_balance=60.0)
+    kept = enforce_cash_reserve([decision('ETH', 'OPEN_LONG', 100)], account, 30)
+    assert kept[0]['position_value'] == 60.0
+
+
+def test_merged_shards_share_one_reserve():
+    shards = [['ETH', 'SOL'], ['BNB']]
+    results = [
+        {'decisions': [decision('ETH', 'OPEN_LONG', 120), decision('DOGE', 'OPEN_LONG', 50)], 'strategy': 'a',
+         'risk_level': 'LOW', 'confidence': 'HIGH'},
+        {'decisions': [decision('BNB', 'OPEN_LONG', 120)], 'strategy': 'b', 'risk_level': 'HIGH', 'confidence': 'MEDIUM'},
+    ]
+    merged = merge_shard_decisions(shards, results)
+    # 分片返回了本组以外的币种（DOGE）时忽略
+    assert [d['coin'] for d in merged['decisions']] == ['ETH', 'BNB']
+    assert merged['risk_level'] == 'HIGH' and merged['confidence'] == 'MEDIUM'
+    kept = enforce_cash_reserve(merged['decisions'], ACCOUNT, 30)
+    assert sum(d['position_value'] for d in kept) == 200
@@ -0,0 +1,91 @@
+"""
+流式决策解析测试 - 同一段回复在任意位置切开（包括字符串、转义字符、嵌套对象内部）逐段输入，
+解析出的决策都与一次性解析相同；回复被截断时只返回已完整的决策
+
+用法:
+    python3 -m pytest tests/test_decision_stream.py
+"""
+import json
+
+from decision_stream import DecisionStreamParser
+
+DECISIONS = [
+    {'coin': 'ETH', 'action': 'CLOSE', 'reason': '跌破 {支撑} 位 [3000]，"止损"\\ 离场', 'position_value': 0},
+    {'coin': 'SOL', 'action': 'HOLD', 'reason': '嵌套对象', 'stop_loss': 140.5,
+     'meta': {'levels': [{'price': 150, 'note': '}]{['}, [1, [2, 3]]], 'escaped': 'a\\"b\n\té'}},
+    {'coin': 'BNB', 'action': 'OPEN_LONG', 'reason': '', 'position_value': 20},
+]
+REPLY = ('```json\n{"analysis": "先看 \\"decisions\\": [ 之前的文字 {不是决策}",\n'
+         ' "decisions" : [\n'
+         + ',\n'.join(json.dumps(d, ensure_ascii=False) for d in DECISIONS)
+         + '\n], "strategy": "测试 ] } 结束", "risk_level": "LOW"}\n```')
+
+
+def feed_pieces(pieces):
+    parser = DecisionStreamParser()
+    decisions = []
+    for piece in pieces:
+        decisions.extend(parser.feed(piece))
+    return parser, decisions
+
+
+def test_whole_reply():
+    parser, decisions = feed_pieces([REPLY])
+    assert decisions == DECISIONS
+    assert parser.done and parser.text == REPLY
+
+
+def test_split_at_every_offset():
+    for offset in range(len(REPLY) + 1):
+        parser, decisions = feed_pieces([REPLY[:offset], REPLY[offset:]])
+        assert decisions == DECISIONS, offset
+        assert parser.done, offset
+
+
+def test_split_at_every_pair_of_offsets():
+    step = 3
+    for first in range(0, len(REPLY), step):
+        for second in range(first, len(REPLY) + 1, step):
+            _, decisions = feed_pieces([REPLY[:first], REPLY[first:second], REPLY[second:]])
+            assert decisions == DECISIONS, (first, second)
+
+
+def test_one_character_at_a_time():
+    parser, decisions = feed_pieces(list(REPLY))
+    assert decisions == DECISIONS
+    assert parser.done
+
+
+def test_decisions_arrive_as_soon_as_complete():
+    first_end = REPLY.index(json.dumps(DECISIONS[0], ensure_ascii=False)) + len(json.dumps(DECISIONS[0], ensure_ascii=False))
+    parser = DecisionStreamParser()
+    assert parser.feed(REPLY[:first_end - 1]) == []
+    assert parser.feed(REPLY[first_end - 1:first_end]) == [DECISIONS[0]]
+
+
+def test_truncated_reply_returns_only_complete_decisions():
+    for cut in range(len(REPLY)):
+        parser, decisions = feed_pieces([REPLY[:cut]])
+        assert decisions == DECISIONS[:len(decisions)], cut
+        closes = [REPLY.index(json.dumps(d, ensure_ascii=False)) + len(json.dumps(d, ensure_ascii=False)) for d in DECISIONS]
+        assert len(decisions) == sum(1 for end in closes if end <= cut), cut
+        assert not parser.done or cut > REPLY.index('\n]')
+
+
+def test_invalid_and_incomplete_objects_are_skipped():
+    reply = '{"decisions": [{"coin": "ETH"}, {"coin": "SOL", "action": "HOLD",}, {"coin": "BNB", "action": "HOLD"}]}'
+    _, decisions = feed_pieces([reply])
+    # 缺少 action 的对象和格式错误的对象（默认 json.loads 解析）被跳过
+    assert decisions == [{'coin': 'BNB', 'action': 'HOLD'}]
+
+
+def test_custom_parse_function():
+    reply = '{"decisions": [{"coin": "SOL", "action": "HOLD",}]}'
+    parser = DecisionStreamParser(lambda text: json.loads(text.replace(',}', '}')))
+    assert parser.feed(reply) == [{'coin': 'SOL', 'action': 'HOLD'}]
+
+
+def test_feed_after_done_only_appends_text():
+    parser, _ = feed_pieces([REPLY])
+    assert parser.feed('{"coin": "X", "action": "CLOSE"}') == []
+    assert parser.text.endswith('"CLOSE"}')
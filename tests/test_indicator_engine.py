@@ -0,0 +1,68 @@
+"""
+流式指标引擎测试 - 同一段K线逐根输入 IndicatorEngine，每一步的指标都与 calculate_technical_indicators 的 pandas 结果一致
+
+允许误差：相对误差 1e-9，MACD 等在0附近的指标按价格量级的 1e-3 作为分母下限（与 benchmarks/bench_indicators_golden.py 相同）
+
+用法:
+    python3 -m pytest tests/test_indicator_engine.py
+"""
+import math
+
+import pytest
+
+from sim import FakeExchange
+from indicator_engine import IndicatorEngine
+from indicator_spec import TIMEFRAME_COLUMNS
+from market_scanner import calculate_technical_indicators, ccxt_klines_to_df
+
+SYMBOL = 'ETH/USDT'
+RTOL = 1e-9
+WARMUP = 60
+
+
+def recorded_klines(timeframe, limit=240):
+    """模拟交易所按固定种子生成的K线（最后一根为未收盘K线）"""
+    exchange = FakeExchange({'fake': {'seed': 3, 'symbols': [SYMBOL], 'start_prices': {SYMBOL: 3000}}})
+    exchange.load_markets()
+    return exchange.fetch_ohlcv(SYMBOL, timeframe, limit=limit)
+
+
+def assert_close(actual, expected, floor, label):
+    if math.isnan(expected):
+        assert math.isnan(actual), label
+        return
+    assert abs(actual - expected) <= RTOL * max(abs(expected), floor), (label, actual, expected)
+
+
+@pytest.mark.parametrize('timeframe', ['5m', '15m', '1h', '4h'])
+def test_streaming_matches_pandas_bar_by_bar(timeframe):
+    klines = recorded_klines(timeframe)
+    assert len(klines) > WARMUP + 50
+    floor = max(k[4] for k in klines) * 1e-3
+    engine = IndicatorEngine()
+
+    for end in range(WARMUP, len(klines) + 1):
+        # 每次传入到当前为止的全部K线：首次预热，之后每步只计入一根新收盘的K线
+        window = klines[:end]
+        current = engine.update(SYMBOL, timeframe, window)
+        df = calculate_technical_indicators(ccxt_klines_to_df(window), timeframe)
+        for column in TIMEFRAME_COLUMNS[timeframe]:
+            assert_close(current[column], float(df[column].iloc[-1]), floor, (end, column))
+            # 已收盘K线的指标序列 + 临时值 与 df[column].tail() 对应
+            expected_tail = df[column].tail(5).tolist()
+            actual_tail = engine.series(SYMBOL, timeframe, column, 5, current)
+            for actual, expected in zip(actual_tail, expected_tail):
+                assert_close(actual, expected, floor, (end, column, 'series'))
+
+
+def test_gap_rewarms_from_passed_klines():
+    klines = recorded_klines('15m')
+    engine = IndicatorEngine()
+    engine.update(SYMBOL, '15m', klines[:100])
+    # 跳过中间的K线：引擎检测到缺口，用这次传入的K线重新预热
+    window = klines[150:]
+    current = engine.update(SYMBOL, '15m', window)
+    df = calculate_technical_indicators(ccxt_klines_to_df(window), '15m')
+    floor = max(k[4] for k in window) * 1e-3
+    for column in TIMEFRAME_COLUMNS['15m']:
+        assert_close(current[column], float(df[column].iloc[-1]), floor, column)
@@ -0,0 +1,34 @@
+"""
+指标金标准测试 - benchmarks/bench_indicators_golden.py 中注册的每个指标实现（pandas / 批量 / 流式）
+在固定K线样本上都与 benchmarks/golden/indicators.json 一致（相对误差 1e-9，与脚本默认的 --rtol 相同）
+
+用法:
+    python3 -m pytest tests/test_indicators_golden.py
+"""
+import json
+import os
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'benchmarks'))
+
+from bench_indicators_golden import ENGINES, GOLDEN_FILE, check_golden
+
+RTOL = 1e-9
+
+
+@pytest.fixture(scope='module')
+def golden():
+    with open(GOLDEN_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_streaming_engine_is_registered():
+    assert {'pandas', 'batch', 'streaming'} <= set(ENGINES)
+
+
+@pytest.mark.parametrize('engine', sorted(ENGINES))
+def test_engine_matches_golden(engine, golden):
+    assert check_golden(ENGINES[engine], golden, RTOL)
@@ -0,0 +1,148 @@
+"""
+行情推送测试 - MarketFeed 合并推送K线的规则（替换未收盘K线、追加、缺口清空、推送比缓冲旧时以推送为准、
+REST预热与推送的先后顺序），以及通过本地端口的回放服务器订阅、用REST接口预热
+
+用法:
+    python3 -m pytest tests/test_market_feed.py
+"""
+import json
+import time
+import urllib.parse
+import urllib.request
+
+import pytest
+
+from market_feed import MarketFeed, ReplayExchange
+
+SYMBOL = 'BTC/USDT'
+STEP = 300000  # 5m
+
+
+def candle(index, close=None):
+    ts = index * STEP
+    close = float(index) if close is None else close
+    return [ts, close, close + 1, close - 1, close, 10.0]
+
+
+def buffer_times(feed, timeframe='5m'):
+    return [c[0] // STEP for c in feed._candles.get((SYMBOL, timeframe), [])]
+
+
+@pytest.fixture
+def feed():
+    return MarketFeed(None, [SYMBOL], ['5m'], max_bars=50)
+
+
+def test_merge_replaces_open_candle_and_appends_next(feed):
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(10)])
+    feed._merge(SYMBOL, '5m', [candle(9, close=99.0)])
+    feed._merge(SYMBOL, '5m', [candle(9, close=100.0), candle(10)])
+    assert buffer_times(feed) == list(range(11))
+    assert feed.ohlcv(SYMBOL, '5m', 2) == [candle(9, close=100.0), candle(10)]
+
+
+def test_merge_gap_restarts_buffer(feed):
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(10)])
+    # 漏掉第10根：丢弃旧数据，从第11根开始重新积累
+    feed._merge(SYMBOL, '5m', [candle(11)])
+    assert buffer_times(feed) == [11]
+    assert feed.ohlcv(SYMBOL, '5m', 2) is None
+    feed._merge(SYMBOL, '5m', [candle(12)])
+    assert buffer_times(feed) == [11, 12]
+
+
+def test_merge_older_push_replaces_buffer(feed):
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(100, 110)])
+    # 比缓冲末尾早一个周期以内：视为重复推送，缓冲不变
+    feed._merge(SYMBOL, '5m', [candle(108)])
+    assert buffer_times(feed) == list(range(100, 110))
+    # 明显更旧（如回放服务器循环回到起点）：以推送为准
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(20, 25)])
+    assert buffer_times(feed) == list(range(20, 25))
+
+
+def test_merge_keeps_max_bars(feed):
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(80)])
+    assert buffer_times(feed) == list(range(30, 80))
+
+
+def test_seed_then_push(feed):
+    feed.seed(SYMBOL, '5m', [candle(i) for i in range(20)])
+    feed._merge(SYMBOL, '5m', [candle(19, close=50.0), candle(20)])
+    assert buffer_times(feed) == list(range(21))
+    assert feed.ohlcv(SYMBOL, '5m', 2)[0] == candle(19, close=50.0)
+
+
+def test_push_then_seed_keeps_newer_pushed_candles(feed):
+    # 推送先到（只有最近几根），REST预热随后到达且截止较早
+    feed._merge(SYMBOL, '5m', [candle(18, close=70.0), candle(19, close=80.0), candle(20, close=90.0)])
+    feed.seed(SYMBOL, '5m', [candle(i) for i in range(19)])
+    assert buffer_times(feed) == list(range(21))
+    # 预热覆盖到的K线以REST为准，之后更新的K线保留推送的值
+    assert feed.ohlcv(SYMBOL, '5m', 3) == [candle(18), candle(19, close=80.0), candle(20, close=90.0)]
+
+
+def test_seed_ignores_unsubscribed_pairs(feed):
+    feed.seed('ETH/USDT', '5m', [candle(i) for i in range(20)])
+    feed.seed(SYMBOL, '1h', [candle(i) for i in range(20)])
+    assert feed.stats()['buffers'] == 0
+
+
+def test_stale_buffer_is_a_miss(feed):
+    feed._merge(SYMBOL, '5m', [candle(i) for i in range(10)])
+    feed.stale_seconds = 0
+    feed._updated[(SYMBOL, '5m')] -= 1
+    assert feed.ohlcv(SYMBOL, '5m', 5) is None
+    assert feed.stats()['misses'] == 1
+
+
+def wait_for(predicate, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        result = predicate()
+        if result:
+            return result
+        time.sleep(0.05)
+    raise AssertionError('等待超时')
+
+
+def assert_contiguous_slice(candles, series):
+    """缓冲中的K线是录制数据中连续的一段（值完全相同，没有缺口或乱序）"""
+    start = next(i for i, c in enumerate(series) if c[0] == candles[0][0])
+    assert [list(c) for c in candles] == [list(c) for c in series[start:start + len(candles)]]
+
+
+def test_replay_server_feed():
+    pytest.importorskip('aiohttp')
+    from replay_server import ReplayServer, generate_recording
+
+    recording = generate_recording([SYMBOL, 'ETH/USDT'], bars=600, timeframes=['5m', '15m'], seed=1)
+    server = ReplayServer(recording, speed=20, warmup=100, loop_replay=False)
+    url = server.run_in_thread(port=0)
+    feed = MarketFeed(lambda: ReplayExchange(url), [SYMBOL, 'ETH/USDT'], ['5m', '15m'])
+    try:
+        feed.start()
+        for symbol in (SYMBOL, 'ETH/USDT'):
+            for timeframe in ('5m', '15m'):
+                candles = wait_for(lambda: feed.ohlcv(symbol, timeframe, 100))
+                assert_contiguous_slice(candles, recording['ohlcv'][symbol][timeframe])
+            assert wait_for(lambda: feed.ticker(symbol))['last'] > 0
+
+        # 订阅后每次推进追加一根新K线，缓冲保持连续
+        candles = wait_for(lambda: feed.ohlcv(SYMBOL, '5m', 110))
+        assert_contiguous_slice(candles, recording['ohlcv'][SYMBOL]['5m'])
+
+        # 用REST接口下载更长的历史预热：预热数据在前，推送的新K线接在后面
+        rest_url = url.replace('ws://', 'http://').replace('/ws', '/ohlcv')
+        query = urllib.parse.urlencode({'symbol': SYMBOL, 'timeframe': '5m', 'limit': 300})
+        with urllib.request.urlopen(f'{rest_url}?{query}', timeout=5) as response:
+            klines = json.loads(response.read())
+        assert len(klines) == 300
+        feed.seed(SYMBOL, '5m', klines)
+        candles = feed.ohlcv(SYMBOL, '5m', 300)
+        assert candles[-1][0] >= klines[-1][0]
+        assert_contiguous_slice(candles, recording['ohlcv'][SYMBOL]['5m'])
+        assert feed.stats()['hits'] > 0
+    finally:
+        feed.stop()
+        server.shutdown()
@@ -0,0 +1,62 @@
+"""
+投资组合统计测试 - 统计按币种名（ETH）记录，旧版按交易对（ETH/USDT）保存的统计文件加载时迁移
+
+用法:
+    python3 -m pytest tests/test_portfolio_statistics.py
+"""
+import json
+import os
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src', 'core'))
+
+from portfolio_statistics import PortfolioStatistics
+
+POSITION = {'entry_time': '2026-10-18T12:00:00', 'side': 'long', 'entry_price': 3000.0, 'amount': 0.1,
+            'stop_loss': 2900.0, 'take_profit': 3200.0, 'stop_order_id': 12345}
+
+
+def write_config(tmp_path):
+    config_file = tmp_path / 'coins_config.json'
+    config_file.write_text(json.dumps({'coins': [{'symbol': 'ETH/USDT'}, {'symbol': 'SOL/USDT'}]}), encoding='utf-8')
+    return str(config_file)
+
+
+def test_coins_keyed_by_name(tmp_path):
+    stats = PortfolioStatistics(str(tmp_path / 'stats.json'), config_file=write_config(tmp_path))
+    assert stats.coins == ['ETH', 'SOL']
+    stats.record_position_entry('ETH', 'long', 3000.0, 0.1, 2900.0, 3200.0, 12345)
+    assert stats.current_positions['ETH']['stop_order_id'] == 12345
+
+
+def test_load_migrates_symbol_keys(tmp_path):
+    stats_file = tmp_path / 'stats.json'
+    stats_file.write_text(json.dumps({
+        'start_time': '2026-10-18T00:00:00',
+        'current_positions': {'ETH/USDT': POSITION, 'SOL/USDT': None},
+        'trade_history': [{'coin': 'SOL/USDT', 'pnl': 1.5}],
+    }), encoding='utf-8')
+
+    stats = PortfolioStatistics(str(stats_file), config_file=write_config(tmp_path))
+    assert stats.current_positions == {'ETH': POSITION, 'SOL': None}
+    assert stats.trade_history_by_coin['SOL'] == [{'coin': 'SOL', 'pnl': 1.5}]
+
+    # 迁移后的持仓可以正常平仓，再次保存时使用币种名
+    stats.save()
+    saved = json.loads(stats_file.read_text(encoding='utf-8'))
+    assert set(saved['current_positions']) == {'ETH', 'SOL'}
+    stats.record_trade_exit('ETH', 3100.0)
+    assert stats.current_positions['ETH'] is None
+    assert stats.trade_history_by_coin['ETH'][-1]['pnl'] == 10.0
+
+
+def test_coin_key_wins_over_symbol_key(tmp_path):
+    stats_file = tmp_path / 'stats.json'
+    newer = dict(POSITION, entry_price=3050.0)
+    stats_file.write_text(json.dumps({
+        'start_time': '2026-10-18T00:00:00',
+        'current_positions': {'ETH/USDT': POSITION, 'ETH': newer},
+    }), encoding='utf-8')
+    stats = PortfolioStatistics(str(stats_file), config_file=write_config(tmp_path))
+    assert stats.current_positions['ETH'] == newer
@@ -0,0 +1,104 @@
+"""
+提示词预算测试 - 超出预算时按 DEGRADE_STEPS 的顺序降级（无持仓币种先于持仓币种，靠后的币种先降级），
+降级后的 token 数不超过预算；BTC背景等固定部分不参与降级
+
+用法:
+    python3 -m pytest tests/test_prompt_budget.py
+"""
+import pytest
+
+from prompt_budget import fit_prompt, format_applied
+from prompt_encoding import DETAIL_LEVELS, build_coin_text, count_tokens
+
+COINS = ['ETH', 'SOL', 'BNB', 'XRP']
+HELD = ['ETH']
+FIXED_TOKENS = 500
+SECTIONS = {
+    'stats': '【统计】' + '胜率 55% 盈亏比 1.8 ' * 40,
+    'last_decisions': '【最近决策】' + 'ETH HOLD 趋势延续 ' * 60,
+}
+
+
+def klines(price, count):
+    return [[i, price + i, price + i + 2, price + i - 2, price + i + 1, 100.0 + i] for i in range(count)]
+
+
+def coin_data(price):
+    data = {'price': price, 'change_24h': 1.5, 'funding_rate': 0.0001, 'open_interest': 12345.0,
+            'min_order_value': 13, 'atr_14_5m': 1.2, 'ema_20_15m': price, 'ema_50_15m': price - 1,
+            'rsi_14_15m': 55.0, 'macd_15m': 0.3, 'ema_20_1h': price, 'ema_50_1h': price - 2, 'atr_14_1h': 3.0,
+            'bbands_1h': {'upper': price + 5, 'middle': price, 'lower': price - 5},
+            'ema_20_4h': price, 'ema_50_4h': price - 3, 'atr_14_4h': 6.0}
+    for timeframe, count in DETAIL_LEVELS[0].items():
+        data[f"kline_{timeframe}"] = klines(price, count + 5)
+    return data
+
+
+MARKET = {coin: coin_data(price) for coin, price in zip(COINS, [3000.5, 150.25, 600.75, 0.5123])}
+
+
+def coin_text(coin, level):
+    return build_coin_text(coin, MARKET[coin], 'compact', level=level)
+
+
+def fit(budget):
+    return fit_prompt(budget, FIXED_TOKENS, SECTIONS, COINS, coin_text, HELD)
+
+
+def full_tokens():
+    return fit(0)['tokens']
+
+
+def actual_tokens(fitted):
+    """按降级结果重新计数，确认返回的 tokens 与实际文本一致"""
+    return (FIXED_TOKENS + sum(count_tokens(text) for text in fitted['sections'].values())
+            + sum(count_tokens(text) for text in fitted['coin_texts'].values()))
+
+
+def test_no_budget_or_enough_budget_keeps_everything():
+    for budget in (0, full_tokens()):
+        fitted = fit(budget)
+        assert fitted['fits'] and fitted['applied'] == []
+        assert set(fitted['levels'].values()) == {0}
+        assert fitted['sections'] == SECTIONS
+
+
+def test_idle_coins_degrade_first_from_the_back():
+    # 只超出一点：最后一个无持仓币种K线减半即可
+    fitted = fit(full_tokens() - 1)
+    assert fitted['fits'] and fitted['tokens'] <= full_tokens() - 1
+    assert fitted['levels'] == {'ETH': 0, 'SOL': 0, 'BNB': 0, 'XRP': 1}
+    assert fitted['applied'] == [('无持仓币种K线减半', 1)]
+    assert fitted['sections'] == SECTIONS
+
+
+@pytest.mark.parametrize('ratio', [0.9, 0.7, 0.5, 0.4])
+def test_result_is_within_budget(ratio):
+    budget = int(full_tokens() * ratio)
+    fitted = fit(budget)
+    assert fitted['fits']
+    assert fitted['tokens'] == actual_tokens(fitted) <= budget
+    assert fitted['before'] == full_tokens()
+
+
+def test_degrade_order():
+    # 决策记录只在所有无持仓币种省略4h K线之后才省略；持仓币种只在无持仓币种只剩指标之后才降级
+    for budget in range(full_tokens() - 1, FIXED_TOKENS, -25):
+        fitted = fit(budget)
+        idle_levels = [fitted['levels'][coin] for coin in COINS if coin not in HELD]
+        if not fitted['sections']['last_decisions']:
+            assert min(idle_levels) >= 2, budget
+        if fitted['levels']['ETH'] > 0:
+            assert min(idle_levels) == 3 and not fitted['sections']['last_decisions'], budget
+        if not fitted['sections']['stats']:
+            assert fitted['levels']['ETH'] == 2, budget
+        assert fitted['tokens'] <= budget or not fitted['fits']
+
+
+def test_unreachable_budget_applies_every_step():
+    fitted = fit(FIXED_TOKENS + 10)
+    assert not fitted['fits']
+    assert fitted['levels'] == {'ETH': 2, 'SOL': 3, 'BNB': 3, 'XRP': 3}
+    assert fitted['sections'] == {'stats': '', 'last_decisions': ''}
+    assert format_applied(fitted['applied']) == ('无持仓币种K线减半×3, 无持仓币种省略4h K线×3, 省略决策记录, '
+                                                 '无持仓币种只保留指标×3, 持仓币种K线减半×1, 持仓币种省略4h K线×1, 省略统计信息')
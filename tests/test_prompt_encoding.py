@@ -0,0 +1,38 @@
+"""
+紧凑编码测试 - compact 编码中的K线价格和成交量解析回来与原始数据完全一致，开盘价等于上一根收盘价时留空
+
+用法:
+    python3 -m pytest tests/test_prompt_encoding.py
+"""
+from prompt_encoding import build_coin_text
+
+KLINES = [
+    # 时间, 开, 高, 低, 收, 成交量（含超出最小变动价位的价格、多位小数和很大/很小的成交量）
+    [0, 3000.1, 3010.25, 2990.0, 3005.5, 1234.5678],
+    [1, 3005.5, 3012.0, 3001.3, 3002.2, 0.00012345],
+    [2, 3002.3, 3003.0, 2999.9, 3000.0, 98765432.125],
+    [3, 3000.0, 3004.123456789, 2998.7, 3001.1, 3.0],
+]
+
+
+def parse_rows(text, timeframe):
+    lines = text.splitlines()
+    start = lines.index(f"{timeframe} o,h,l,c,v") + 1
+    rows = []
+    for line in lines[start:start + len(KLINES)]:
+        fields = line.split(',')
+        open_p = float(fields[0]) if fields[0] else rows[-1][3]
+        rows.append([open_p] + [float(x) for x in fields[1:]])
+    return rows, lines[start:start + len(KLINES)]
+
+
+def test_compact_klines_are_lossless():
+    data = {'price': 3001.1, 'kline_5m': KLINES}
+    text = build_coin_text('ETH', data, 'compact', decimals=1)
+    rows, lines = parse_rows(text, '5m')
+    assert rows == [k[1:] for k in KLINES]
+    # 价格在最小变动价位上时按其小数位输出，成交量不舍入
+    assert lines[0] == '3000.1,3010.25,2990,3005.5,1234.5678'
+    assert lines[1] == ',3012,3001.3,3002.2,0.00012345'
+    assert lines[2] == '3002.3,3003,2999.9,3000,98765432.125'
+    assert lines[3] == ',3004.123456789,2998.7,3001.1,3'
@@ -0,0 +1,66 @@
+"""
+节流器测试 - 多个线程同时请求时，任意两次放行之间至少间隔 interval_ms
+
+用法:
+    python3 -m pytest tests/test_rate_limiter.py
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from utils.rate_limiter import RateLimiter
+
+INTERVAL_MS = 20
+THREADS = 6
+REQUESTS = 4
+# time.sleep 可能提前极少量唤醒，比较间隔时留出 1ms 余量
+SLACK = 0.001
+
+
+def acquire_concurrently(limiter):
+    barrier = threading.Barrier(THREADS)
+    stamps = []
+    lock = threading.Lock()
+
+    def worker():
+        barrier.wait()
+        for _ in range(REQUESTS):
+            limiter.acquire()
+            with lock:
+                stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=worker) for _ in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(stamps)
+
+
+def test_concurrent_requests_are_spaced():
+    limiter = RateLimiter(INTERVAL_MS)
+    start = time.monotonic()
+    stamps = acquire_concurrently(limiter)
+    gaps = [b - a for a, b in zip(stamps, stamps[1:])]
+    assert len(stamps) == THREADS * REQUESTS
+    assert min(gaps) >= INTERVAL_MS / 1000 - SLACK
+    # 总耗时约为 (请求数 - 1) × 间隔
+    assert stamps[-1] - start >= (len(stamps) - 1) * INTERVAL_MS / 1000 - SLACK
+    assert limiter.total_wait > 0
+
+
+def test_cost_reserves_longer_slot():
+    limiter = RateLimiter(INTERVAL_MS)
+    limiter.acquire(cost=3)
+    start = time.monotonic()
+    limiter.acquire()
+    assert time.monotonic() - start >= 3 * INTERVAL_MS / 1000 - SLACK
+
+
+def test_disabled_limiter_does_not_wait():
+    exchange = SimpleNamespace(rateLimit=INTERVAL_MS, enableRateLimit=False)
+    limiter = RateLimiter.for_exchange(exchange)
+    start = time.monotonic()
+    acquire_concurrently(limiter)
+    assert time.monotonic() - start < THREADS * REQUESTS * INTERVAL_MS / 1000 / 2
+    assert limiter.total_wait == 0
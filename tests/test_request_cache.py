@@ -0,0 +1,96 @@
+"""
+单轮请求缓存测试 - 多个线程同时请求同一行情只调用一次接口；失败不缓存；一轮结束后缓存清空
+
+用法:
+    python3 -m pytest tests/test_request_cache.py
+"""
+import contextlib
+import io
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.request_cache import RequestCache
+
+CALLERS = 8
+
+
+def concurrent_calls(fn, count=CALLERS):
+    """count 个线程同时调用 fn，返回各线程的结果"""
+    barrier = threading.Barrier(count)
+
+    def call():
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=count) as pool:
+        return list(pool.map(lambda _: call(), range(count)))
+
+
+def test_concurrent_callers_share_one_fetch():
+    cache = RequestCache()
+    cache.begin()
+    fetches = []
+
+    def fetch(symbol):
+        fetches.append(symbol)
+        time.sleep(0.2)
+        return {'symbol': symbol, 'last': 3000.0}
+
+    results = concurrent_calls(lambda: cache.call(('fetch_ticker', 'ETH/USDT'), fetch, 'ETH/USDT'))
+    assert fetches == ['ETH/USDT']
+    assert all(result is results[0] for result in results)
+    stats = cache.stats()
+    assert stats['misses'] == 1 and stats['hits'] + stats['waits'] == CALLERS - 1
+
+
+def test_failure_is_shared_but_not_cached():
+    cache = RequestCache()
+    cache.begin()
+    calls = []
+
+    def failing():
+        calls.append(1)
+        time.sleep(0.1)
+        raise ConnectionError('网络错误')
+
+    errors = concurrent_calls(lambda: pytest.raises(ConnectionError, cache.call, 'key', failing))
+    assert len(errors) == CALLERS and len(calls) == 1
+    # 失败的结果不缓存，重试时重新调用
+    assert cache.call('key', lambda: 'ok') == 'ok'
+
+
+def test_end_clears_cache():
+    cache = RequestCache()
+    cache.begin()
+    calls = []
+    fetch = lambda: calls.append(1) or len(calls)
+    assert cache.call('key', fetch) == 1
+    assert cache.call('key', fetch) == 1
+    cache.end()
+    assert cache._entries == {}
+    # 轮次之外不缓存
+    assert cache.call('key', fetch) == 2 and cache.call('key', fetch) == 3
+    cache.begin()
+    assert cache.call('key', fetch) == 4
+
+
+def test_scanner_cycle_fetches_ticker_once(make_scanner):
+    scanner = make_scanner(fake={'latency_by_method': {'fetch_ticker': {'distribution': 'constant', 'mean': 200}}})
+    exchange = scanner.exchange
+    scanner.begin_cycle()
+    try:
+        tickers = concurrent_calls(lambda: scanner._request('fetch_ticker', 'ETH/USDT'))
+        assert exchange.stats()['calls']['fetch_ticker'] == 1
+        assert all(ticker is tickers[0] for ticker in tickers)
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            scanner.end_cycle()
+    assert scanner.request_cache._entries == {}
+
+    # 下一轮重新请求
+    scanner.begin_cycle()
+    scanner._request('fetch_ticker', 'ETH/USDT')
+    assert exchange.stats()['calls']['fetch_ticker'] == 2
@@ -0,0 +1,82 @@
+"""
+扫描时间预算测试 - 超过 deadline 的币种使用上一次的快照（标记 stale），超时后才完成的扫描结果不覆盖快照
+
+用法:
+    python3 -m pytest tests/test_scan_deadline.py
+"""
+import contextlib
+import io
+import threading
+
+import pytest
+
+
+@pytest.fixture
+def scanner(make_scanner):
+    return make_scanner(scan_budget_seconds=1)
+
+
+def scan(scanner):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return scanner.scan_all_markets(positions={})
+
+
+def test_late_coin_uses_snapshot_and_late_result_is_dropped(scanner, monkeypatch):
+    first = scan(scanner)
+    assert not first['SOL'].get('stale')
+    snapshot_time, snapshot = scanner._snapshots['SOL']
+
+    release = threading.Event()
+    finished = threading.Event()
+    scan_coin = scanner.scan_coin
+
+    def slow_scan_coin(coin, *args, **kwargs):
+        if coin != 'SOL':
+            return scan_coin(coin, *args, **kwargs)
+        # 超过扫描预算后才返回，且结果与快照不同
+        release.wait(10)
+        data = dict(scan_coin(coin, *args, **kwargs), price=-1.0)
+        finished.set()
+        return data
+
+    monkeypatch.setattr(scanner, 'scan_coin', slow_scan_coin)
+    second = scan(scanner)
+
+    assert not second['ETH'].get('stale')
+    assert second['SOL']['stale'] and second['SOL']['price'] == snapshot['price']
+    assert second['SOL']['stale_age_seconds'] >= 0
+
+    # 超时的扫描在后台完成：结果属于旧轮次，不写入快照
+    release.set()
+    assert finished.wait(10)
+    scanner._running['SOL'].result(10)
+    assert scanner._snapshots['SOL'] == (snapshot_time, snapshot)
+
+    # 下一轮正常扫描，快照更新为新结果
+    monkeypatch.setattr(scanner, 'scan_coin', scan_coin)
+    third = scan(scanner)
+    assert not third['SOL'].get('stale')
+    assert scanner._snapshots['SOL'][0] > snapshot_time
+
+
+def test_still_running_scan_is_not_resubmitted(scanner, monkeypatch):
+    scan(scanner)
+    release = threading.Event()
+    calls = []
+    scan_coin = scanner.scan_coin
+
+    def slow_scan_coin(coin, *args, **kwargs):
+        if coin == 'SOL':
+            calls.append(coin)
+            release.wait(10)
+        return scan_coin(coin, *args, **kwargs)
+
+    monkeypatch.setattr(scanner, 'scan_coin', slow_scan_coin)
+    try:
+        scan(scanner)
+        # 上一轮的 SOL 扫描仍在执行：本轮直接使用快照，不再提交新的扫描
+        result = scan(scanner)
+        assert result['SOL']['stale']
+        assert calls == ['SOL']
+    finally:
+        release.set()
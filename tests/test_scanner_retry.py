@@ -0,0 +1,52 @@
+"""
+K线请求重试测试 - 各周期K线遇到网络/交易所错误时按 retry_on_api_error 重试，多次失败后该周期返回None
+
+用法:
+    python3 -m pytest tests/test_scanner_retry.py
+"""
+import contextlib
+import io
+
+import ccxt
+import pytest
+
+import utils.retry_decorator
+
+
+@pytest.fixture
+def scanner(make_scanner, monkeypatch):
+    # 重试间隔不实际等待
+    monkeypatch.setattr(utils.retry_decorator.time, 'sleep', lambda seconds: None)
+    return make_scanner()
+
+
+def flaky(fn, failures):
+    """前 failures 次调用抛出 NetworkError，之后正常调用 fn"""
+    calls = []
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        if len(calls) <= failures:
+            raise ccxt.NetworkError('fake: 连接被重置')
+        return fn(*args, **kwargs)
+
+    return wrapper, calls
+
+
+def test_transient_error_is_retried(scanner, monkeypatch):
+    fetch, calls = flaky(scanner._fetch_ohlcv, failures=2)
+    monkeypatch.setattr(scanner, '_fetch_ohlcv', fetch)
+    with contextlib.redirect_stdout(io.StringIO()):
+        data = scanner.get_coin_15m_data('ETH')
+    assert data is not None and data['timeframe'] == '15m' and len(data['klines']) == 16
+    assert len(calls) == 3
+
+
+def test_persistent_error_returns_none_after_retries(scanner, monkeypatch):
+    fetch, calls = flaky(scanner._fetch_ohlcv, failures=10)
+    monkeypatch.setattr(scanner, '_fetch_ohlcv', fetch)
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        assert scanner.get_coin_1h_data('ETH') is None
+    assert len(calls) == 3
+    assert '重试3次后仍失败' in output.getvalue()
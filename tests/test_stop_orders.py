@@ -0,0 +1,81 @@
+"""
+止损单测试 - 用模拟交易所的 CCXT 格式订单检查止损单状态解析、字符串订单ID的记录/取消，以及启动同步时识别已触发的止损
+
+用法:
+    python3 -m pytest tests/test_stop_orders.py
+"""
+from datetime import datetime
+
+from sim import FakeExchange
+from portfolio_statistics import PortfolioStatistics
+
+SYMBOL = 'ETH/USDT'
+
+
+def make_exchange():
+    exchange = FakeExchange({'fake': {'seed': 1, 'symbols': [SYMBOL], 'start_prices': {SYMBOL: 3000}}})
+    exchange.load_markets()
+    return exchange
+
+
+def open_long_with_stop(exchange, stop_price):
+    exchange.create_order(SYMBOL, 'market', 'buy', 1.0)
+    return exchange.create_order(SYMBOL, 'market', 'sell', 1.0, None, {'stopPrice': stop_price, 'reduceOnly': True})
+
+
+def test_stop_order_fill_parses_ccxt_orders(pm):
+    exchange = make_exchange()
+    last = exchange.last_price(SYMBOL)
+
+    pending = open_long_with_stop(exchange, last * 0.5)
+    assert isinstance(pending['id'], str)
+    assert pm.stop_order_fill(exchange.fetch_order(pending['id'], SYMBOL), last * 0.5) is None
+
+    # 止损价高于最新价的卖出止损单在下一次查询时成交
+    triggered = exchange.create_order(SYMBOL, 'market', 'sell', 1.0, None, {'stopPrice': last * 2, 'reduceOnly': True})
+    order = exchange.fetch_order(triggered['id'], SYMBOL)
+    assert order['status'] == 'closed'
+    trigger_time, avg_price = pm.stop_order_fill(order, 0)
+    assert avg_price == last * 2
+    assert trigger_time == datetime.fromtimestamp(order['lastTradeTimestamp'] / 1000)
+
+
+def test_stop_order_fill_accepts_binance_fields(pm):
+    order = {'status': 'FILLED', 'updateTime': 1760000000000, 'avgPrice': '2950.5'}
+    assert pm.stop_order_fill(order, 2900) == (datetime.fromtimestamp(1760000000), 2950.5)
+    assert pm.stop_order_fill({'status': 'closed', 'timestamp': 1760000000000}, 2900)[1] == 2900
+    assert pm.stop_order_fill({'status': 'canceled'}, 2900) is None
+
+
+def test_string_order_ids_are_recorded_and_cancelled(tmp_path):
+    exchange = make_exchange()
+    config_file = tmp_path / 'coins_config.json'
+    config_file.write_text('{"coins": [{"symbol": "ETH/USDT"}]}', encoding='utf-8')
+    stats = PortfolioStatistics(str(tmp_path / 'stats.json'), exchange, str(config_file))
+
+    stop = open_long_with_stop(exchange, exchange.last_price(SYMBOL) * 0.5)
+    stats.record_position_entry('ETH', 'long', 3000.0, 1.0, 1500.0, 0, stop['id'])
+    stats.update_stop_loss_take_profit('ETH', 1400.0, 0, stop['id'])
+    assert stats.current_positions['ETH']['stop_order_id'] == stop['id']
+
+    assert stats.cancel_stop_loss_order('ETH', SYMBOL)
+    assert exchange.orders[stop['id']]['status'] == 'canceled'
+
+
+def test_startup_sync_records_triggered_stop(pm):
+    exchange = pm.exchange
+    symbol = pm.market_scanner.symbols.get('ETH').symbol
+    last = exchange.last_price(symbol)
+    exchange.create_order(symbol, 'market', 'buy', 1.0)
+    stop = exchange.create_order(symbol, 'market', 'sell', 1.0, None, {'stopPrice': last * 2, 'reduceOnly': True})
+    pm.portfolio_stats.record_position_entry('ETH', 'long', last, 1.0, last * 2, 0, stop['id'])
+    # 查询一次订单使止损单成交，持仓随之平掉
+    exchange.fetch_order(stop['id'], symbol)
+
+    pm.sync_portfolio_positions_on_startup()
+
+    assert pm.portfolio_stats.current_positions['ETH'] is None
+    record = pm.portfolio_stats.stop_loss_history[-1]
+    assert record['coin'] == 'ETH' and record['stop_price'] == last * 2
+    trade = pm.portfolio_stats.trade_history[-1]
+    assert trade['exit_reason'] == 'stop_loss_triggered' and trade['exit_price'] == last * 2
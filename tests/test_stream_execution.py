@@ -0,0 +1,64 @@
+"""
+流式决策执行测试 - 流式回复中途出错时，已提前执行的 CLOSE 仍作为已执行决策返回并写入 ai_decisions.json
+
+用法:
+    python3 -m pytest tests/test_stream_execution.py
+"""
+import json
+from types import SimpleNamespace
+
+CLOSE_ETH = {'coin': 'ETH', 'action': 'CLOSE', 'reason': '测试：平仓', 'position_value': 0,
+             'stop_loss': 0, 'take_profit': 0}
+
+
+def chunk(content):
+    delta = SimpleNamespace(content=content)
+    return SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=delta)])
+
+
+def broken_stream(**kwargs):
+    """先完整返回一个 CLOSE 决策，生成第二个决策时连接中断"""
+    text = '{"decisions": [' + json.dumps(CLOSE_ETH, ensure_ascii=False) + ', {"coin": "SOL", "act'
+    for start in range(0, len(text), 7):
+        yield chunk(text[start:start + 7])
+    raise ConnectionError('stream reset by peer')
+
+
+def read_decisions(pm):
+    with open(pm.AI_DECISIONS_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)['decisions']
+
+
+def test_stream_failure_keeps_early_close(pm, monkeypatch):
+    exchange = pm.exchange
+    symbol = pm.market_scanner.symbols.get('ETH').symbol
+    exchange.create_order(symbol, 'market', 'buy', 1.0)
+    assert pm.market_scanner.get_portfolio_positions().get('ETH')
+
+    monkeypatch.setitem(pm.market_scanner.coins_config, 'llm', {'stream': True})
+    monkeypatch.setattr(pm.deepseek_client.chat.completions, 'create', broken_stream)
+    recorded_before = len(read_decisions(pm)) if pm.os.path.exists(pm.AI_DECISIONS_FILE) else 0
+
+    pm.portfolio_bot()
+
+    # CLOSE 在流式接收时已经发到交易所
+    assert not pm.market_scanner.get_portfolio_positions().get('ETH')
+    # 记录中是这次已执行的 CLOSE，而不是 WAIT
+    recorded = read_decisions(pm)[recorded_before:]
+    assert [(d['coin'], d['action']) for d in recorded] == [('ETH', 'CLOSE')]
+    assert '中断前已执行 1 个决策' in recorded[0]['strategy']
+
+
+def test_stream_failure_without_early_actions_waits(pm, monkeypatch):
+    def fails_immediately(**kwargs):
+        raise ConnectionError('connection refused')
+        yield  # noqa: unreachable，使其成为生成器
+
+    monkeypatch.setitem(pm.market_scanner.coins_config, 'llm', {'stream': True})
+    monkeypatch.setattr(pm.deepseek_client.chat.completions, 'create', fails_immediately)
+    recorded_before = len(read_decisions(pm)) if pm.os.path.exists(pm.AI_DECISIONS_FILE) else 0
+
+    pm.portfolio_bot()
+
+    recorded = read_decisions(pm)[recorded_before:]
+    assert [(d['coin'], d['action']) for d in recorded] == [('ALL', 'WAIT')]
@@ -0,0 +1,72 @@
+"""
+币种预筛选测试 - 成交额门槛、top_n、排序方式；持仓币种无论排名和成交额都保留深度扫描
+
+用法:
+    python3 -m pytest tests/test_universe_screener.py
+"""
+from universe_screener import UniverseScreener, rank_universe, ticker_metrics
+
+
+def ticker(last, quote_volume, percentage, high=None, low=None):
+    return {'last': last, 'quoteVolume': quote_volume, 'percentage': percentage,
+            'high': high if high is not None else last * 1.01, 'low': low if low is not None else last * 0.99}
+
+
+TICKERS = {
+    'ETH': ticker(3000, 5e9, 2.0, 3100, 2900),
+    'SOL': ticker(150, 1e9, -8.0, 160, 140),
+    'DOGE': ticker(0.2, 4e8, 1.0),
+    'PEPE': ticker(0.00001, 2e6, 25.0, 0.000012, 0.000008),   # 成交额低、波动大
+    'DEAD': {'last': None},                                    # 没有最新价
+}
+
+
+def test_ticker_metrics():
+    assert ticker_metrics(TICKERS['DEAD']) is None
+    m = ticker_metrics(TICKERS['SOL'])
+    assert m == {'volume': 1e9, 'change': 8.0, 'volatility': (160 - 140) / 150 * 100}
+    # 没有 quoteVolume 和 percentage 时由 baseVolume 和开盘价计算
+    m = ticker_metrics({'last': 10.0, 'baseVolume': 50.0, 'open': 8.0})
+    assert m['volume'] == 500.0 and m['change'] == 25.0 and m['volatility'] == 0.0
+
+
+def test_rank_by_single_metric():
+    metrics = {coin: ticker_metrics(t) for coin, t in TICKERS.items() if ticker_metrics(t)}
+    assert [coin for coin, _ in rank_universe(metrics, 'volume')] == ['ETH', 'SOL', 'DOGE', 'PEPE']
+    assert [coin for coin, _ in rank_universe(metrics, 'change')][0] == 'PEPE'
+    scores = dict(rank_universe(metrics, 'score', {'volume': 1, 'change': 0, 'volatility': 0}))
+    assert scores['ETH'] == 1.0 and scores['PEPE'] == 0.0
+
+
+def test_top_n_and_min_quote_volume():
+    screener = UniverseScreener({'top_n': 2, 'rank_by': 'change', 'min_quote_volume': 1e7})
+    selected, ranking = screener.select(TICKERS)
+    # PEPE 涨幅最大但成交额低于门槛，不参与排名；DEAD 没有最新价
+    assert [coin for coin, _ in ranking] == ['SOL', 'ETH', 'DOGE']
+    assert selected == ['SOL', 'ETH']
+
+
+def test_held_coins_are_never_screened_out():
+    screener = UniverseScreener({'top_n': 1, 'rank_by': 'volume', 'min_quote_volume': 1e7})
+    # DOGE 排名靠后、PEPE 低于成交额门槛、DEAD 没有行情，持仓时都保留深度扫描
+    selected, _ = screener.select(TICKERS, keep=['DOGE', 'PEPE', 'DEAD', 'ETH'])
+    assert selected == ['ETH', 'DOGE', 'PEPE', 'DEAD']
+
+
+def test_active_only_when_universe_exceeds_top_n():
+    screener = UniverseScreener({'top_n': 3})
+    assert not screener.active(3) and screener.active(4)
+    assert not UniverseScreener({'top_n': 0}).active(100)
+
+
+def test_scanner_prescreen_keeps_positions(make_scanner):
+    scanner = make_scanner(prescreen={'top_n': 1, 'rank_by': 'volume'})
+    tickers = scanner.exchange.fetch_tickers()
+    volumes = {coin: ticker_metrics(tickers[f"{coin}/USDT"])['volume'] for coin in scanner.coins}
+    top, other = sorted(scanner.coins, key=volumes.get, reverse=True)
+
+    selected, _ = scanner._prescreen(positions={})
+    assert selected == [top]
+    # 持仓币种排名靠后也深度扫描，并保持配置中的币种顺序
+    selected, _ = scanner._prescreen(positions={other: {'side': 'long'}})
+    assert selected == [coin for coin in scanner.coins if coin in (top, other)]
@@ -1,5 +1,6 @@
 import json
 import os
+import sys
 import shutil
 import time
 from flask import Flask, jsonify, send_from_directory, request
@@ -10,6 +11,8 @@ from dotenv import load_dotenv
 # Load environment variables
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 load_dotenv(os.path.join(PROJECT_ROOT, '.env'))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, 'src'))
+from utils.markets_cache import load_markets_cached, markets_cache_file
 
 app = Flask(__name__, static_folder='dist', static_url_path='/')
 CORS(app) # Enable CORS for all routes
@@ -28,8 +31,10 @@ try:
         with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
             config = json.load(f)
             exchange_name = config.get('exchange', 'binance').lower()
+            markets_cache_hours = float(config.get('markets_cache_hours', 24))
     else:
         exchange_name = 'binance'
+        markets_cache_hours = 24
     
     # 根据交易所名称读取对应的API密钥
     api_key_name = f"{exchange_name.upper()}_API_KEY"
@@ -74,7 +79,8 @@ try:
             }
         
         exchange = exchange_class(exchange_config)
-        exchange.load_markets()
+        # Share the trading bot's markets cache under data/ instead of downloading on every start
+        load_markets_cached(exchange, markets_cache_file(os.path.join(PROJECT_ROOT, 'data'), exchange), markets_cache_hours)
         print(f"✅ {exchange_name.upper()} Exchange initialized in Web App")
     else:
         print(f"⚠️ {exchange_name.upper()} credentials not found in .env")